@@ -0,0 +1,538 @@
+"""
+リアクション集中時の負荷試験（bot_kidou_new.on_raw_reaction_add の計測）。
+
+Discordとの通信は偽のチャンネル・ユーザーで、DeepLは web/mock_deepl_server で置き換え、
+実際のハンドラーに合成したリアクションイベントを送り込みます。
+スループット、応答時間（p50/p95/p99）、上流（DeepL）の呼び出し回数、メモリ使用量を計測し、
+ベースラインとして保存・比較できます。
+翻訳するテキストがレート制限の枠を超える場合は、上流の呼び出し回数が枠内に収まる（バッチにまとまる）ことも確認します。
+
+    # 60秒間に国旗リアクション500件
+    python -m bench.reaction_storm --events 500 --duration 60
+    # 結果をベースラインとして保存 / ベースラインと比較（悪化していれば終了コード1）
+    python -m bench.reaction_storm --save-baseline flag_500
+    python -m bench.reaction_storm --compare flag_500
+    # 複数翻訳リアクション（開始/終了）を混ぜる
+    python -m bench.reaction_storm --scenario mixed --range-ratio 0.1 --range-size 30
+"""
+import argparse
+import asyncio
+import contextvars
+import json
+import math
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from types import SimpleNamespace
+from typing import Dict, List, Optional
+
+import config   # config.py から読み込む：相対パスのためエラーとなる可能性がある
+from utils.char_counter import CharCounter
+from web.mock_deepl_server import start_mock_server
+
+BASELINE_DIR = os.path.join(os.path.dirname(__file__), "baselines")
+BOT_USER_ID = 1
+GUILD_ID = 1000
+CHANNEL_ID = 2000
+
+# 比較時に悪化とみなす指標（値が大きいほど悪い）
+REGRESSION_METRICS = ("latency_p95_ms", "latency_p99_ms", "upstream_requests", "discord_calls", "memory_peak_kb")
+
+_SENTENCES = [
+    "Good morning everyone, the raid starts in ten minutes.",
+    "Can someone explain how the new crafting system works?",
+    "I will be late today, please start without me.",
+    "Thanks for the help yesterday, it worked perfectly!",
+    "Does anyone know when the next maintenance is scheduled?",
+    "Please read the pinned message before asking questions.",
+    "We need two more players for the dungeon run tonight.",
+    "Check out this guide: https://example.com/guide and tell me what you think.",
+    "Bonjour à tous, quelqu'un veut jouer ce soir ?",
+    "Ich habe heute keine Zeit, vielleicht morgen.",
+    "¿Alguien sabe cómo conseguir la espada legendaria?",
+    "The event ends at <t:1700000000:F>, don't miss it.",
+]
+
+# 現在処理中のイベント（偽のDiscordへの送信をイベントに紐付けるため）
+_current_event: contextvars.ContextVar = contextvars.ContextVar("current_event", default=None)
+
+
+class EventRecord:
+    """
+    1件のリアクションイベントの計測結果。
+    """
+    def __init__(self, kind: str):
+        self.kind = kind
+        self.started = time.perf_counter()
+        self.finished: Optional[float] = None
+        self.done = asyncio.Event()
+        self.errors = 0
+
+
+    def finish(self) -> None:
+        if self.finished is None:
+            self.finished = time.perf_counter()
+            self.done.set()
+
+        return
+
+
+class DiscordCounter:
+    """
+    偽のDiscordに対する呼び出し回数。
+    """
+    def __init__(self):
+        self.calls: Dict[str, int] = {}
+
+
+    def add(self, name: str) -> None:
+        self.calls[name] = self.calls.get(name, 0) + 1
+
+        return
+
+
+    def total(self) -> int:
+        return sum(self.calls.values())
+
+
+class FakeUser:
+    """
+    discord.User の代わり（display_name, avatar, send のみ）。
+    """
+    def __init__(self, user_id: int, counter: DiscordCounter, latency: float):
+        self.id = user_id
+        self.bot = False
+        self.display_name = f"user{user_id}"
+        self.avatar = None
+        self._counter = counter
+        self._latency = latency
+
+
+    async def send(self, content: str = None, embeds: list = None, **kwargs):
+        self._counter.add("user.send")
+        await asyncio.sleep(self._latency)
+        record = _current_event.get()
+        # 複数翻訳の開始/終了の受付DMは翻訳結果ではないため、完了扱いにしない
+        if record is not None and embeds:
+            if any("[翻訳エラー]" in (embed.description or "") for embed in embeds):
+                record.errors += 1
+        return FakeMessage(0, content or "", self, None, self._counter, self._latency)
+
+
+class FakeMessage:
+    """
+    discord.Message の代わり（id, content, author, remove_reaction, edit, delete のみ）。
+    """
+    def __init__(self, message_id: int, content: str, author: FakeUser, channel: "FakeChannel",
+                 counter: DiscordCounter, latency: float):
+        self.id = message_id
+        self.content = content
+        self.author = author
+        self.channel = channel
+        self.edited_at = None
+        self._counter = counter
+        self._latency = latency
+
+
+    async def remove_reaction(self, emoji, member) -> None:
+        self._counter.add("message.remove_reaction")
+        await asyncio.sleep(self._latency)
+
+        return
+
+
+    async def edit(self, content: str = None, **kwargs) -> None:
+        self._counter.add("message.edit")
+        await asyncio.sleep(self._latency)
+        if content is not None:
+            self.content = content
+
+        return
+
+
+    async def delete(self) -> None:
+        self._counter.add("message.delete")
+
+        return
+
+
+class FakeChannel:
+    """
+    discord.TextChannel の代わり（fetch_message, get_partial_message, send, history のみ）。
+    """
+    def __init__(self, channel_id: int, counter: DiscordCounter, latency: float):
+        self.id = channel_id
+        self.messages: List[FakeMessage] = []
+        self._by_id: Dict[int, FakeMessage] = {}
+        self._counter = counter
+        self._latency = latency
+
+
+    def add_message(self, content: str, author: FakeUser) -> FakeMessage:
+        message = FakeMessage(10000 + len(self.messages), content, author, self, self._counter, self._latency)
+        self.messages.append(message)
+        self._by_id[message.id] = message
+        return message
+
+
+    async def fetch_message(self, message_id: int) -> FakeMessage:
+        self._counter.add("channel.fetch_message")
+        await asyncio.sleep(self._latency)
+        return self._by_id[message_id]
+
+
+    def get_partial_message(self, message_id: int) -> FakeMessage:
+        return self._by_id[message_id]
+
+
+    async def send(self, content: str = None, embeds: list = None, **kwargs) -> FakeMessage:
+        self._counter.add("channel.send")
+        await asyncio.sleep(self._latency)
+        record = _current_event.get()
+        if record is not None:
+            if embeds and any("[翻訳エラー]" in (embed.description or "") for embed in embeds):
+                record.errors += 1
+            # 国旗リアクションは翻訳結果の送信時点を完了とする（送信後は60秒待機して削除するため）
+            record.finish()
+        return FakeMessage(0, content or "", None, self, self._counter, self._latency)
+
+
+    async def history(self, after=None, before=None, limit: int = 100, oldest_first: bool = True):
+        self._counter.add("channel.history")
+        await asyncio.sleep(self._latency)
+        count = 0
+        for message in self.messages:
+            if after is not None and message.id <= after.id:
+                continue
+            if before is not None and message.id >= before.id:
+                break
+            if limit is not None and count >= limit:
+                break
+            count += 1
+            yield message
+
+
+class FakeDiscord:
+    """
+    bot.get_channel / bot.get_user / bot.fetch_user を置き換える偽のDiscord。
+    get_user は常に None（Botが保持するユーザーなし）を返し、fetch_user の呼び出しを計測します。
+    """
+    def __init__(self, num_users: int, num_messages: int, latency: float, seed: int):
+        self.counter = DiscordCounter()
+        self.latency = latency
+        self.users = {user_id: FakeUser(user_id, self.counter, latency) for user_id in range(100, 100 + num_users)}
+        self.channel = FakeChannel(CHANNEL_ID, self.counter, latency)
+        rng = random.Random(seed)
+        authors = list(self.users.values())
+        for i in range(num_messages):
+            text = rng.choice(_SENTENCES)
+            # 一部のメッセージは内容を変えてキャッシュに当たらないようにする
+            if rng.random() < 0.5:
+                text = f"{text} (#{i})"
+            self.channel.add_message(text, rng.choice(authors))
+
+
+    def get_channel(self, channel_id: int):
+        return self.channel if channel_id == self.channel.id else None
+
+
+    def get_user(self, user_id: int) -> Optional[FakeUser]:
+        return None
+
+
+    async def fetch_user(self, user_id: int) -> FakeUser:
+        self.counter.add("bot.fetch_user")
+        await asyncio.sleep(self.latency)
+        return self.users.get(user_id) or FakeUser(user_id, self.counter, self.latency)
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    index = min(len(values) - 1, max(0, math.ceil(pct / 100 * len(values)) - 1))
+    return values[index]
+
+
+def _prepare_environment(data_dir: str) -> None:
+    # 計測用の一時ディレクトリにデータファイルを作成し、実運用のファイルを汚さない
+    config.DATA_DIR = data_dir
+    config.TEMP_DIR = os.path.join(data_dir, "temp")
+    config.EVENTS_FILE = os.path.join(data_dir, "events.json")
+    config.USER_LANG_FILE = os.path.join(data_dir, "user_lang.json")
+    config.CHAR_COUNT_FILE = os.path.join(data_dir, "char_count.json")
+    config.CACHE_DB_FILE = os.path.join(data_dir, "translate_cache.sqlite3")
+    config.PREFETCH_FILE = os.path.join(data_dir, "prefetch.json")
+    config.RANGE_CHECKPOINT_FILE = os.path.join(data_dir, "range_checkpoint.json")
+    counter = CharCounter(config.CHAR_COUNT_FILE)
+    counter.set_count(0)
+    counter.flush()
+
+    return
+
+
+async def run_storm(args: argparse.Namespace) -> dict:
+    """
+    リアクションの集中を再現し、計測結果を返します。
+
+    Returns:
+    ----------
+    result : dict
+        計測結果（スループット、応答時間、上流呼び出し回数、メモリ使用量等）。
+    """
+    import bot_kidou_new
+    import utils.translate_pub as tr
+    from utils.translate_backend import DeepLBackend
+
+    runner = await start_mock_server(
+        "127.0.0.1", args.mock_port,
+        latency_ms=args.deepl_latency_ms, jitter_ms=args.deepl_jitter_ms,
+        error_rate=args.error_rate, throttle_rate=args.throttle_rate,
+        retry_after_sec=args.retry_after_sec, character_limit=10 ** 9, seed=args.seed,
+    )
+    mock_url = "http://127.0.0.1:%d" % runner.addresses[0][1]
+
+    # ハンドラーが参照する Translator と bot を偽の環境に差し替える
+    tran = tr.Translator(
+        api_key="bench",
+        backend=DeepLBackend("bench", api_url=f"{mock_url}/v2/translate", usage_url=f"{mock_url}/v2/usage"),
+    )
+    bot_kidou_new.tran = tran
+    fake = FakeDiscord(args.users, args.messages, args.discord_latency_ms / 1000, args.seed)
+    bot = bot_kidou_new.bot
+    bot._connection.user = SimpleNamespace(id=BOT_USER_ID)
+    bot.get_channel = fake.get_channel
+    bot.get_user = fake.get_user
+    bot.fetch_user = fake.fetch_user
+    await tran.start()
+
+    rng = random.Random(args.seed)
+    flags = list(config.FLAG_MAP.keys())[:args.languages]
+    range_emojis = [("⬆️", "⬇️"), ("▶️", "⏸️")]
+    messages = fake.channel.messages
+    user_ids = list(fake.users.keys())
+
+    records: List[EventRecord] = []
+    tasks: List[asyncio.Task] = []
+
+    def make_payload(user_id: int, message_id: int, emoji: str) -> SimpleNamespace:
+        return SimpleNamespace(user_id=user_id, channel_id=CHANNEL_ID, guild_id=GUILD_ID,
+                               message_id=message_id, emoji=emoji, member=None)
+
+    async def flag_reaction(record: EventRecord, payload: SimpleNamespace) -> None:
+        _current_event.set(record)
+        try:
+            await bot_kidou_new.on_raw_reaction_add(payload)
+        finally:
+            record.finish()
+
+    async def range_reaction(record: EventRecord, start: SimpleNamespace, finish: SimpleNamespace) -> None:
+        # 開始リアクションの受付後に終了リアクションを付け、終了からハンドラー完了までを計測
+        await bot_kidou_new.on_raw_reaction_add(start)
+        _current_event.set(record)
+        record.started = time.perf_counter()
+        try:
+            await bot_kidou_new.on_raw_reaction_add(finish)
+        finally:
+            record.finish()
+
+    tracemalloc.start()
+    interval = args.duration / args.events if args.events else 0
+    started = time.perf_counter()
+    for i in range(args.events):
+        # 一定間隔（ポアソン到着）でリアクションを発生させる
+        await asyncio.sleep(rng.expovariate(1 / interval) if interval else 0)
+        user_id = rng.choice(user_ids)
+        if args.scenario == "mixed" and rng.random() < args.range_ratio:
+            start_index = rng.randrange(0, max(1, len(messages) - args.range_size - 1))
+            finish_index = min(start_index + args.range_size + 1, len(messages) - 1)
+            start_emoji, finish_emoji = rng.choice(range_emojis)
+            record = EventRecord("range")
+            coro = range_reaction(record, make_payload(user_id, messages[start_index].id, start_emoji),
+                                  make_payload(user_id, messages[finish_index].id, finish_emoji))
+        else:
+            # 人気のあるメッセージに反応が集中する（同じメッセージ・言語の重複）
+            index = min(int(rng.paretovariate(1.2)) - 1, len(messages) - 1)
+            record = EventRecord("flag")
+            coro = flag_reaction(record, make_payload(user_id, messages[-1 - index].id, rng.choice(flags)))
+        records.append(record)
+        tasks.append(asyncio.create_task(coro))
+
+    try:
+        await asyncio.wait_for(asyncio.gather(*(record.done.wait() for record in records)), args.timeout)
+    except asyncio.TimeoutError:
+        print(f"タイムアウト: {sum(1 for r in records if r.finished is None)}件が未完了")
+    elapsed = time.perf_counter() - started
+    memory_current, memory_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    # 国旗リアクションの削除待ち（60秒）は計測対象外のため打ち切る
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+    session = tran._get_session()
+    async with session.get(f"{mock_url}/stats") as resp:
+        upstream = await resp.json()
+    await tran.close()
+    await runner.cleanup()
+
+    completed = [r for r in records if r.finished is not None]
+    result = {
+        "scenario": args.scenario,
+        "events": len(records),
+        "completed": len(completed),
+        "timed_out": len(records) - len(completed),
+        "errors": sum(r.errors for r in records),
+        "elapsed_sec": round(elapsed, 3),
+        "throughput_per_sec": round(len(completed) / elapsed, 2) if elapsed else 0.0,
+        "upstream_requests": upstream["requests"],
+        "upstream_budget": round(config.RATE_LIMIT_BURST + config.RATE_LIMIT_PER_SEC * args.duration, 1),
+        "upstream_texts": upstream["texts"],
+        "upstream_characters": upstream["characters"],
+        "upstream_throttled": upstream["throttled"],
+        "upstream_errors": upstream["errors"],
+        "upstream_max_in_flight": upstream["max_in_flight"],
+        "discord_calls": fake.counter.total(),
+        "discord_calls_by_type": dict(sorted(fake.counter.calls.items())),
+        "cache": tran.cache.stats(),
+        "message_cache": bot_kidou_new.message_cache.stats(),
+        "user_cache": bot_kidou_new.user_cache.stats(),
+        "coalesced": tran.coalesced,
+        "retries": tran.retries,
+        "memory_current_kb": round(memory_current / 1024, 1),
+        "memory_peak_kb": round(memory_peak / 1024, 1),
+    }
+    for kind in ("flag", "range"):
+        latencies = [(r.finished - r.started) * 1000 for r in completed if r.kind == kind]
+        if not latencies:
+            continue
+        prefix = "latency" if kind == "flag" else "range_latency"
+        result[f"{prefix}_p50_ms"] = round(_percentile(latencies, 50), 1)
+        result[f"{prefix}_p95_ms"] = round(_percentile(latencies, 95), 1)
+        result[f"{prefix}_p99_ms"] = round(_percentile(latencies, 99), 1)
+        result[f"{prefix}_max_ms"] = round(max(latencies), 1)
+    return result
+
+
+def compare_baseline(result: dict, baseline: dict, tolerance: float) -> List[str]:
+    """
+    ベースラインと比較し、許容範囲を超えて悪化した指標の一覧を返します。
+
+    Parameters:
+    ----------
+    result : dict
+        今回の計測結果。
+    baseline : dict
+        保存済みのベースライン。
+    tolerance : float
+        許容する悪化の割合（0.2 なら20%）。
+
+    Returns:
+    ----------
+    regressions : List[str]
+        悪化した指標の説明。
+    """
+    regressions = []
+    for key in REGRESSION_METRICS + ("range_latency_p95_ms",):
+        if key not in result or key not in baseline:
+            continue
+        before, after = baseline[key], result[key]
+        change = (after - before) / before if before else 0.0
+        print(f"  {key:<24} {before:>12} -> {after:>12} ({change:+.1%})")
+        if change > tolerance:
+            regressions.append(f"{key}: {before} -> {after} ({change:+.1%})")
+    before, after = baseline.get("throughput_per_sec", 0), result.get("throughput_per_sec", 0)
+    if before and (before - after) / before > tolerance:
+        regressions.append(f"throughput_per_sec: {before} -> {after}")
+    return regressions
+
+
+def check_batching(result: dict, tolerance: float) -> List[str]:
+    """
+    翻訳するテキストがレート制限の枠（バースト + 平均レート × 発生時間）を超えた場合に、
+    上流の呼び出し回数が枠内に収まっているか（待機中のバッチに後続のテキストがまとまったか）を確認します。
+
+    Parameters:
+    ----------
+    result : dict
+        今回の計測結果。
+    tolerance : float
+        枠を超えることを許容する割合。
+
+    Returns:
+    ----------
+    failures : List[str]
+        条件を満たさなかった項目の説明。
+    """
+    budget, texts, requests = result["upstream_budget"], result["upstream_texts"], result["upstream_requests"]
+    if texts <= budget:
+        return []
+    if requests > budget * (1 + tolerance):
+        return [f"upstream_requests: {requests} (texts {texts}, budget {budget})"]
+    return []
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="リアクション集中時の負荷試験")
+    parser.add_argument("--scenario", choices=("flag", "mixed"), default="flag")
+    parser.add_argument("--events", type=int, default=500, help="発生させるリアクション数")
+    parser.add_argument("--duration", type=float, default=60, help="リアクションを発生させる時間（秒）")
+    parser.add_argument("--users", type=int, default=200, help="リアクションするユーザー数")
+    parser.add_argument("--messages", type=int, default=300, help="チャンネル内のメッセージ数")
+    parser.add_argument("--languages", type=int, default=6, help="使用する国旗（言語）の種類")
+    parser.add_argument("--range-ratio", type=float, default=0.05, help="mixed時の複数翻訳リアクションの割合")
+    parser.add_argument("--range-size", type=int, default=20, help="複数翻訳1回あたりのメッセージ数")
+    parser.add_argument("--deepl-latency-ms", type=float, default=150)
+    parser.add_argument("--deepl-jitter-ms", type=float, default=50)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--throttle-rate", type=float, default=0.0)
+    parser.add_argument("--retry-after-sec", type=float, default=1.0)
+    parser.add_argument("--discord-latency-ms", type=float, default=40)
+    parser.add_argument("--mock-port", type=int, default=0, help="モックサーバーのポート（0は空きポート）")
+    parser.add_argument("--timeout", type=float, default=300, help="全イベント完了を待つ最大秒数")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--save-baseline", metavar="NAME", help="結果を bench/baselines/NAME.json に保存")
+    parser.add_argument("--compare", metavar="NAME", help="bench/baselines/NAME.json と比較")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="比較時に許容する悪化の割合")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        _prepare_environment(data_dir)
+        result = asyncio.run(run_storm(args))
+    result["params"] = {key: value for key, value in vars(args).items() if key not in ("save_baseline", "compare")}
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+
+    failures = check_batching(result, args.tolerance)
+    if failures:
+        print("レート制限の待機中にバッチがまとまっていません:")
+        for line in failures:
+            print(f"  {line}")
+
+    if args.save_baseline:
+        os.makedirs(BASELINE_DIR, exist_ok=True)
+        path = os.path.join(BASELINE_DIR, f"{args.save_baseline}.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+        print(f"ベースラインを保存: {path}")
+
+    if args.compare:
+        path = os.path.join(BASELINE_DIR, f"{args.compare}.json")
+        with open(path, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        print(f"ベースラインと比較: {path}")
+        regressions = compare_baseline(result, baseline, args.tolerance)
+        if regressions:
+            print("悪化した指標:")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+        print("悪化した指標はありません")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -14,6 +14,8 @@ from discord import app_commands, TextChannel  # ← ここでTextChannelをimpo
 from discord.ext import commands
 
 from utils.translate import translate
+from utils.http_session import close_shared_session, get_shared_session
+from utils.lang_detect import detect_language, is_same_lang
 from utils.lang_settings import load_lang_settings, save_lang_settings
 from web.uptime_server import start_flask
 
@@ -33,7 +35,13 @@ intents = discord.Intents.default()
 intents.message_content = True
 intents.reactions = True
 
-bot = commands.Bot(command_prefix="!", intents=intents)
+class TranslatorBot(commands.Bot):
+    async def close(self):
+        await super().close()
+        await close_shared_session()  # 共有HTTPセッションを終了
+
+
+bot = TranslatorBot(command_prefix="!", intents=intents)
 
 TIMEZONE_CHOICES = [
     discord.app_commands.Choice(name="JST", value="Asia/Tokyo"),
@@ -448,8 +456,6 @@ async def listevents(interaction: discord.Interaction):
 
 
 # DM翻訳（通常テキスト）
-import aiohttp
-
 @bot.event
 async def on_message(message):
     if message.author.bot or not isinstance(message.channel, discord.DMChannel):
@@ -460,35 +466,33 @@ async def on_message(message):
     native_lang = settings.get(user_id, "JA")
     other_lang = "EN" if native_lang != "EN" else "JA"
 
+    # ローカル判定で翻訳先を決定（母国語なら other_lang へ、それ以外は母国語へ）
+    detected = detect_language(message.content)
+    target = other_lang if is_same_lang(detected, native_lang) else native_lang
+
     url = "https://api-free.deepl.com/v2/translate"
     params = {
         "auth_key": DEEPL_API_KEY,
         "text": message.content,
-        "target_lang": "EN",  # とりあえずEN固定（あとで言語検出から切り替えも可）
+        "target_lang": target,
     }
 
-    async with aiohttp.ClientSession() as session:
+    session = get_shared_session()  # 共有セッションを再利用
+    async with session.post(url, data=params) as resp:
+        if resp.status != 200:
+            await message.channel.send("[翻訳エラー]")
+            return
+        data = await resp.json()
+
+    # ローカル判定できず、DeepLの判定が母国語だった場合のみ再度翻訳
+    if detected is None and data["translations"][0]["detected_source_language"] == native_lang:
+        params["target_lang"] = other_lang
         async with session.post(url, data=params) as resp:
             if resp.status != 200:
                 await message.channel.send("[翻訳エラー]")
                 return
             data = await resp.json()
-
-    detected = data["translations"][0]["detected_source_language"]
-    target = other_lang if detected == native_lang else native_lang
-
-    # 再度翻訳（目的の言語に）
-    if target != detected:
-        params["target_lang"] = target
-        async with aiohttp.ClientSession() as session:
-            async with session.post(url, data=params) as resp:
-                if resp.status != 200:
-                    await message.channel.send("[翻訳エラー]")
-                    return
-                data = await resp.json()
-        translated = data["translations"][0]["text"]
-    else:
-        translated = message.content  # もし検出言語＝ターゲットなら翻訳不要
+    translated = data["translations"][0]["text"]
 
     await message.channel.send(translated)
 
@@ -7,11 +7,17 @@ Discrdボット起動ファイル
 import asyncio
 import os
 import json
+import time
 import pytz
 from datetime import datetime, timedelta
 from dotenv import load_dotenv
 from threading import Thread
 
+# 起動時間の計測（モジュール読み込み開始からの経過秒数）
+STARTUP_AT = time.perf_counter()
+STARTUP_TIMINGS = {}
+BACKGROUND_TASKS = set()  # 起動後のバックグラウンド処理（タスクの参照を保持）
+
 import discord
 from discord import app_commands, TextChannel  # ← ここでTextChannelをimport
 from discord.ext import commands
@@ -19,12 +25,22 @@ from discord.ext import commands
 # 関連pythonファイルのロード
 import config  # config.py をインポート
 import utils.translate_pub as tr
+from utils.embed_utils import build_multi_translation_embed, build_translation_embeds, pack_embeds
+from utils.message_cache import MessageCache
+from utils.prefetch import PrefetchManager
+from utils.quota import QuotaExceededError
+from utils.range_translate import RangeCheckpointStore, iter_range_messages, translate_range
+from utils.text_protect import has_translatable_text
 from utils.translate import translate
+from utils.translate_queue import PRIORITY_PREFETCH, QueueSaturatedError
+from utils.user_cache import UserCache
 from utils.lang_settings import load_lang_settings, save_lang_settings
 from web.uptime_server import start_flask
 
 
 TRANSLATE_MESSAGE_DICT = {}
+PREFETCH_TASKS = set()  # 実行中の先読み翻訳（タスクの参照を保持）
+USER_LANGS_CACHE = None  # 先読み用のユーザーの母国語設定の一覧（初回読み込み後は /setlang で更新）
 
 
 # 関連フォルダ・ファイルの初期化
@@ -50,8 +66,24 @@ def ensure_data_files():
     return
 
 
-# 翻訳用インスタンス作成
-tran = tr.Translator(api_key=config.DEEPL_API_KEY, char_count_file=config.CHAR_COUNT_FILE)
+# 翻訳用インスタンス作成（ファイル・ネットワークへのアクセスは setup_hook 以降に非同期で行う）
+# DEEPL_API_KEYS を設定した場合は複数キーを使い分ける
+tran = tr.Translator(api_key=config.DEEPL_API_KEY, char_count_file=config.CHAR_COUNT_FILE,
+                     api_keys=config.DEEPL_API_KEYS)
+# 先読み翻訳の管理（チャンネルごとのオプトイン）
+prefetcher = PrefetchManager(
+    config.PREFETCH_FILE,
+    max_langs=config.PREFETCH_MAX_LANGS,
+    min_requests=config.PREFETCH_MIN_REQUESTS,
+    hourly_char_budget=config.PREFETCH_HOURLY_CHARS,
+    max_chars=config.PREFETCH_MAX_CHARS,
+)
+# リアクション翻訳用のメッセージキャッシュ（on_message で登録し、編集・削除で更新）
+message_cache = MessageCache(max_entries=config.MESSAGE_CACHE_MAX_ENTRIES)
+# リアクションしたユーザーの表示名・アイコンのキャッシュ
+user_cache = UserCache(ttl_sec=config.USER_CACHE_TTL_SEC, max_entries=config.USER_CACHE_MAX_ENTRIES)
+# 範囲翻訳の進捗（中断後の再開用）
+range_checkpoints = RangeCheckpointStore(config.RANGE_CHECKPOINT_FILE)
 
 # Botの権限の設定
 intents = discord.Intents.default()
@@ -60,16 +92,27 @@ intents.message_content = True # メッセージの内容を取得する権限
 intents.messages = True
 intents.reactions = True
 
+class TranslatorBot(commands.Bot):
+    """
+    翻訳用インスタンスのライフサイクル（HTTPセッション等）をBotの起動/終了に連動させるBotクラス。
+    """
+    async def setup_hook(self):
+        await tran.start()  # 共有HTTPセッションを作成（キャッシュ読み込みはバックグラウンド）
+        STARTUP_TIMINGS["setup_hook"] = time.perf_counter() - STARTUP_AT
+
+    async def close(self):
+        await super().close()
+        await tran.close()  # 共有HTTPセッションを終了
+        prefetcher.save()   # 先読みの言語の統計を保存
+
+
 # Botをインスタンス化
-bot = commands.Bot(
+bot = TranslatorBot(
     command_prefix="!", # $コマンド名　でコマンドを実行できるようになる
     # case_insensitive=True, # コマンドの大文字小文字を区別しない ($hello も $Hello も同じ!)
     intents=intents # 権限を設定
 )
 
-# Flaskサーバーを別スレッドで起動
-Thread(target=start_flask, daemon=True).start()
-
 def load_events(guild_id=None):
     # DATA_DIR の存在確認と作成は config.py で実行される
     if not os.path.exists(config.EVENTS_FILE):
@@ -201,6 +244,14 @@ async def event_checker(bot):
 
 @bot.event
 async def on_ready():
+    # 初回接続時のみ起動時間を記録し、DeepL上の使用量との同期をバックグラウンドで実行
+    if "ready" not in STARTUP_TIMINGS:
+        STARTUP_TIMINGS["ready"] = time.perf_counter() - STARTUP_AT
+        print("⏱️ 起動時間: " + ", ".join(f"{name} {sec:.2f}秒" for name, sec in STARTUP_TIMINGS.items()))
+        task = asyncio.create_task(tran.check_deepl_count())
+        BACKGROUND_TASKS.add(task)
+        task.add_done_callback(BACKGROUND_TASKS.discard)
+
     ensure_data_files()          # ここで初期化処理を呼ぶ
     try:
         # 特定のギルドIDを指定する場合 (テスト用にコメントアウト)
@@ -217,12 +268,119 @@ async def on_ready():
 @app_commands.choices(lang=config.LANG_CHOICES) # configから参照
 async def setlang(interaction: discord.Interaction, lang: discord.app_commands.Choice[str]):
     user_id = str(interaction.user.id)
+    global USER_LANGS_CACHE
     data = load_lang_settings()
     data[user_id] = lang.value
     save_lang_settings(data)
+    USER_LANGS_CACHE = list(data.values())  # 先読み用の一覧も更新
     await interaction.response.send_message(f"✅ あなたの母国語を {lang.name} に設定しました！", ephemeral=True)
 
 
+@bot.tree.command(name="usage", description="翻訳文字数の使用状況を表示します")
+async def usage(interaction: discord.Interaction):
+    guild_id = str(interaction.guild_id) if interaction.guild_id else None
+    usage_data = tran.quota.usage(user_id=str(interaction.user.id), guild_id=guild_id)
+    labels = {"user": "あなた", "guild": "このサーバー", "global": "全体", "monthly": "今月（DeepL）"}
+
+    embed = discord.Embed(title="翻訳文字数の使用状況", color=discord.Color.blue())
+    for scope in ("user", "guild", "global", "monthly"):
+        if scope not in usage_data:
+            continue
+        used = usage_data[scope]["used"]
+        limit = usage_data[scope]["limit"]
+        embed.add_field(
+            name=labels[scope],
+            value=f"{used:,} / {limit:,}" if limit else f"{used:,} / 無制限",
+            inline=False
+        )
+    await interaction.response.send_message(embed=embed, ephemeral=True)
+
+
+@bot.tree.command(name="translate_multi", description="テキストを複数の言語に翻訳して1つのメッセージで投稿します")
+@app_commands.describe(
+    text="翻訳するテキスト",
+    langs=f"翻訳先の言語コード（カンマ区切り、例: {config.MULTI_DEFAULT_LANGS}）"
+)
+async def translate_multi(interaction: discord.Interaction, text: str, langs: str = config.MULTI_DEFAULT_LANGS):
+    supported = {choice.value for choice in config.LANG_CHOICES} | set(config.FLAG_MAP.values())
+    target_langs = list(dict.fromkeys(lang.strip().upper() for lang in langs.split(",") if lang.strip()))
+    invalid = [lang for lang in target_langs if lang not in supported]
+    if invalid or not target_langs:
+        await interaction.response.send_message(f"❌ 対応していない言語コードです: {', '.join(invalid) or langs}", ephemeral=True)
+        return
+    if len(target_langs) > config.MULTI_MAX_LANGS:
+        await interaction.response.send_message(f"❌ 一度に翻訳できるのは {config.MULTI_MAX_LANGS} 言語までです。", ephemeral=True)
+        return
+
+    await interaction.response.defer()
+    guild_id = str(interaction.guild_id) if interaction.guild_id else None
+    # すべての言語を並行して翻訳（DeepLの待ち時間は約1回分）
+    results = await tran.translate_many(text, target_langs, user_id=str(interaction.user.id), guild_id=guild_id)
+
+    # 言語ごとに国旗を表示（FLAG_MAP の最初の国旗）
+    labels = {}
+    for flag, lang in config.FLAG_MAP.items():
+        labels.setdefault(lang, f"{flag} {lang}")
+    user = interaction.user
+    embed = build_multi_translation_embed(results, user.display_name, user.display_avatar.url, labels)
+    await interaction.followup.send(embed=embed)
+
+
+@bot.tree.command(name="prefetch", description="このチャンネルの先読み翻訳（新しいメッセージの事前翻訳）を切り替えます")
+@app_commands.describe(enabled="有効にする場合は True")
+@app_commands.default_permissions(manage_channels=True)
+@app_commands.guild_only()
+async def prefetch(interaction: discord.Interaction, enabled: bool):
+    prefetcher.set_enabled(interaction.channel_id, enabled)
+    if not enabled:
+        await interaction.response.send_message("⏹️ このチャンネルの先読み翻訳を無効にしました。", ephemeral=True)
+        return
+
+    langs = prefetcher.target_langs(interaction.channel_id, "", await get_user_langs())
+    await interaction.response.send_message(
+        f"✅ このチャンネルの先読み翻訳を有効にしました。\n"
+        f"先読みする言語: {', '.join(langs) if langs else '（国旗リアクションの実績から学習します）'}\n"
+        f"上限: 1時間あたり {prefetcher.hourly_char_budget:,} 文字",
+        ephemeral=True
+    )
+
+
+async def get_user_langs():
+    """
+    ユーザーの母国語設定の一覧を返します（先読みの言語の選択用）。
+    チャンネルのメッセージごとにファイルを読まないよう、初回のみ別スレッドで読み込んで保持します。
+    """
+    global USER_LANGS_CACHE
+    if USER_LANGS_CACHE is None:
+        USER_LANGS_CACHE = list((await asyncio.to_thread(load_lang_settings)).values())
+    return USER_LANGS_CACHE
+
+
+async def prefetch_message(message):
+    """
+    新しいメッセージを、チャンネルでよく依頼される言語へ事前に翻訳してキャッシュします。
+    国旗リアクション時はキャッシュから即座に返せるようになります。
+    """
+    text = message.content
+    if not has_translatable_text(text) or len(text) > prefetcher.max_chars or tran.breaker.is_open():
+        return
+
+    langs = prefetcher.target_langs(message.channel.id, text, await get_user_langs())
+    for lang in langs:
+        if tran.is_cached(text, lang):
+            continue
+        # 1時間あたりの上限を超える場合は先読みしない
+        if not prefetcher.try_consume(len(text)):
+            return
+        try:
+            await tran.translate(text, lang, priority=PRIORITY_PREFETCH)
+        except (QueueSaturatedError, QuotaExceededError):
+            # 混雑時・文字数の上限に達した場合は先読みを見送る
+            return
+
+    return
+
+
 @bot.tree.command(name="create_timestamp", description="指定した日付と時刻をタイムゾーン付きで表示します")
 @app_commands.choices(timezone=config.TIMEZONE_CHOICES) # configから参照
 async def create_timestamp(
@@ -454,18 +612,35 @@ async def listevents(interaction: discord.Interaction):
 # BotへのDMに返信
 @bot.event
 async def on_message(message):
-    # ボット、チャンネルからのDMは無視
-    if message.author.bot or not isinstance(message.channel, discord.DMChannel):
+    # チャンネルのメッセージはリアクション翻訳用にキャッシュ
+    if not isinstance(message.channel, discord.DMChannel) and message.author != bot.user:
+        message_cache.put(message)
+    # ボットからのメッセージは無視
+    if message.author.bot:
+        return
+    # チャンネルのメッセージは、先読みが有効な場合のみ事前に翻訳
+    if not isinstance(message.channel, discord.DMChannel):
+        if prefetcher.is_enabled(message.channel.id):
+            task = asyncio.create_task(prefetch_message(message))
+            PREFETCH_TASKS.add(task)
+            task.add_done_callback(PREFETCH_TASKS.discard)
+        return
+    # 翻訳する文字がないメッセージ（スタンプ・添付のみ等）は無視
+    if not has_translatable_text(message.content):
         return
 
     user_id = str(message.author.id)
     settings = load_lang_settings()
     native_lang = settings.get(user_id, config.DEFAULT_LANG) # config.py から読み込む
     other_lang = "EN" if native_lang != "EN" else config.DEFAULT_LANG # config.py から読み込む
-    target_lang = native_lang
-
-    # ユーザーの母国語に翻訳
-    translated_text, source_lang = await tran.translate(message.content, target_lang)
+    # ローカル判定で翻訳先を決定（母国語なら other_lang へ、それ以外は母国語へ）
+    target_lang = tran.pick_target_lang(message.content, native_lang, other_lang)
+
+    # 判定した言語に翻訳
+    translated_text, source_lang = await tran.translate(message.content, target_lang, user_id=user_id)
+    # ローカル判定できず、DeepLの判定が母国語だった場合のみ再度翻訳
+    if target_lang == native_lang and source_lang == native_lang:
+        translated_text, source_lang = await tran.translate(message.content, other_lang, user_id=user_id)
     await message.channel.send(translated_text)
     # await bot.process_commands(message)
 
@@ -484,44 +659,57 @@ async def on_raw_reaction_add(payload):
         print("チャンネルではありません")
         return
 
-    # リアクション元メッセージを取得
-    message = await channel.fetch_message(payload.message_id)
-
     # 翻訳対応の国旗リアクションの場合
     if str(payload.emoji) in config.FLAG_MAP: # config.py から読み込む
         wait_sec_delete = 60
+        # リアクション元メッセージの本文を取得（キャッシュ・discord.py のキャッシュにない場合のみREST APIで取得）
+        cached = await message_cache.fetch(bot, channel, payload.message_id)
+        # リアクション削除にはメッセージIDのみ使用するため、取得せずに参照を作成
+        message = channel.get_partial_message(payload.message_id)
+        # 翻訳する文字がないメッセージ（Embed・スタンプのみ等）は無視
+        if not has_translatable_text(cached.content):
+            return
         try:
             # 国旗の言語に翻訳
             target_lang = config.FLAG_MAP[str(payload.emoji)]  # config.py から読み込む
-            translated_text, source_lang = await tran.translate(message.content, target_lang)
-            # リアクションを削除
-            user = await bot.fetch_user(payload.user_id)
-            await message.remove_reaction(payload.emoji, user)
-
-            # 送信メッセージを作成
-            send_embed = discord.Embed(
-                description=translated_text,
-                color=discord.Color.teal()
+            prefetcher.record_request(payload.channel_id, target_lang)  # 先読みする言語の学習用
+            translated_text, source_lang = await tran.translate(
+                cached.content, target_lang,
+                user_id=str(payload.user_id), guild_id=str(payload.guild_id) if payload.guild_id else None
             )
-            send_embed.set_author(
-                name=user.display_name,
-                icon_url=user.avatar.url if user.avatar else None
+            # リアクションを削除（ユーザー情報はキャッシュ・payload.member を優先し、ない場合のみ取得）
+            profile = await user_cache.resolve(bot, payload.user_id, payload.member, payload.guild_id)
+            await message.remove_reaction(payload.emoji, profile.user)
+
+            # 翻訳に失敗した場合はチャンネルに投稿せず、リアクションしたユーザーにのみ通知
+            if source_lang == "ERROR":
+                print(f"リアクション翻訳エラー: {translated_text}")
+                await profile.user.send(translated_text)
+                return
+
+            # 送信メッセージを作成（長文はEmbedの文字数制限内でページ分割）
+            send_embeds = build_translation_embeds(
+                translated_text,
+                profile.display_name,
+                profile.avatar_url
             )
-            send_message = await channel.send(embed=send_embed)  # 送信メッセージを保存
+            send_messages = [await channel.send(embeds=embeds) for embeds in pack_embeds(send_embeds)]  # 送信メッセージを保存
 
             await asyncio.sleep(wait_sec_delete)
-            await send_message.delete()  # 60秒後に翻訳メッセージ削除
+            for send_message in send_messages:
+                await send_message.delete()  # 60秒後に翻訳メッセージ削除
 
         except Exception as err:
             print(f"リアクション翻訳エラー: {err}")
 
     # 複数翻訳対応リアクションの場合
     if str(payload.emoji) in config.REACTION_DICT:
-        max_select_msg = 100  # 最大選択メッセージ数
         global TRANSLATE_MESSAGE_DICT
         type_reaction = config.REACTION_DICT[str(payload.emoji)]
+        # 範囲の開始/終了には投稿者・投稿日時等も必要なため、メッセージ全体を取得（discord.py のキャッシュを優先）
+        message = await message_cache.fetch_message(bot, channel, payload.message_id)
         user_id = str(payload.user_id) # ユーザーIDを取得
-        user = await bot.fetch_user(payload.user_id) # payloadから直接user_idを取得
+        user = (await user_cache.resolve(bot, payload.user_id, payload.member, payload.guild_id)).user # キャッシュ・payload.member を優先
 
         # ユーザーごとの辞書が存在しない場合は初期化
         if user_id not in TRANSLATE_MESSAGE_DICT:
@@ -529,7 +717,8 @@ async def on_raw_reaction_add(payload):
                 "start": None,
                 "start_emoji": "",
                 "finish": None,
-                "finish_emoji": ""
+                "finish_emoji": "",
+                "as_file": False
             }
 
         user_translate_data = TRANSLATE_MESSAGE_DICT[user_id]
@@ -546,6 +735,7 @@ async def on_raw_reaction_add(payload):
             print(f"リアクション絵文字: {str(payload.emoji)} , {type_reaction}")
             user_translate_data["finish"] = message
             user_translate_data["finish_emoji"] = str(payload.emoji)
+            user_translate_data["as_file"] = type_reaction.endswith("ファイル")
             await user.send(f"複数翻訳リアクションを検知: {str(payload.emoji)} , {type_reaction}")
 
         # 開始/終了の2つのリアクションが揃ったら翻訳実行
@@ -556,46 +746,45 @@ async def on_raw_reaction_add(payload):
             target_lang = lang_settings.get(user_id, config.DEFAULT_LANG) # user_idを文字列に変換
             msg_target_start = user_translate_data["start"]
             msg_target_finish = user_translate_data["finish"]
-
-            target_msg_list = []
-            # 開始リアクションのメッセージを翻訳対象に追加
-            target_msg_list.append(msg_target_start)
-            counter = 0
-            # 開始/終了リアクション内の複数メッセージを翻訳対象に追加
-            async for msg_history_item in channel.history(after=msg_target_start, before=msg_target_finish, limit=max_select_msg): # 変数名を変更
-                counter += 1
-                if counter <= max_select_msg:
-                    target_msg_list.append(msg_history_item) # 変数名を変更
-                else:
-                    print(f"一度に翻訳可能なメッセージ数を超過しました: {counter}")
-
-            # 終了リアクションのメッセージを翻訳対象に追加
-            target_msg_list.append(msg_target_finish)
+            as_file = user_translate_data.get("as_file", False)
 
             try:
-                # 翻訳対象を順次翻訳してDM送信
-                for msg_to_translate in target_msg_list: # 変数名を変更
-                    # 送信メッセージのユーザーを取得
-                    user_author = await bot.fetch_user(msg_to_translate.author.id) # 変数名を変更
-                    origin_text = msg_to_translate.content # 変数名を変更
-                    print(f"翻訳実行: {origin_text}")
-                    translated_text, source_lang = await tran.translate(origin_text, target_lang)
-                    print(f"翻訳後　: {translated_text}")
-
-                    # 送信メッセージを作成
-                    send_embed = discord.Embed(
-                        description=translated_text,
-                        color=discord.Color.teal()
-                    )
-                    send_embed.set_author(
-                        name=user_author.display_name,
-                        icon_url=user_author.avatar.url if user_author.avatar else None
-                    )
-                    await user.send(embed=send_embed)   # ユーザーにDM送信
+                # 同じ範囲の翻訳が中断されていれば続きから再開
+                job = {
+                    "channel_id": channel.id,
+                    "start_id": msg_target_start.id,
+                    "finish_id": msg_target_finish.id,
+                    "target_lang": target_lang,
+                    "as_file": as_file,
+                }
+                resume_id = range_checkpoints.get(user_id, job)
+                if resume_id is not None:
+                    await user.send("前回中断した位置から複数翻訳を再開します。")
+
+                # 開始〜終了のメッセージを履歴から順に読み込み、ウィンドウごとに並行して翻訳して送信
+                # （進捗は1つのメッセージを編集して表示）
+                result = await translate_range(
+                    tran, user, iter_range_messages(channel, msg_target_start, msg_target_finish, resume_id),
+                    target_lang, user_id=user_id,
+                    guild_id=str(payload.guild_id) if payload.guild_id else None,
+                    concurrency=config.RANGE_TRANSLATE_CONCURRENCY,
+                    window_size=config.RANGE_WINDOW_SIZE,
+                    progress_interval_sec=config.RANGE_PROGRESS_INTERVAL_SEC,
+                    max_messages=config.RANGE_MAX_MESSAGES,
+                    as_file=as_file,
+                    temp_dir=config.TEMP_DIR,
+                    file_max_bytes=config.RANGE_FILE_MAX_BYTES,
+                    max_consecutive_errors=config.RANGE_MAX_CONSECUTIVE_ERRORS,
+                    on_checkpoint=lambda last_id: range_checkpoints.update(user_id, job, last_id)
+                )
+                print(f"複数翻訳: {result['translated']}件, エラー {result['errors']}件, "
+                      f"送信 {result['messages_sent']}件, {result['elapsed_sec']:.1f}秒")
+                if result["aborted"] is None:
+                    range_checkpoints.clear(user_id)
 
                 # 最大翻訳数超過時は警告をDM
-                if counter >= max_select_msg:
-                    await user.send(f"翻訳メッセージ数が最大値を超えました: {counter} / {max_select_msg}")
+                if result["truncated"]:
+                    await user.send(f"翻訳メッセージ数が最大値に達しました: {config.RANGE_MAX_MESSAGES}件")
 
             except Exception as err:
                 print(f"エラー発生: {err}")
@@ -623,12 +812,53 @@ async def on_raw_reaction_add(payload):
     return
 
 
+# メッセージ編集時はキャッシュを更新（本文が含まれない場合は無効化、DMは対象外）
+@bot.event
+async def on_raw_message_edit(payload):
+    message_cache.apply_edit(payload.message_id, payload.data)
+
+    return
+
+
+# メッセージ削除時はキャッシュから削除
+@bot.event
+async def on_raw_message_delete(payload):
+    message_cache.invalidate(payload.message_id)
+
+    return
+
+
+@bot.event
+async def on_raw_bulk_message_delete(payload):
+    for message_id in payload.message_ids:
+        message_cache.invalidate(message_id)
+
+    return
+
+
+# 表示名・アイコンの変更時はユーザー情報のキャッシュを削除
+@bot.event
+async def on_user_update(before, after):
+    user_cache.invalidate(after.id)
+
+    return
+
+
+@bot.event
+async def on_member_update(before, after):
+    user_cache.invalidate(after.id, after.guild.id)
+
+    return
+
+
 @bot.event
 async def on_connect():
     bot.loop.create_task(event_checker(bot))
 
 
 if __name__ == "__main__": # 直接実行された場合のみボットを起動
+    # Flaskサーバーを別スレッドで起動
+    Thread(target=start_flask, daemon=True).start()
     if config.DISCORD_TOKEN:
         bot.run(config.DISCORD_TOKEN) # configから参照
     else:
@@ -1,21 +1,23 @@
 # bot_thread.py
+import asyncio
 import discord
-import requests
 import os
-import json
-from datetime import datetime
 from dotenv import load_dotenv
 import threading
+import utils.translate_pub as tr
 
 load_dotenv()
 DISCORD_TOKEN = os.getenv("DISCORD_TOKEN")
 DEEPL_API_KEY = os.getenv("DEEPL_API_KEY")
-DEEPL_API_URL = "https://api-free.deepl.com/v2/translate"
 
 CHAR_COUNT_FILE = "char_count.json"
 DEFAULT_LANG = "JA"
 user_lang = DEFAULT_LANG
 
+# 翻訳待ちメッセージのキュー設定（満杯の場合は新しいメッセージを破棄して応答性を保つ）
+MESSAGE_QUEUE_SIZE = 100
+TRANSLATE_WORKERS = 4
+
 on_bot_ready_callback = None
 
 def set_on_ready_callback(func):
@@ -26,70 +28,83 @@ def set_user_language(lang_code):
     global user_lang
     user_lang = lang_code
 
-intents = discord.Intents.default()
-intents.message_content = True
-client = discord.Client(intents=intents)
+# 翻訳用インスタンス作成（共有セッション・キャッシュ・言語判定を利用）
+# ファイル・ネットワークへのアクセスは setup_hook 以降に非同期で行う
+tran = tr.Translator(api_key=DEEPL_API_KEY, char_count_file=CHAR_COUNT_FILE)
 
-def load_char_count():
-    if not os.path.exists(CHAR_COUNT_FILE):
-        return {"month": datetime.now().strftime("%Y-%m"), "count": 0}
-    with open(CHAR_COUNT_FILE, "r", encoding="utf-8") as f:
-        return json.load(f)
-
-def save_char_count(data):
-    with open(CHAR_COUNT_FILE, "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
-
-def update_char_count(added_chars):
-    data = load_char_count()
-    current_month = datetime.now().strftime("%Y-%m")
-    if data.get("month") != current_month:
-        data = {"month": current_month, "count": 0}
-    data["count"] += added_chars
-    save_char_count(data)
 
-# 🌍 翻訳処理（ユーザー言語に合わせて相互翻訳）
-def translate_text(text):
-    response = requests.post(DEEPL_API_URL, data={
-        "auth_key": DEEPL_API_KEY,
-        "text": text,
-        "target_lang": user_lang
-    })
+class TranslatorClient(discord.Client):
+    """
+    翻訳キューとワーカーのライフサイクルをクライアントの起動/終了に連動させるクラス。
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.message_queue = None
+        self.workers = []
+        self.usage_task = None
+
+    async def setup_hook(self):
+        await tran.start()
+        self.message_queue = asyncio.Queue(maxsize=MESSAGE_QUEUE_SIZE)
+        self.workers = [asyncio.create_task(translate_worker(self.message_queue)) for _ in range(TRANSLATE_WORKERS)]
 
-    if response.status_code != 200:
-        return "翻訳エラー（言語判定失敗）"
+    async def close(self):
+        for worker in self.workers:
+            worker.cancel()
+        await super().close()
+        await tran.close()
 
-    detected_lang = response.json()["translations"][0]["detected_source_language"]
 
-    # 設定言語だったら別言語へ、そうでなければ設定言語へ
-    target_lang = "EN" if detected_lang == user_lang else user_lang
+intents = discord.Intents.default()
+intents.message_content = True
+client = TranslatorClient(intents=intents)
+
+def load_char_count():
+    # UIスレッドから参照されるため、メモリ上のカウントを返す
+    return tran.char_counter.snapshot()
 
-    second_response = requests.post(DEEPL_API_URL, data={
-        "auth_key": DEEPL_API_KEY,
-        "text": text,
-        "target_lang": target_lang
-    })
+# 🌍 翻訳処理（ユーザー言語に合わせて相互翻訳）
+async def translate_text(text):
+    # ローカル判定で翻訳先を決定（設定言語だったら別言語へ、そうでなければ設定言語へ）
+    target_lang = tran.pick_target_lang(text, user_lang, "EN")
+    translated_text, source_lang = await tran.translate(text, target_lang)
 
-    if second_response.status_code != 200:
-        return "翻訳エラー（再翻訳失敗）"
+    # ローカル判定できず、DeepLの判定が設定言語だった場合のみ再翻訳
+    if target_lang == user_lang and source_lang == user_lang:
+        translated_text, source_lang = await tran.translate(text, "EN")
 
-    translated_text = second_response.json()["translations"][0]["text"]
-    update_char_count(len(text))
     return translated_text
 
+async def translate_worker(queue):
+    while True:
+        message = await queue.get()
+        try:
+            translated_text = await translate_text(message.content)
+            if translated_text:
+                await message.reply(f"{translated_text}")
+        except Exception as e:
+            print(f"翻訳エラー: {e}")
+        finally:
+            queue.task_done()
+
 @client.event
 async def on_ready():
     print(f"✅ Logged in as {client.user}")
+    # DeepL上の使用量との同期はバックグラウンドで実行（初回接続時のみ）
+    if client.usage_task is None:
+        client.usage_task = asyncio.create_task(tran.check_deepl_count())
     if on_bot_ready_callback:
         on_bot_ready_callback()
 
 @client.event
 async def on_message(message):
-    if message.author.bot:
+    if message.author.bot or not message.content:
         return
-    translated_text = translate_text(message.content)
-    if translated_text:
-        await message.reply(f"{translated_text}")
+    # イベントループを塞がないよう、翻訳はワーカーに任せる
+    try:
+        client.message_queue.put_nowait(message)
+    except asyncio.QueueFull:
+        print(f"翻訳キューが満杯のためメッセージを破棄: {message.id}")
 
 def start_bot():
     def run():
@@ -9,10 +9,14 @@ TEMP_DIR = "tmp"
 EVENTS_FILE = "events.json"
 CHAR_COUNT_FILE = "char_count.json"
 USER_LANG_FILE = "user_lang.json"
+CACHE_DB_FILE = "translate_cache.sqlite3"
+PREFETCH_FILE = "prefetch.json"
+RANGE_CHECKPOINT_FILE = "range_checkpoint.json"
 
 # Key Params
 DISCORD_TOKEN = "XXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXX"
 DEEPL_API_KEY = "XXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXX"
+DEEPL_API_KEYS = []     # 複数キーを使い分ける場合（環境変数 DEEPL_API_KEYS にカンマ区切り、":fx" で終わるキーはFree版）
 
 # Discord Settings
 TIMEZONE_CHOICES = [
@@ -66,15 +70,109 @@ FLAG_MAP = {
 
 REACTION_DICT = {
     "⬆️": "開始", "⬇️": "終了",
-    "▶️": "開始1", "⏸️": "終了2"
+    "▶️": "開始1", "⏸️": "終了2",
+    "📝": "終了ファイル"   # 翻訳結果をテキストファイルで受け取る
 }
 
 # DeepL API
 DEEPL_API_URL = "https://api-free.deepl.com/v2/translate"
 DEEPL_USAGE_URL = "https://api-free.deepl.com/v2/usage"
+# Pro版のキーは以下のURLを使用（DEEPL_API_URL / DEEPL_USAGE_URL を変更した場合は全キーがそちらを使用）
+DEEPL_PRO_API_URL = "https://api.deepl.com/v2/translate"
+DEEPL_PRO_USAGE_URL = "https://api.deepl.com/v2/usage"
 CHAR_LIMIT = 500000
+CHAR_COUNT_FLUSH_SEC = 30   # 文字数カウントをファイルへ書き出す間隔（秒）
 DEFAULT_LANG = "JA"
 
+# HTTP接続設定（DeepL等への共有セッション）
+HTTP_POOL_LIMIT = 20            # コネクションプール全体の最大接続数
+HTTP_POOL_LIMIT_PER_HOST = 10   # 同一ホストへの最大接続数
+HTTP_KEEPALIVE_SEC = 60         # アイドル接続を保持する秒数
+HTTP_TIMEOUT_SEC = 15           # 1リクエスト全体のタイムアウト秒数
+HTTP_CONNECT_TIMEOUT_SEC = 5    # 接続確立のタイムアウト秒数
+
+# 翻訳キャッシュ設定（メモリ）
+CACHE_MAX_ENTRIES = 5000                # 最大エントリ数
+CACHE_MAX_BYTES = 16 * 1024 * 1024      # 最大メモリ使用量（バイト、概算）
+CACHE_TTL_SEC = 24 * 60 * 60            # 有効期間（秒）
+
+# 翻訳キャッシュ設定（SQLiteによる永続化）
+CACHE_DB_MAX_BYTES = 50 * 1024 * 1024   # 圧縮後の最大保存サイズ（バイト）
+CACHE_DB_TTL_SEC = 30 * 24 * 60 * 60    # 有効期間（秒）
+CACHE_WARM_ENTRIES = 2000               # 起動時にメモリへ読み込む件数
+
+# 翻訳メモリ（よく似た短いメッセージの翻訳結果を再利用）
+TM_MAX_ENTRIES = 20000              # 保持する最大エントリ数
+TM_MAX_CHARS = 200                  # 対象とする最大文字数
+TM_SIMILARITY_THRESHOLD = 1.0       # 類似一致とみなす類似度（1.0で正規化後の完全一致のみ。1.0未満でも単語が同じ文のみ一致）
+TM_MIN_FUZZY_CHARS = 8              # 類似一致の対象とする最小文字数
+
+# 先読み翻訳（チャンネルごとのオプトイン）
+PREFETCH_MAX_LANGS = 3              # 1メッセージあたりの先読みする最大言語数
+PREFETCH_MIN_REQUESTS = 3           # 先読みの対象とする言語の最小リアクション数
+PREFETCH_HOURLY_CHARS = 20000       # 1時間あたりの先読みの最大翻訳文字数
+PREFETCH_MAX_CHARS = 1000           # 先読みの対象とするメッセージの最大文字数
+
+# DeepLリクエストのバッチ設定
+BATCH_MAX_SIZE = 25         # 1リクエストにまとめる最大テキスト数（DeepLの上限は50）
+BATCH_MAX_WAIT_MS = 10      # 送信の許可（レート制限）を取りに行くまでの最大待ち時間（ミリ秒。許可を待つ間もまとめる）
+BATCH_MAX_CHARS = 30000     # 1リクエストにまとめる最大文字数
+BATCH_MAX_BYTES = 120 * 1024  # 1リクエストの最大サイズ（URLエンコード後のバイト数。DeepLの上限は128KiB）
+
+# DeepLリクエストのレート制限・リトライ設定
+RATE_LIMIT_PER_SEC = 5      # 1秒あたりの平均リクエスト数
+RATE_LIMIT_BURST = 10       # 許可するバースト数
+CONCURRENCY_MIN = 1         # 同時リクエスト数の下限（スロットリング時）
+CONCURRENCY_MAX = 8         # 同時リクエスト数の上限
+RETRY_MAX_ATTEMPTS = 5      # 最大試行回数
+RETRY_DEADLINE_SEC = 20     # リトライを含めた最大待ち時間（秒）
+RETRY_BASE_DELAY_SEC = 0.5  # リトライ待機時間の初期値（秒）
+RETRY_MAX_DELAY_SEC = 8     # リトライ待機時間の上限（秒）
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504, 529)  # リトライ対象のHTTPステータス
+
+# DeepL障害時のサーキットブレーカー設定
+CIRCUIT_FAILURE_THRESHOLD = 5       # 連続でこの回数失敗すると翻訳APIの呼び出しを停止
+CIRCUIT_RESET_SEC = 30              # 停止してから試行（half-open）を再開するまでの秒数
+CIRCUIT_HALF_OPEN_PROBES = 1        # 試行時に同時に送信するリクエスト数
+
+# 翻訳処理の優先度スケジューリング設定
+SCHEDULER_MAX_ACTIVE = 16           # 全体の同時実行数
+SCHEDULER_MAX_BULK_ACTIVE = 8       # 一括処理（範囲翻訳）の同時実行数
+SCHEDULER_MAX_BULK_WAITING = 200    # 一括処理の待機数の上限（超えると打ち切り）
+SCHEDULER_MAX_BULK_PER_USER = 20    # ユーザーごとの一括処理数の上限
+
+# 翻訳文字数の上限設定（集計期間内の文字数、0は無制限）
+QUOTA_WINDOW_SEC = 24 * 60 * 60     # 集計期間（秒）
+QUOTA_USER_CHARS = 20000            # ユーザーごとの上限
+QUOTA_GUILD_CHARS = 100000          # サーバーごとの上限
+QUOTA_GLOBAL_CHARS = 0              # 全体の上限（月間上限は CHAR_LIMIT で制御）
+
+# 長文の分割翻訳・Discordの文字数制限
+CHUNK_MAX_CHARS = 2000              # これを超えるテキストは段落・文単位で分割して並列翻訳
+EMBED_DESCRIPTION_LIMIT = 4096      # Embed本文の最大文字数
+EMBED_TOTAL_LIMIT = 6000            # 1メッセージのEmbed合計の最大文字数
+EMBEDS_PER_MESSAGE = 10             # 1メッセージのEmbedの最大数
+EMBED_FIELD_LIMIT = 1024            # Embedフィールドの最大文字数
+
+# 複数言語への一括翻訳（/translate_multi）
+MULTI_DEFAULT_LANGS = "EN,JA,KO,ZH,FR"  # 言語を指定しない場合の翻訳先
+MULTI_MAX_LANGS = 10                # 一度に翻訳できる最大言語数
+
+# リアクション翻訳のメッセージキャッシュ（fetch_message の呼び出しを省略）
+MESSAGE_CACHE_MAX_ENTRIES = 5000    # 保持する最大メッセージ数
+
+# ユーザー情報（表示名・アイコン）のキャッシュ（fetch_user の呼び出しを省略）
+USER_CACHE_TTL_SEC = 600            # キャッシュの有効期限（秒）
+USER_CACHE_MAX_ENTRIES = 5000       # 保持する最大ユーザー数
+
+# 範囲翻訳（⬆️/⬇️ リアクション）
+RANGE_TRANSLATE_CONCURRENCY = 8     # 同時に翻訳するメッセージ数
+RANGE_PROGRESS_INTERVAL_SEC = 2     # 進捗メッセージを更新する最小間隔（秒）
+RANGE_WINDOW_SIZE = 50              # 一度に読み込んで翻訳するメッセージ数
+RANGE_MAX_MESSAGES = 0              # 一度に翻訳する最大メッセージ数（0で無制限）
+RANGE_FILE_MAX_BYTES = 8 * 1024 * 1024  # 翻訳結果ファイルの1ファイルあたりの最大サイズ
+RANGE_MAX_CONSECUTIVE_ERRORS = 5    # 翻訳エラーがこの件数続いたら中断（0で中断しない）
+
 # Kansi specific
 RENDER_URL = "https://testdiscord-u1jg.onrender.com"
 
@@ -84,6 +182,17 @@ if os.getenv("DISCORD_TOKEN"):
     DISCORD_TOKEN = os.getenv("DISCORD_TOKEN")
 if os.getenv("DEEPL_API_KEY"):
     DEEPL_API_KEY = os.getenv("DEEPL_API_KEY")
+if os.getenv("DEEPL_API_KEYS"):
+    DEEPL_API_KEYS = [key.strip() for key in os.getenv("DEEPL_API_KEYS").split(",") if key.strip()]
+# 検証用にDeepL互換のモックサーバーへ向ける場合（例: http://127.0.0.1:8081/v2/translate）
+if os.getenv("DEEPL_API_URL"):
+    DEEPL_API_URL = os.getenv("DEEPL_API_URL")
+if os.getenv("DEEPL_USAGE_URL"):
+    DEEPL_USAGE_URL = os.getenv("DEEPL_USAGE_URL")
+if os.getenv("DEEPL_PRO_API_URL"):
+    DEEPL_PRO_API_URL = os.getenv("DEEPL_PRO_API_URL")
+if os.getenv("DEEPL_PRO_USAGE_URL"):
+    DEEPL_PRO_USAGE_URL = os.getenv("DEEPL_PRO_USAGE_URL")
 
 # global BASE_DIR
 path_dir_base = os.path.dirname(__file__)
@@ -106,3 +215,6 @@ if not os.path.exists(TEMP_DIR):
 EVENTS_FILE = os.path.join(DATA_DIR, "events.json")
 CHAR_COUNT_FILE = os.path.join(DATA_DIR, "char_count.json")
 USER_LANG_FILE = os.path.join(DATA_DIR, "user_lang.json")
+CACHE_DB_FILE = os.path.join(DATA_DIR, "translate_cache.sqlite3")
+PREFETCH_FILE = os.path.join(DATA_DIR, "prefetch.json")
+RANGE_CHECKPOINT_FILE = os.path.join(DATA_DIR, "range_checkpoint.json")
@@ -0,0 +1,206 @@
+import asyncio
+import datetime
+import json
+import os
+import threading
+from typing import Dict, Optional
+
+
+class CharCounter:
+    """
+    月間の翻訳文字数をメモリ上で集計し、定期的・終了時にJSONファイルへ書き出すクラス。
+    加算はメモリ上でのみ行うため、翻訳処理中にファイルI/Oは発生しません。
+    """
+    def __init__(self, count_file: str):
+        """
+        CharCounterクラスのインスタンスを初期化します。ファイルは初回アクセス時に読み込みます。
+
+        Parameters:
+        ----------
+        count_file : str
+            文字数カウントを保存するJSONファイルのパス。
+        """
+        self.count_file = count_file
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._dirty = False
+        self._month = ""
+        self._count = 0
+        self._keys: Dict[str, int] = {}   # APIキーごとの文字数（キーはハッシュ化したID）
+        self._flusher: Optional[asyncio.Task] = None
+
+
+    @staticmethod
+    def current_month() -> str:
+        return datetime.datetime.now().strftime("%Y-%m")
+
+
+    def exists(self) -> bool:
+        """
+        文字数カウントファイルが存在するかを返します。
+
+        """
+        return os.path.exists(self.count_file)
+
+
+    def add(self, add_count: int, key_id: Optional[str] = None) -> None:
+        """
+        翻訳文字数を加算します。月が変わっていれば0から数え直します。
+
+        Parameters:
+        ----------
+        add_count : int
+            追加する翻訳文字数
+        key_id : Optional[str]
+            APIキーのID。指定した場合はキーごとの文字数のみ加算します。
+        """
+        with self._lock:
+            self._ensure_loaded()
+            self._roll_month()
+            if key_id is None:
+                self._count += add_count
+            else:
+                self._keys[key_id] = self._keys.get(key_id, 0) + add_count
+            self._dirty = True
+
+        return
+
+
+    def set_count(self, count: int, key_id: Optional[str] = None) -> None:
+        """
+        現在の月の翻訳文字数を上書きします（DeepL上の使用量との同期用）。
+
+        Parameters:
+        ----------
+        count : int
+            翻訳文字数
+        key_id : Optional[str]
+            APIキーのID。指定した場合はキーごとの文字数を上書きします。
+        """
+        with self._lock:
+            self._ensure_loaded()
+            self._roll_month()
+            if key_id is None:
+                self._count = count
+            else:
+                self._keys[key_id] = count
+            self._dirty = True
+
+        return
+
+
+    def snapshot(self) -> dict:
+        """
+        現在の月の翻訳文字数を取得します。
+
+        Returns:
+        -------
+        count_data : dict
+            合計翻訳文字数と現在の月"YYYY-MM"の辞書。
+            APIキーごとの文字数がある場合は "keys" にキーIDごとの文字数を含みます。
+        """
+        with self._lock:
+            self._ensure_loaded()
+            self._roll_month()
+            data = {"count": self._count, "month": self._month}
+            if self._keys:
+                data["keys"] = dict(self._keys)
+            return data
+
+
+    def flush(self) -> None:
+        """
+        変更があればファイルへ書き出します。一時ファイル経由で置き換えるため書き込み途中の破損を防ぎます。
+
+        """
+        with self._lock:
+            if not self._dirty:
+                return
+            data = {"count": self._count, "month": self._month}
+            if self._keys:
+                data["keys"] = dict(self._keys)
+            self._dirty = False
+
+        dir_path = os.path.dirname(self.count_file)
+        if dir_path and not os.path.exists(dir_path):
+            os.makedirs(dir_path, exist_ok=True)
+        tmp_file = self.count_file + ".tmp"
+        try:
+            with open(tmp_file, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_file, self.count_file)
+        except OSError:
+            with self._lock:
+                self._dirty = True
+            raise
+
+        return
+
+
+    def start_flusher(self, interval_sec: float) -> None:
+        """
+        一定間隔でファイルへ書き出すバックグラウンドタスクを開始します。
+
+        Parameters:
+        ----------
+        interval_sec : float
+            書き出し間隔（秒）。
+        """
+        if self._flusher is None or self._flusher.done():
+            self._flusher = asyncio.get_running_loop().create_task(self._run_flusher(interval_sec))
+
+        return
+
+
+    async def stop_flusher(self) -> None:
+        """
+        バックグラウンドタスクを停止し、最後にファイルへ書き出します。
+
+        """
+        if self._flusher is not None:
+            self._flusher.cancel()
+            try:
+                await self._flusher
+            except asyncio.CancelledError:
+                pass
+            self._flusher = None
+        await asyncio.to_thread(self.flush)
+
+        return
+
+
+    async def _run_flusher(self, interval_sec: float) -> None:
+        while True:
+            await asyncio.sleep(interval_sec)
+            try:
+                await asyncio.to_thread(self.flush)
+            except Exception as e:
+                print(f"文字数カウント書き出しエラー: {e}")
+
+
+    def _ensure_loaded(self) -> None:
+        # ロック取得済みの状態で呼び出すこと
+        if self._loaded:
+            return
+        self._loaded = True
+        self._month = self.current_month()
+        self._count = 0
+        try:
+            with open(self.count_file, "r", encoding="utf-8") as f:
+                file_data = json.load(f)
+            # 月が同じであれば、そのデータを使用
+            if file_data.get("month") == self._month:
+                self._count = int(file_data.get("count", 0))
+                self._keys = {key_id: int(count) for key_id, count in file_data.get("keys", {}).items()}
+        except (json.JSONDecodeError, FileNotFoundError, TypeError, ValueError):
+            pass
+
+
+    def _roll_month(self) -> None:
+        # ロック取得済みの状態で呼び出すこと
+        current_month = self.current_month()
+        if self._month != current_month:
+            self._month = current_month
+            self._count = 0
+            self._keys = {}
+            self._dirty = True
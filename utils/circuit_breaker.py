@@ -0,0 +1,158 @@
+import time
+from typing import Optional
+
+STATE_CLOSED = "closed"
+STATE_OPEN = "open"
+STATE_HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """
+    サーキットブレーカーが開いているため、翻訳APIを呼び出さなかった場合の例外。
+    """
+    def __init__(self, retry_in: float):
+        super().__init__(f"circuit open: retry in {retry_in:.1f}s")
+        self.retry_in = retry_in
+
+
+class CircuitBreaker:
+    """
+    連続した失敗で翻訳APIの呼び出しを一時的に停止するサーキットブレーカー。
+
+    ・closed    : 通常状態。連続失敗が failure_threshold に達すると open へ
+    ・open      : 呼び出しを即座に拒否（CircuitOpenError）。reset_timeout_sec 経過後に half_open へ
+    ・half_open : 試行（probe）を half_open_max_calls 件だけ許可。成功で closed、失敗で再び open へ
+    """
+    def __init__(self, failure_threshold: int = 5, reset_timeout_sec: float = 30, half_open_max_calls: int = 1):
+        """
+        CircuitBreakerクラスのインスタンスを初期化します。
+
+        Parameters:
+        ----------
+        failure_threshold : int
+            open にする連続失敗回数。
+        reset_timeout_sec : float
+            open から half_open に移るまでの秒数。
+        half_open_max_calls : int
+            half_open で同時に許可する試行数。
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_timeout_sec = reset_timeout_sec
+        self.half_open_max_calls = half_open_max_calls
+        self._state = STATE_CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probes = 0
+        self.opened = 0
+        self.rejected = 0
+
+
+    @property
+    def state(self) -> str:
+        # open の期限が過ぎていれば half_open として扱う
+        if self._state == STATE_OPEN and time.monotonic() - self._opened_at >= self.reset_timeout_sec:
+            self._state = STATE_HALF_OPEN
+            self._probes = 0
+        return self._state
+
+
+    def is_open(self) -> bool:
+        """
+        呼び出しを拒否する状態かを返します（試行枠は消費しません）。
+
+        """
+        state = self.state
+        if state == STATE_OPEN:
+            return True
+        return state == STATE_HALF_OPEN and self._probes >= self.half_open_max_calls
+
+
+    def before_call(self) -> None:
+        """
+        呼び出し前に確認します。拒否する場合は CircuitOpenError を送出し、half_open の場合は試行枠を消費します。
+
+        """
+        state = self.state
+        if state == STATE_CLOSED:
+            return
+        if state == STATE_HALF_OPEN and self._probes < self.half_open_max_calls:
+            self._probes += 1
+            return
+
+        self.rejected += 1
+        raise CircuitOpenError(self.retry_in())
+
+
+    def on_success(self) -> None:
+        """
+        呼び出しが成功した場合に呼び出します。half_open であれば closed に戻します。
+
+        """
+        if self._state != STATE_CLOSED:
+            print("DeepL API回復: サーキットブレーカーを閉じます")
+        self._state = STATE_CLOSED
+        self._failures = 0
+        self._probes = 0
+
+        return
+
+
+    def on_failure(self) -> None:
+        """
+        呼び出しが失敗（障害とみなすエラー）した場合に呼び出します。
+
+        """
+        self._failures += 1
+        if self._state == STATE_HALF_OPEN or \
+                (self._state == STATE_CLOSED and self._failures >= self.failure_threshold):
+            self._open()
+
+        return
+
+
+    def release(self) -> None:
+        """
+        試行が結果を得ずに終了した（キャンセル等）場合に、half_open の試行枠を戻します。
+
+        """
+        if self._state == STATE_HALF_OPEN and self._probes > 0:
+            self._probes -= 1
+
+        return
+
+
+    def retry_in(self) -> float:
+        """
+        half_open に移るまでの残り秒数を返します。
+
+        """
+        if self._state != STATE_OPEN:
+            return 0.0
+        return max(0.0, self.reset_timeout_sec - (time.monotonic() - self._opened_at))
+
+
+    def stats(self) -> dict:
+        """
+        サーキットブレーカーの状態を取得します。
+
+        Returns:
+        ----------
+        stats : dict
+            状態・連続失敗回数・open になった回数・拒否した回数の辞書。
+        """
+        return {
+            "state": self.state,
+            "failures": self._failures,
+            "opened": self.opened,
+            "rejected": self.rejected,
+        }
+
+
+    def _open(self, now: Optional[float] = None) -> None:
+        self._state = STATE_OPEN
+        self._opened_at = now if now is not None else time.monotonic()
+        self._probes = 0
+        self.opened += 1
+        print(f"DeepL API障害を検知: {self.reset_timeout_sec}秒間 翻訳APIの呼び出しを停止します")
+
+        return
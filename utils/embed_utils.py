@@ -0,0 +1,106 @@
+from typing import Dict, List, Optional, Tuple
+import discord
+import config   # config.py から読み込む：相対パスのためエラーとなる可能性がある
+from utils.text_segment import paginate
+
+
+def build_translation_embeds(text: str, author_name: str, icon_url: Optional[str] = None,
+                             color: discord.Color = discord.Color.teal()) -> List[discord.Embed]:
+    """
+    翻訳テキストをEmbed本文の文字数制限内でページ分割し、Embedのリストを作成します。
+
+    Parameters:
+    ----------
+    text : str
+        翻訳されたテキスト。
+    author_name : str
+        Embedに表示する投稿者名。
+    icon_url : Optional[str]
+        Embedに表示する投稿者アイコンのURL。
+    color : discord.Color
+        Embedの色。
+
+    Returns:
+    ----------
+    embeds : List[discord.Embed]
+        ページごとのEmbed。2ページ以上の場合はフッターにページ番号を表示します。
+    """
+    pages = paginate(text, config.EMBED_DESCRIPTION_LIMIT)
+    embeds = []
+    for i, page in enumerate(pages, 1):
+        embed = discord.Embed(description=page, color=color)
+        if i == 1:
+            embed.set_author(name=author_name, icon_url=icon_url)
+        if len(pages) > 1:
+            embed.set_footer(text=f"{i} / {len(pages)}")
+        embeds.append(embed)
+    return embeds
+
+
+def pack_embeds(embeds: List[discord.Embed]) -> List[List[discord.Embed]]:
+    """
+    Embedを1メッセージあたりの上限（Embed数・合計文字数）に収まるようにまとめます。
+
+    Parameters:
+    ----------
+    embeds : List[discord.Embed]
+        送信するEmbedのリスト。
+
+    Returns:
+    ----------
+    messages : List[List[discord.Embed]]
+        1メッセージで送信するEmbedのリストのリスト。
+    """
+    messages: List[List[discord.Embed]] = []
+    current: List[discord.Embed] = []
+    current_len = 0
+    for embed in embeds:
+        embed_len = len(embed)
+        if current and (len(current) >= config.EMBEDS_PER_MESSAGE or current_len + embed_len > config.EMBED_TOTAL_LIMIT):
+            messages.append(current)
+            current = []
+            current_len = 0
+        current.append(embed)
+        current_len += embed_len
+    if current:
+        messages.append(current)
+    return messages
+
+
+def build_multi_translation_embed(results: Dict[str, Tuple[str, str]], author_name: str,
+                                  icon_url: Optional[str] = None, labels: Optional[Dict[str, str]] = None,
+                                  color: discord.Color = discord.Color.teal()) -> discord.Embed:
+    """
+    複数言語の翻訳結果を、言語ごとのフィールドとして1つのEmbedにまとめます。
+    フィールド・Embed全体の文字数制限を超える分は省略します。
+
+    Parameters:
+    ----------
+    results : Dict[str, Tuple[str, str]]
+        言語コードごとの (翻訳されたテキスト, 翻訳元言語)。
+    author_name : str
+        Embedに表示する投稿者名。
+    icon_url : Optional[str]
+        Embedに表示する投稿者アイコンのURL。
+    labels : Optional[Dict[str, str]]
+        言語コードごとのフィールド名（国旗等）。指定しない場合は言語コードを表示します。
+    color : discord.Color
+        Embedの色。
+
+    Returns:
+    ----------
+    embed : discord.Embed
+        翻訳結果のEmbed。
+    """
+    embed = discord.Embed(color=color)
+    embed.set_author(name=author_name, icon_url=icon_url)
+    # 言語ごとに均等に文字数を割り当てる（作者名・フィールド名の分を差し引く）
+    remaining = config.EMBED_TOTAL_LIMIT - len(author_name)
+    per_field = config.EMBED_FIELD_LIMIT
+    if results:
+        per_field = min(per_field, remaining // len(results) - 16)
+    for lang, (text, _) in results.items():
+        name = labels.get(lang, lang) if labels else lang
+        value = text if len(text) <= per_field else text[:per_field - 1] + "…"
+        embed.add_field(name=name, value=value or "-", inline=False)
+    return embed
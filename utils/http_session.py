@@ -0,0 +1,57 @@
+import aiohttp
+from typing import Optional
+import config   # config.py から読み込む：相対パスのためエラーとなる可能性がある
+
+# モジュール共有のセッション（utils.translate や旧ボットのDM翻訳で使用）
+_shared_session: Optional[aiohttp.ClientSession] = None
+
+
+def create_session() -> aiohttp.ClientSession:
+    """
+    キープアライブ付きのコネクションプールを持つ ClientSession を作成します。
+    イベントループ実行中に呼び出してください。
+
+    Returns:
+    ----------
+    session : aiohttp.ClientSession
+        上限付きコネクションプールとタイムアウトを設定したセッション。
+    """
+    connector = aiohttp.TCPConnector(
+        limit=config.HTTP_POOL_LIMIT,
+        limit_per_host=config.HTTP_POOL_LIMIT_PER_HOST,
+        keepalive_timeout=config.HTTP_KEEPALIVE_SEC,
+        ttl_dns_cache=300,
+    )
+    timeout = aiohttp.ClientTimeout(
+        total=config.HTTP_TIMEOUT_SEC,
+        connect=config.HTTP_CONNECT_TIMEOUT_SEC,
+    )
+    return aiohttp.ClientSession(connector=connector, timeout=timeout)
+
+
+def get_shared_session() -> aiohttp.ClientSession:
+    """
+    モジュール共有のセッションを取得します。未作成またはクローズ済みの場合は作成します。
+
+    Returns:
+    ----------
+    session : aiohttp.ClientSession
+        共有セッション。
+    """
+    global _shared_session
+    if _shared_session is None or _shared_session.closed:
+        _shared_session = create_session()
+    return _shared_session
+
+
+async def close_shared_session() -> None:
+    """
+    モジュール共有のセッションをクローズします。ボット終了時に呼び出してください。
+
+    """
+    global _shared_session
+    if _shared_session is not None and not _shared_session.closed:
+        await _shared_session.close()
+    _shared_session = None
+
+    return
@@ -0,0 +1,154 @@
+import re
+from typing import Dict, Optional
+
+# 判定から除外する部分（URL・メンション・カスタム絵文字・タイムスタンプ・コードブロック）
+_IGNORE_PATTERN = re.compile(
+    r"```.*?```|`[^`]*`|https?://\S+|<a?:\w+:\d+>|<[@#][!&]?\d+>|<t:\d+(?::\w)?>",
+    re.DOTALL,
+)
+_WORD_PATTERN = re.compile(r"[^\W\d_]+", re.UNICODE)
+
+# ラテン文字言語の判定用の頻出語
+_STOPWORDS: Dict[str, set] = {
+    "EN": {"the", "and", "is", "are", "you", "to", "of", "in", "it", "that", "this", "for", "with", "have",
+           "was", "be", "not", "what", "i", "my", "we", "they", "will", "can", "do", "on", "at", "your"},
+    "DE": {"der", "die", "das", "und", "ist", "nicht", "ich", "du", "wir", "sie", "ein", "eine", "zu",
+           "mit", "auf", "für", "den", "dem", "auch", "es", "sind", "haben", "wie", "noch"},
+    "FR": {"le", "la", "les", "et", "est", "je", "tu", "nous", "vous", "des", "une", "un", "pas", "que",
+           "qui", "dans", "pour", "sur", "avec", "ce", "sont", "mais", "du", "au"},
+    "ES": {"el", "la", "los", "las", "y", "es", "que", "de", "en", "un", "una", "por", "con", "para",
+           "no", "yo", "tú", "pero", "muy", "del", "está", "hola", "gracias", "como"},
+    "IT": {"il", "lo", "la", "gli", "le", "e", "è", "che", "di", "un", "una", "per", "con", "non",
+           "sono", "io", "tu", "ma", "molto", "del", "della", "ciao", "grazie", "anche"},
+    "PT": {"o", "a", "os", "as", "e", "é", "que", "de", "um", "uma", "para", "com", "não", "eu",
+           "você", "mas", "muito", "do", "da", "obrigado", "olá", "tudo", "bem", "isso"},
+    "NL": {"de", "het", "een", "en", "is", "niet", "ik", "jij", "wij", "zij", "van", "op", "met",
+           "voor", "dat", "dit", "zijn", "maar", "ook", "wat", "hoe", "goed", "dank", "je"},
+    "PL": {"i", "w", "na", "nie", "to", "jest", "że", "się", "z", "do", "jak", "ale", "czy", "tak",
+           "jestem", "dzień", "dobry", "dziękuję", "co", "mam"},
+    "ID": {"dan", "yang", "di", "ini", "itu", "dengan", "untuk", "tidak", "saya", "kamu", "kami",
+           "ada", "akan", "dari", "apa", "terima", "kasih", "sudah", "bisa", "juga"},
+    "TR": {"ve", "bir", "bu", "da", "de", "için", "ile", "ne", "ben", "sen", "biz", "değil", "çok",
+           "var", "yok", "merhaba", "teşekkürler", "nasıl", "evet", "hayır"},
+}
+
+# ラテン文字言語に固有の文字
+_LATIN_HINTS: Dict[str, str] = {
+    "DE": "äöüß",
+    "ES": "ñ¿¡",
+    "PT": "ãõ",
+    "PL": "łąęśźżń",
+    "TR": "ğşı",
+    "FR": "œàèùâêîôûëïÿ",
+    "CS": "ěřůčš",
+    "HU": "őű",
+}
+
+# 翻訳先言語コードの表記ゆれ（DeepLの地域別コード等）
+_LANG_ALIASES = {"EN-US": "EN", "EN-GB": "EN", "PT-BR": "PT", "PT-PT": "PT", "ZH-HANS": "ZH", "ZH-HANT": "ZH"}
+
+
+def normalize_lang(lang_code: str) -> str:
+    """
+    言語コードを地域なしの大文字表記に揃えます (例: "en-us" -> "EN")。
+
+    """
+    code = (lang_code or "").upper()
+    return _LANG_ALIASES.get(code, code.split("-")[0])
+
+
+def is_same_lang(lang_a: Optional[str], lang_b: Optional[str]) -> bool:
+    """
+    2つの言語コードが同じ言語を表すかを返します。どちらかが未判定の場合は False。
+
+    """
+    if not lang_a or not lang_b:
+        return False
+    return normalize_lang(lang_a) == normalize_lang(lang_b)
+
+
+def detect_language(text: str, min_letters: int = 4) -> Optional[str]:
+    """
+    テキストの言語をローカルで推定します（文字種と頻出語による判定、ネットワーク通信なし）。
+    確信が持てない場合は None を返すため、その場合はDeepLの自動判定に任せてください。
+
+    Parameters:
+    ----------
+    text : str
+        判定するテキスト。
+    min_letters : int
+        判定に必要な最小文字数。
+
+    Returns:
+    ----------
+    lang_code : Optional[str]
+        DeepLの言語コード (例: "JA", "EN")。判定できない場合は None。
+    """
+    text = _IGNORE_PATTERN.sub(" ", text or "")
+
+    counts = {"kana": 0, "hangul": 0, "han": 0, "cyrillic": 0, "greek": 0, "latin": 0}
+    for ch in text:
+        code = ord(ch)
+        if 0x3040 <= code <= 0x30FF or 0x31F0 <= code <= 0x31FF or 0xFF66 <= code <= 0xFF9F:
+            counts["kana"] += 1
+        elif 0xAC00 <= code <= 0xD7AF or 0x1100 <= code <= 0x11FF or 0x3130 <= code <= 0x318F:
+            counts["hangul"] += 1
+        elif 0x4E00 <= code <= 0x9FFF or 0x3400 <= code <= 0x4DBF:
+            counts["han"] += 1
+        elif 0x0400 <= code <= 0x04FF:
+            counts["cyrillic"] += 1
+        elif 0x0370 <= code <= 0x03FF:
+            counts["greek"] += 1
+        elif ch.isalpha() and code < 0x0250:
+            counts["latin"] += 1
+
+    total = sum(counts.values())
+    if total < min_letters and counts["kana"] + counts["hangul"] + counts["han"] == 0:
+        return None
+    if total == 0:
+        return None
+
+    # CJK圏は文字種で判定（かなが含まれていれば日本語）
+    if counts["kana"] > 0 and counts["kana"] + counts["han"] >= total * 0.5:
+        return "JA"
+    if counts["hangul"] >= total * 0.5:
+        return "KO"
+    if counts["han"] >= total * 0.5:
+        # 漢字のみの短文は日本語と区別できないため判定しない
+        return "ZH" if counts["han"] >= 6 else None
+    if counts["greek"] >= total * 0.6:
+        return "EL"
+    if counts["cyrillic"] >= total * 0.6:
+        return _detect_cyrillic(text)
+    if counts["latin"] >= total * 0.8:
+        return _detect_latin(text)
+    return None
+
+
+def _detect_cyrillic(text: str) -> Optional[str]:
+    lower = text.lower()
+    if any(ch in lower for ch in "іїєґ"):
+        return "UK"
+    if "ъ" in lower and not any(ch in lower for ch in "ыэё"):
+        return "BG"
+    return "RU"
+
+
+def _detect_latin(text: str) -> Optional[str]:
+    lower = text.lower()
+    words = _WORD_PATTERN.findall(lower)
+    if not words:
+        return None
+
+    scores = {lang: sum(1 for word in words if word in stopwords) for lang, stopwords in _STOPWORDS.items()}
+    for lang, hints in _LATIN_HINTS.items():
+        if any(ch in lower for ch in hints):
+            scores[lang] = scores.get(lang, 0) + 2
+
+    ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+    best_lang, best_score = ranked[0]
+    second_score = ranked[1][1] if len(ranked) > 1 else 0
+    # 頻出語が少ない、または2位との差が小さい場合は判定しない
+    if best_score < 2 or best_score < second_score * 1.5 + 1:
+        return None
+    return best_lang
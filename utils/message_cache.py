@@ -0,0 +1,225 @@
+from collections import OrderedDict
+from typing import NamedTuple, Optional
+import discord
+
+
+class CachedMessage(NamedTuple):
+    """
+    キャッシュするメッセージの内容（リアクション翻訳に必要な項目のみ）。
+    """
+    channel_id: int
+    content: str
+    author_id: int
+    edited_at: Optional[str]
+
+
+class MessageCache:
+    """
+    メッセージID → 本文・投稿者ID・編集日時 を保持するLRUキャッシュ。
+    on_message でサーバーのメッセージを登録し、編集・削除で更新・無効化します。
+    リアクション翻訳ではこのキャッシュ → discord.py が保持しているメッセージ → fetch_message（REST API）の順に参照します。
+    """
+    def __init__(self, max_entries: int = 5000):
+        """
+        MessageCacheクラスのインスタンスを初期化します。
+
+        Parameters:
+        ----------
+        max_entries : int
+            保持する最大メッセージ数。
+        """
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[int, CachedMessage]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.gateway_hits = 0
+        self.fetched = 0
+
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+    def get(self, message_id: int) -> Optional[CachedMessage]:
+        """
+        キャッシュからメッセージを取得します。
+
+        Parameters:
+        ----------
+        message_id : int
+            メッセージID。
+
+        Returns:
+        ----------
+        cached : Optional[CachedMessage]
+            キャッシュされたメッセージ。存在しない場合は None。
+        """
+        cached = self._entries.get(message_id)
+        if cached is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(message_id)
+        self.hits += 1
+        return cached
+
+
+    async def fetch(self, client, channel, message_id: int) -> CachedMessage:
+        """
+        メッセージの内容を取得します。キャッシュにない場合は discord.py が保持しているメッセージを参照し、
+        それもない場合のみ fetch_message（REST API）で取得してキャッシュに登録します。
+
+        Parameters:
+        ----------
+        client : discord.Client
+            Botのインスタンス。
+        channel : discord.abc.Messageable
+            メッセージのチャンネル。
+        message_id : int
+            メッセージID。
+
+        Returns:
+        ----------
+        cached : CachedMessage
+            メッセージの内容。
+        """
+        cached = self.get(message_id)
+        if cached is not None:
+            return cached
+        return self.put(await self._resolve(client, channel, message_id))
+
+
+    async def fetch_message(self, client, channel, message_id: int):
+        """
+        投稿者・投稿日時等を含むメッセージ全体を取得し、キャッシュに登録します（範囲翻訳の開始/終了等）。
+        discord.py が保持しているメッセージを優先し、ない場合のみ fetch_message（REST API）で取得します。
+
+        Parameters:
+        ----------
+        client : discord.Client
+            Botのインスタンス。
+        channel : discord.abc.Messageable
+            メッセージのチャンネル。
+        message_id : int
+            メッセージID。
+
+        Returns:
+        ----------
+        message : discord.Message
+            取得したメッセージ。
+        """
+        message = await self._resolve(client, channel, message_id)
+        self.put(message)
+        return message
+
+
+    async def _resolve(self, client, channel, message_id: int):
+        # discord.py が保持しているメッセージ（client.cached_messages）→ REST API の順に参照
+        message = discord.utils.get(client.cached_messages, id=message_id)
+        if message is not None:
+            self.gateway_hits += 1
+        else:
+            message = await channel.fetch_message(message_id)
+            self.fetched += 1
+        return message
+
+
+    def put(self, message) -> CachedMessage:
+        """
+        discord.Message をキャッシュに登録します。
+
+        Parameters:
+        ----------
+        message : discord.Message
+            登録するメッセージ。
+
+        Returns:
+        ----------
+        cached : CachedMessage
+            登録した内容。
+        """
+        edited_at = message.edited_at.isoformat() if message.edited_at else None
+        return self.set(message.id, message.channel.id, message.content, message.author.id, edited_at)
+
+
+    def set(self, message_id: int, channel_id: int, content: str, author_id: int,
+            edited_at: Optional[str] = None) -> CachedMessage:
+        """
+        メッセージの内容をキャッシュに登録し、上限を超えた分を古い順に削除します。
+
+        Parameters:
+        ----------
+        message_id : int
+            メッセージID。
+        channel_id : int
+            チャンネルID。
+        content : str
+            メッセージの本文。
+        author_id : int
+            投稿者のユーザーID。
+        edited_at : Optional[str]
+            編集日時（ISO8601）。編集されていない場合は None。
+
+        Returns:
+        ----------
+        cached : CachedMessage
+            登録した内容。
+        """
+        cached = CachedMessage(channel_id, content, author_id, edited_at)
+        self._entries[message_id] = cached
+        self._entries.move_to_end(message_id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return cached
+
+
+    def apply_edit(self, message_id: int, data: dict) -> None:
+        """
+        メッセージ編集イベント（on_raw_message_edit の payload.data）を反映します。
+        本文と投稿者が含まれる場合は更新し、含まれない場合は無効化します。
+        DMのメッセージはリアクション翻訳で参照しないため登録しません。
+
+        Parameters:
+        ----------
+        message_id : int
+            メッセージID。
+        data : dict
+            編集後のメッセージのデータ（Discord Gatewayの MESSAGE_UPDATE）。
+        """
+        if data.get("guild_id") is None:
+            return
+        author = data.get("author")
+        if "content" not in data or not author or "channel_id" not in data:
+            self.invalidate(message_id)
+            return
+        self.set(message_id, int(data["channel_id"]), data["content"], int(author["id"]),
+                 data.get("edited_timestamp"))
+
+        return
+
+
+    def invalidate(self, message_id: int) -> None:
+        """
+        メッセージをキャッシュから削除します（削除・内容不明の編集時）。
+
+        """
+        self._entries.pop(message_id, None)
+
+        return
+
+
+    def stats(self) -> dict:
+        """
+        キャッシュの統計情報を取得します。
+
+        Returns:
+        ----------
+        stats : dict
+            エントリ数・ヒット数・ミス数・discord.py のキャッシュの利用数・REST APIでの取得数の辞書。
+        """
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "gateway_hits": self.gateway_hits,
+            "fetched": self.fetched,
+        }
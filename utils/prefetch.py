@@ -0,0 +1,219 @@
+import json
+import os
+import threading
+from collections import Counter
+from typing import Dict, Iterable, List
+from utils.lang_detect import detect_language, is_same_lang
+from utils.quota import SlidingWindow
+
+
+class PrefetchManager:
+    """
+    チャンネルごとの先読み翻訳（新しいメッセージを、よく依頼される言語へ事前に翻訳してキャッシュする）を管理するクラス。
+    先読みはチャンネルごとのオプトインで、国旗リアクションの履歴から翻訳先の言語を学習します。
+    翻訳文字数は1時間あたりの上限内に抑えます。
+    """
+    def __init__(self, settings_file: str, max_langs: int = 3, min_requests: int = 3,
+                 hourly_char_budget: int = 20000, max_chars: int = 1000):
+        """
+        PrefetchManagerクラスのインスタンスを初期化します。ファイルは初回アクセス時に読み込みます。
+
+        Parameters:
+        ----------
+        settings_file : str
+            先読みの設定・言語の統計を保存するJSONファイルのパス。
+        max_langs : int
+            1メッセージあたりの先読みする最大言語数。
+        min_requests : int
+            先読みの対象とする言語の最小リアクション数。
+        hourly_char_budget : int
+            1時間あたりの先読みの最大翻訳文字数（全チャンネルの合計）。
+        max_chars : int
+            先読みの対象とするメッセージの最大文字数。
+        """
+        self.settings_file = settings_file
+        self.max_langs = max_langs
+        self.min_requests = min_requests
+        self.hourly_char_budget = hourly_char_budget
+        self.max_chars = max_chars
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._dirty = False
+        self._enabled: Dict[str, bool] = {}
+        self._langs: Dict[str, Counter] = {}
+        self._budget = SlidingWindow(60 * 60)
+        self.prefetched = 0
+        self.skipped_budget = 0
+
+
+    def is_enabled(self, channel_id) -> bool:
+        """
+        チャンネルで先読みが有効かを返します。
+
+        """
+        with self._lock:
+            self._ensure_loaded()
+            return self._enabled.get(str(channel_id), False)
+
+
+    def set_enabled(self, channel_id, enabled: bool) -> None:
+        """
+        チャンネルの先読みの有効・無効を切り替え、ファイルへ保存します。
+
+        Parameters:
+        ----------
+        channel_id : int | str
+            チャンネルID。
+        enabled : bool
+            有効にする場合は True。
+        """
+        with self._lock:
+            self._ensure_loaded()
+            if enabled:
+                self._enabled[str(channel_id)] = True
+            else:
+                self._enabled.pop(str(channel_id), None)
+            self._dirty = True
+        self.save()
+
+        return
+
+
+    def record_request(self, channel_id, target_lang: str) -> None:
+        """
+        チャンネルで翻訳が依頼された言語を記録します（国旗リアクション時に呼び出し）。
+
+        Parameters:
+        ----------
+        channel_id : int | str
+            チャンネルID。
+        target_lang : str
+            翻訳先の言語コード。
+        """
+        with self._lock:
+            self._ensure_loaded()
+            self._langs.setdefault(str(channel_id), Counter())[target_lang.upper()] += 1
+            self._dirty = True
+
+        return
+
+
+    def target_langs(self, channel_id, text: str, user_langs: Iterable[str] = ()) -> List[str]:
+        """
+        メッセージを先読みする言語を選びます。
+        チャンネルでよく依頼される言語を優先し、ユーザーの母国語設定（user_lang.json）で補います。
+        メッセージ自体の言語は除外します。
+
+        Parameters:
+        ----------
+        channel_id : int | str
+            チャンネルID。
+        text : str
+            メッセージの本文。
+        user_langs : Iterable[str]
+            ユーザーが設定した母国語の一覧。
+
+        Returns:
+        ----------
+        langs : List[str]
+            先読みする言語コードのリスト（多い順、最大 max_langs 件）。
+        """
+        with self._lock:
+            self._ensure_loaded()
+            counts = Counter(self._langs.get(str(channel_id), {}))
+        requested = [lang for lang, count in counts.most_common() if count >= self.min_requests]
+
+        # リアクションの実績が少ない場合は、ユーザーの母国語設定の多い順で補う
+        settings = [lang.upper() for lang, _ in Counter(user_langs).most_common()]
+        source_lang = detect_language(text)
+        langs: List[str] = []
+        for lang in requested + settings:
+            if lang in langs or is_same_lang(source_lang, lang):
+                continue
+            langs.append(lang)
+            if len(langs) >= self.max_langs:
+                break
+        return langs
+
+
+    def try_consume(self, chars: int) -> bool:
+        """
+        1時間あたりの上限内であれば先読みの文字数を計上します。
+
+        Returns:
+        ----------
+        result : bool
+            計上できた場合は True。上限を超える場合は False。
+        """
+        if self.hourly_char_budget and self._budget.total() + chars > self.hourly_char_budget:
+            self.skipped_budget += 1
+            return False
+        self._budget.add(chars)
+        self.prefetched += 1
+        return True
+
+
+    def stats(self) -> dict:
+        """
+        先読みの統計情報を取得します。
+
+        Returns:
+        ----------
+        stats : dict
+            有効なチャンネル数・直近1時間の文字数・先読み数・上限による見送り数の辞書。
+        """
+        with self._lock:
+            self._ensure_loaded()
+            channels = len(self._enabled)
+        return {
+            "channels": channels,
+            "chars_last_hour": self._budget.total(),
+            "budget": self.hourly_char_budget,
+            "prefetched": self.prefetched,
+            "skipped_budget": self.skipped_budget,
+        }
+
+
+    def save(self) -> None:
+        """
+        設定・言語の統計に変更があればファイルへ書き出します。
+
+        """
+        with self._lock:
+            if not self._dirty:
+                return
+            data = {
+                "enabled": sorted(self._enabled),
+                "langs": {channel_id: dict(counts) for channel_id, counts in self._langs.items()},
+            }
+            self._dirty = False
+
+        try:
+            dir_path = os.path.dirname(self.settings_file)
+            if dir_path and not os.path.exists(dir_path):
+                os.makedirs(dir_path, exist_ok=True)
+            tmp_file = self.settings_file + ".tmp"
+            with open(tmp_file, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_file, self.settings_file)
+        except Exception as e:
+            print(f"先読み設定の保存エラー: {e}")
+            with self._lock:
+                self._dirty = True
+
+        return
+
+
+    def _ensure_loaded(self) -> None:
+        if self._loaded:
+            return
+        self._loaded = True
+        if not os.path.exists(self.settings_file):
+            return
+        try:
+            with open(self.settings_file, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            self._enabled = {channel_id: True for channel_id in data.get("enabled", [])}
+            self._langs = {channel_id: Counter(counts) for channel_id, counts in data.get("langs", {}).items()}
+        except Exception as e:
+            print(f"先読み設定の読み込みエラー: {e}")
@@ -0,0 +1,188 @@
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+
+
+class QuotaExceededError(Exception):
+    """
+    翻訳文字数の上限を超えるため、翻訳を受け付けなかった場合の例外。
+    """
+    def __init__(self, scope: str, used: int, limit: int):
+        super().__init__(f"{scope}: {used} / {limit}")
+        self.scope = scope
+        self.used = used
+        self.limit = limit
+
+
+class SlidingWindow:
+    """
+    一定期間内の翻訳文字数を集計するスライディングウィンドウ。
+    """
+    def __init__(self, window_sec: float):
+        self.window_sec = window_sec
+        # [計上時刻, 文字数]。取り消し時に同じ内容の別の計上と区別するため、オブジェクト自体を目印にする
+        self._events: Deque[List] = deque()
+        self._total = 0
+
+
+    def add(self, chars: int, now: Optional[float] = None) -> List:
+        event = [now if now is not None else time.monotonic(), chars]
+        self._events.append(event)
+        self._total += chars
+        return event
+
+
+    def remove(self, event: List) -> None:
+        # add が返した計上のみを取り消す（期間外で破棄済みの場合は何もしない）
+        for i in range(len(self._events) - 1, -1, -1):
+            if self._events[i] is event:
+                del self._events[i]
+                self._total -= event[1]
+                return
+
+
+    def total(self, now: Optional[float] = None) -> int:
+        now = now if now is not None else time.monotonic()
+        while self._events and self._events[0][0] <= now - self.window_sec:
+            _, chars = self._events.popleft()
+            self._total -= chars
+        return self._total
+
+
+class QuotaManager:
+    """
+    ユーザー・サーバー・全体ごとの翻訳文字数をメモリ上で集計し、上限を超える翻訳を事前に拒否するクラス。
+    上限に 0 を指定した単位は制限しません。
+    実行中の同一の翻訳に相乗りした依頼はDeepLの文字数を消費しないため、最初に依頼したユーザー・サーバーのみに計上します。
+    """
+    def __init__(self, window_sec: float, user_limit: int = 0, guild_limit: int = 0, global_limit: int = 0,
+                 monthly_limit: int = 0, monthly_count: Optional[Callable[[], int]] = None):
+        """
+        QuotaManagerクラスのインスタンスを初期化します。
+
+        Parameters:
+        ----------
+        window_sec : float
+            集計期間（秒）。
+        user_limit : int
+            期間内のユーザーごとの上限文字数。
+        guild_limit : int
+            期間内のサーバーごとの上限文字数。
+        global_limit : int
+            期間内の全体の上限文字数。
+        monthly_limit : int
+            月間の上限文字数（DeepLの契約上限）。
+        monthly_count : Optional[Callable[[], int]]
+            当月の翻訳文字数を返す関数。
+        """
+        self.window_sec = window_sec
+        self.user_limit = user_limit
+        self.guild_limit = guild_limit
+        self.global_limit = global_limit
+        self.monthly_limit = monthly_limit
+        self.monthly_count = monthly_count
+        self._users: Dict[str, SlidingWindow] = {}
+        self._guilds: Dict[str, SlidingWindow] = {}
+        self._global = SlidingWindow(window_sec)
+        self.rejected = 0
+        self._consumed = 0
+
+
+    def consume(self, chars: int, user_id: Optional[str] = None,
+                guild_id: Optional[str] = None) -> List[Tuple[SlidingWindow, List]]:
+        """
+        上限を確認し、問題なければ文字数を計上します。上限を超える場合は QuotaExceededError を送出します。
+
+        Parameters:
+        ----------
+        chars : int
+            翻訳する文字数。
+        user_id : Optional[str]
+            依頼元のユーザーID。
+        guild_id : Optional[str]
+            依頼元のサーバーID（DMの場合は None）。
+
+        Returns:
+        ----------
+        charge : List[Tuple[SlidingWindow, List]]
+            今回の計上。翻訳に失敗した場合は refund に渡して取り消します。
+        """
+        now = time.monotonic()
+        checks = [("global", self._global, self.global_limit)]
+        if user_id is not None:
+            checks.append(("user", self._window(self._users, user_id), self.user_limit))
+        if guild_id is not None:
+            checks.append(("guild", self._window(self._guilds, guild_id), self.guild_limit))
+
+        if self.monthly_limit and self.monthly_count is not None:
+            used = self.monthly_count()
+            if used + chars > self.monthly_limit:
+                self.rejected += 1
+                raise QuotaExceededError("monthly", used, self.monthly_limit)
+
+        for scope, window, limit in checks:
+            used = window.total(now)
+            if limit and used + chars > limit:
+                self.rejected += 1
+                raise QuotaExceededError(scope, used, limit)
+
+        charge = [(window, window.add(chars, now)) for _, window, _ in checks]
+
+        # 定期的に利用のなくなった集計を破棄してメモリを抑える
+        self._consumed += 1
+        if self._consumed % 1000 == 0:
+            self._prune(now)
+
+        return charge
+
+
+    def refund(self, charge: List[Tuple[SlidingWindow, List]]) -> None:
+        """
+        翻訳に失敗した場合に、consume で計上した文字数を取り消します。
+
+        Parameters:
+        ----------
+        charge : List[Tuple[SlidingWindow, List]]
+            consume が返した計上。
+        """
+        for window, event in charge:
+            window.remove(event)
+
+        return
+
+
+    def usage(self, user_id: Optional[str] = None, guild_id: Optional[str] = None) -> dict:
+        """
+        現在の使用量と上限を取得します。
+
+        Returns:
+        ----------
+        usage : dict
+            "user" / "guild" / "global" / "monthly" ごとの {"used", "limit"} の辞書。
+        """
+        now = time.monotonic()
+        result = {"global": {"used": self._global.total(now), "limit": self.global_limit}}
+        if user_id is not None:
+            window = self._users.get(user_id)
+            result["user"] = {"used": window.total(now) if window else 0, "limit": self.user_limit}
+        if guild_id is not None:
+            window = self._guilds.get(guild_id)
+            result["guild"] = {"used": window.total(now) if window else 0, "limit": self.guild_limit}
+        if self.monthly_count is not None:
+            result["monthly"] = {"used": self.monthly_count(), "limit": self.monthly_limit}
+        self._prune(now)
+        return result
+
+
+    def _window(self, windows: Dict[str, SlidingWindow], key: str) -> SlidingWindow:
+        window = windows.get(key)
+        if window is None:
+            window = windows[key] = SlidingWindow(self.window_sec)
+        return window
+
+
+    def _prune(self, now: float) -> None:
+        # 期間内の利用がなくなったユーザー・サーバーの集計を破棄
+        for windows in (self._users, self._guilds):
+            for key in [key for key, window in windows.items() if window.total(now) <= 0]:
+                del windows[key]
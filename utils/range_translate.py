@@ -0,0 +1,410 @@
+import asyncio
+import json
+import os
+import tempfile
+import threading
+from typing import AsyncIterator, Callable, Dict, List, Optional, Tuple
+import discord
+from utils.embed_utils import build_translation_embeds, pack_embeds
+from utils.quota import QuotaExceededError
+from utils.text_protect import has_translatable_text
+from utils.translate_queue import PRIORITY_BULK, QueueSaturatedError
+
+
+async def iter_range_messages(channel: discord.abc.Messageable, start: discord.Message, finish: discord.Message,
+                              after_id: Optional[int] = None) -> AsyncIterator[discord.Message]:
+    """
+    開始〜終了メッセージ（両端を含む）を古い順に1件ずつ返す非同期ジェネレーター。
+    チャンネル履歴は discord.py が100件ずつページングして取得するため、件数に上限はなく、
+    メモリ上に全件を保持しません。
+
+    Parameters:
+    ----------
+    channel : discord.abc.Messageable
+        対象のチャンネル。
+    start : discord.Message
+        開始メッセージ。
+    finish : discord.Message
+        終了メッセージ。
+    after_id : Optional[int]
+        再開する場合の、翻訳済みの最後のメッセージID（このIDより後から返します）。
+    """
+    if after_id is None or after_id < start.id:
+        yield start
+        after = start
+    else:
+        after = discord.Object(id=after_id)
+
+    async for message in channel.history(limit=None, after=after, before=finish, oldest_first=True):
+        yield message
+
+    if after_id is None or after_id < finish.id:
+        yield finish
+
+
+class RangeCheckpointStore:
+    """
+    範囲翻訳の進捗（翻訳済みの最後のメッセージID）をユーザーごとにJSONファイルへ保存するクラス。
+    中断（混雑・DeepL障害・Bot再起動）後に同じ範囲を再度依頼すると、続きから翻訳を再開します。
+    """
+    def __init__(self, checkpoint_file: str):
+        """
+        RangeCheckpointStoreクラスのインスタンスを初期化します。ファイルは初回アクセス時に読み込みます。
+
+        Parameters:
+        ----------
+        checkpoint_file : str
+            進捗を保存するJSONファイルのパス。
+        """
+        self.checkpoint_file = checkpoint_file
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._jobs: Dict[str, dict] = {}
+
+
+    def get(self, user_id: str, job: dict) -> Optional[int]:
+        """
+        同じ範囲・条件の中断された翻訳があれば、翻訳済みの最後のメッセージIDを返します。
+
+        Parameters:
+        ----------
+        user_id : str
+            ユーザーID。
+        job : dict
+            範囲翻訳の条件（チャンネル・開始/終了メッセージID・翻訳先言語・出力形式）。
+
+        Returns:
+        ----------
+        last_id : Optional[int]
+            翻訳済みの最後のメッセージID。再開できない場合は None。
+        """
+        with self._lock:
+            self._ensure_loaded()
+            saved = self._jobs.get(str(user_id))
+        if saved is None or saved.get("job") != job:
+            return None
+        return saved.get("last_id")
+
+
+    def update(self, user_id: str, job: dict, last_id: int) -> None:
+        """
+        翻訳済みの最後のメッセージIDを保存します。
+
+        """
+        with self._lock:
+            self._ensure_loaded()
+            self._jobs[str(user_id)] = {"job": job, "last_id": last_id}
+        self._save()
+
+        return
+
+
+    def clear(self, user_id: str) -> None:
+        """
+        範囲翻訳の完了時に、ユーザーの進捗を削除します。
+
+        """
+        with self._lock:
+            self._ensure_loaded()
+            if self._jobs.pop(str(user_id), None) is None:
+                return
+        self._save()
+
+        return
+
+
+    def _save(self) -> None:
+        with self._lock:
+            data = dict(self._jobs)
+        try:
+            dir_path = os.path.dirname(self.checkpoint_file)
+            if dir_path and not os.path.exists(dir_path):
+                os.makedirs(dir_path, exist_ok=True)
+            tmp_file = self.checkpoint_file + ".tmp"
+            with open(tmp_file, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_file, self.checkpoint_file)
+        except Exception as e:
+            print(f"範囲翻訳の進捗の保存エラー: {e}")
+
+
+    def _ensure_loaded(self) -> None:
+        if self._loaded:
+            return
+        self._loaded = True
+        if not os.path.exists(self.checkpoint_file):
+            return
+        try:
+            with open(self.checkpoint_file, "r", encoding="utf-8") as f:
+                self._jobs = json.load(f)
+        except Exception as e:
+            print(f"範囲翻訳の進捗の読み込みエラー: {e}")
+
+
+class _EmbedSink:
+    # 翻訳結果を1メッセージあたりの上限（Embed数・文字数）までまとめてDM送信
+    def __init__(self, destination: discord.abc.Messageable):
+        self.destination = destination
+        self.pending: List[discord.Embed] = []
+        self.sent = 0
+        self.last_added: Optional[int] = None
+        self.delivered_id: Optional[int] = None
+
+
+    async def add(self, message: discord.Message, translated_text: str) -> None:
+        author = message.author
+        self.pending.extend(build_translation_embeds(
+            translated_text,
+            author.display_name,
+            author.avatar.url if author.avatar else None
+        ))
+        # 上限まで埋まったメッセージから送信し、残りは次の翻訳結果とまとめる
+        packed = pack_embeds(self.pending)
+        for embeds in packed[:-1]:
+            await self.destination.send(embeds=embeds)
+            self.sent += 1
+        self.pending = packed[-1]
+        self.last_added = message.id
+
+
+    async def flush(self) -> None:
+        if self.pending:
+            await self.destination.send(embeds=self.pending)
+            self.sent += 1
+            self.pending = []
+        self.delivered_id = self.last_added
+
+
+class _FileSink:
+    # 翻訳結果を一時ファイルへ書き出し、添付ファイルとしてDM送信（上限サイズごとに分割）
+    def __init__(self, destination: discord.abc.Messageable, temp_dir: Optional[str], max_bytes: int, filename: str):
+        self.destination = destination
+        self.temp_dir = temp_dir
+        self.max_bytes = max_bytes
+        self.filename = filename
+        self.sent = 0
+        self.last_added: Optional[int] = None
+        self.delivered_id: Optional[int] = None
+        self._file = None
+        self._size = 0
+        self._part = 0
+
+
+    async def add(self, message: discord.Message, translated_text: str) -> None:
+        line = f"[{message.created_at:%Y-%m-%d %H:%M} UTC] {message.author.display_name}\n{translated_text}\n\n"
+        size = len(line.encode("utf-8"))
+        if self._file is not None and self._size + size > self.max_bytes:
+            await self.flush()
+        if self._file is None:
+            self._file = tempfile.NamedTemporaryFile(
+                "w", encoding="utf-8", dir=self.temp_dir, suffix=".txt", delete=False
+            )
+            self._size = 0
+        self._file.write(line)
+        self._size += size
+        self.last_added = message.id
+
+
+    async def flush(self) -> None:
+        if self._file is None:
+            return
+        path = self._file.name
+        self._file.close()
+        self._file = None
+        self._part += 1
+        try:
+            name, ext = os.path.splitext(self.filename)
+            await self.destination.send(file=discord.File(path, filename=f"{name}_{self._part}{ext}"))
+            self.sent += 1
+            self.delivered_id = self.last_added
+        finally:
+            os.remove(path)
+
+
+async def translate_range(translator, destination: discord.abc.Messageable, messages: AsyncIterator[discord.Message],
+                          target_lang: str, user_id: Optional[str] = None, guild_id: Optional[str] = None,
+                          concurrency: int = 8, window_size: int = 50, progress_interval_sec: float = 2.0,
+                          max_messages: int = 0, as_file: bool = False, temp_dir: Optional[str] = None,
+                          file_max_bytes: int = 8 * 1024 * 1024, max_consecutive_errors: int = 5,
+                          on_checkpoint: Optional[Callable[[int], None]] = None) -> dict:
+    """
+    メッセージを一定件数（ウィンドウ）ごとに並行して翻訳し、元の順序で送信します。
+    メッセージは非同期ジェネレーターから順に読み込むため、範囲が大きくてもメモリ上には1ウィンドウ分のみ保持します。
+    進捗は1つの状況メッセージを編集して表示し、翻訳結果はEmbedにまとめてDM送信、またはテキストファイルとして添付します。
+
+    Parameters:
+    ----------
+    translator : Translator
+        翻訳に使用する translate_pub.Translator。
+    destination : discord.abc.Messageable
+        翻訳結果の送信先（ユーザーのDM等）。
+    messages : AsyncIterator[discord.Message]
+        翻訳するメッセージ（古い順）。翻訳する文字がないメッセージは除外します。
+    target_lang : str
+        翻訳先の言語コード。
+    user_id : Optional[str]
+        依頼元のユーザーID。
+    guild_id : Optional[str]
+        依頼元のサーバーID。
+    concurrency : int
+        同時に翻訳するメッセージ数の上限。
+    window_size : int
+        一度に読み込んで翻訳するメッセージ数。
+    progress_interval_sec : float
+        状況メッセージを更新する最小間隔（秒）。
+    max_messages : int
+        翻訳する最大メッセージ数（0の場合は無制限）。
+    as_file : bool
+        True の場合、翻訳結果をテキストファイルとして添付します。
+    temp_dir : Optional[str]
+        テキストファイルの一時保存先。
+    file_max_bytes : int
+        1ファイルあたりの最大サイズ（超える場合は分割して送信）。
+    max_consecutive_errors : int
+        翻訳エラーがこの件数続いた場合に中断します（0の場合は中断しない）。
+        連続したエラーは次の翻訳が成功するまで送信を保留し、中断時は再開位置に含めません。
+    on_checkpoint : Optional[Callable[[int], None]]
+        翻訳結果の送信ごとに、送信済みの最後のメッセージIDを渡して呼び出す関数。
+
+    Returns:
+    ----------
+    result : dict
+        翻訳数・エラー数・送信メッセージ数・所要時間・中断理由・上限到達の有無の辞書。
+    """
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    status = await destination.send("🔄 翻訳中... 0件")
+    if as_file:
+        sink = _FileSink(destination, temp_dir, file_max_bytes, f"translation_{target_lang.lower()}.txt")
+    else:
+        sink = _EmbedSink(destination)
+
+    semaphore = asyncio.Semaphore(concurrency)
+    completed = 0
+    checkpoint_id = None
+
+    def save_checkpoint(message_id: Optional[int]) -> None:
+        nonlocal checkpoint_id
+        # 進捗は先へ進む場合のみ記録
+        if on_checkpoint is None or message_id is None or \
+                (checkpoint_id is not None and message_id <= checkpoint_id):
+            return
+        checkpoint_id = message_id
+        on_checkpoint(message_id)
+
+    async def translate_one(message: discord.Message):
+        nonlocal completed
+        async with semaphore:
+            result = await translator.translate(
+                message.content, target_lang, priority=PRIORITY_BULK, user_id=user_id, guild_id=guild_id
+            )
+        completed += 1
+        return result
+
+    translated = 0
+    errors = 0
+    # 送信を保留している連続した翻訳エラー（次の成功時にまとめて送信）
+    failed: List[Tuple[discord.Message, str]] = []
+    aborted = None
+    truncated = False
+    last_progress = started
+    iterator = messages.__aiter__()
+    finished = False
+    tasks: List[asyncio.Task] = []
+    try:
+        while not finished and aborted is None:
+            # 次のウィンドウを読み込む（翻訳する文字がないメッセージは進捗の記録のみ）
+            window: List[discord.Message] = []
+            last_id = None
+            while len(window) < window_size:
+                if max_messages and translated + errors + len(failed) + len(window) >= max_messages:
+                    truncated = True
+                    finished = True
+                    break
+                try:
+                    message = await iterator.__anext__()
+                except StopAsyncIteration:
+                    finished = True
+                    break
+                last_id = message.id
+                if has_translatable_text(message.content):
+                    window.append(message)
+
+            # ウィンドウ内は並行して翻訳し、送信は元の順序で行う
+            tasks = [asyncio.create_task(translate_one(message)) for message in window]
+            for message, task in zip(window, tasks):
+                translated_text, source_lang = await task
+                if source_lang == "ERROR":
+                    # DeepL障害中は残りのメッセージもすべて失敗するため打ち切る
+                    if translator.breaker.is_open():
+                        aborted = "⚠️ 翻訳サービスが一時的に利用できないため、複数翻訳を中断しました。同じ範囲を再度指定すると続きから再開します。"
+                        break
+                    failed.append((message, translated_text))
+                    # エラーが続く場合（文字数の上限・認証エラー等）は残りも失敗するため打ち切る
+                    if max_consecutive_errors and len(failed) >= max_consecutive_errors:
+                        aborted = f"⚠️ 翻訳エラーが{len(failed)}件続いたため、複数翻訳を中断しました（{translated_text}）。"
+                        break
+                    continue
+
+                for failed_message, error_text in failed:
+                    await sink.add(failed_message, error_text)
+                    errors += 1
+                failed.clear()
+                translated += 1
+                await sink.add(message, translated_text)
+
+                if loop.time() - last_progress >= progress_interval_sec:
+                    await status.edit(content=f"🔄 翻訳中... {completed}件")
+                    last_progress = loop.time()
+
+            if aborted is None:
+                # 送信済みの位置まで進捗を記録（再開時に重複・欠落しないように）
+                # ファイル出力は添付済みの分まで、Embedはウィンドウごとに送信して翻訳対象外のメッセージも含めて記録
+                # 送信を保留しているエラーがある場合は、送信済みの位置までのみ記録
+                if as_file:
+                    save_checkpoint(sink.delivered_id)
+                else:
+                    await sink.flush()
+                    save_checkpoint(sink.delivered_id if failed else last_id)
+
+        # 最後まで翻訳した場合は、保留中のエラーも送信
+        if aborted is None:
+            for failed_message, error_text in failed:
+                await sink.add(failed_message, error_text)
+                errors += 1
+            failed.clear()
+
+    except QuotaExceededError as err:
+        # 翻訳文字数の上限に達した場合は、残りのメッセージもすべて失敗するため打ち切る
+        print(f"複数翻訳を打ち切り: {err}")
+        aborted = f"⚠️ 翻訳文字数の上限に達したため、複数翻訳を中断しました（{err.scope}: {err.used:,} / {err.limit:,}）。"
+
+    except QueueSaturatedError as err:
+        # 混雑時は一括翻訳を打ち切り、翻訳済みの分のみ送信
+        print(f"複数翻訳を打ち切り: {err}")
+        aborted = "⚠️ 翻訳が混雑しているため、複数翻訳を中断しました。同じ範囲を再度指定すると続きから再開します。"
+
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if hasattr(iterator, "aclose"):
+            await iterator.aclose()
+        await sink.flush()
+        save_checkpoint(sink.delivered_id)
+
+    elapsed = loop.time() - started
+    if aborted:
+        await status.edit(content=f"⏹️ 翻訳を中断: {translated}件 ({elapsed:.1f}秒)")
+        await destination.send(aborted)
+    else:
+        await status.edit(content=f"✅ 翻訳完了: {translated}件 ({elapsed:.1f}秒)")
+
+    return {
+        "translated": translated,
+        "errors": errors,
+        "messages_sent": sink.sent,
+        "elapsed_sec": elapsed,
+        "aborted": aborted,
+        "truncated": truncated,
+    }
@@ -0,0 +1,161 @@
+import asyncio
+import email.utils
+import random
+import time
+from typing import Optional
+
+
+class TokenBucket:
+    """
+    トークンバケット方式のレートリミッター。
+    平均 rate 回/秒、最大 capacity 回までのバーストを許可します。
+    """
+    def __init__(self, rate: float, capacity: int):
+        """
+        TokenBucketクラスのインスタンスを初期化します。
+
+        Parameters:
+        ----------
+        rate : float
+            1秒あたりに補充するトークン数。
+        capacity : int
+            バケットの最大トークン数（許可するバースト数）。
+        """
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+
+    async def acquire(self, tokens: float = 1.0) -> None:
+        """
+        トークンを取得します。不足している場合は補充されるまで待機します。
+
+        Parameters:
+        ----------
+        tokens : float
+            取得するトークン数。
+        """
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                await asyncio.sleep((tokens - self._tokens) / self.rate)
+
+
+class AdaptiveConcurrency:
+    """
+    同時実行数の上限を観測結果に応じて調整するリミッター（AIMD方式）。
+    スロットリングを検知すると上限を半減し、成功が続くと1ずつ増やします。
+    async with で使用します。
+    """
+    def __init__(self, min_limit: int = 1, max_limit: int = 8, initial_limit: Optional[int] = None):
+        """
+        AdaptiveConcurrencyクラスのインスタンスを初期化します。
+
+        Parameters:
+        ----------
+        min_limit : int
+            同時実行数の下限。
+        max_limit : int
+            同時実行数の上限。
+        initial_limit : Optional[int]
+            初期の同時実行数。指定しない場合は max_limit。
+        """
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.limit = initial_limit or max_limit
+        self.in_flight = 0
+        self._successes = 0
+        self._cond = asyncio.Condition()
+
+
+    async def __aenter__(self) -> "AdaptiveConcurrency":
+        async with self._cond:
+            await self._cond.wait_for(lambda: self.in_flight < self.limit)
+            self.in_flight += 1
+        return self
+
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        async with self._cond:
+            self.in_flight -= 1
+            self._cond.notify_all()
+
+
+    def on_success(self) -> None:
+        """
+        成功を記録します。現在の上限と同じ回数だけ成功が続いたら上限を1増やします。
+
+        """
+        self._successes += 1
+        if self._successes >= self.limit and self.limit < self.max_limit:
+            self.limit += 1
+            self._successes = 0
+
+        return
+
+
+    def on_throttle(self) -> None:
+        """
+        スロットリング（429等）を記録し、上限を半減します。
+
+        """
+        self.limit = max(self.min_limit, self.limit // 2)
+        self._successes = 0
+
+        return
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """
+    Retry-After ヘッダーの値（秒数またはHTTP日付）を待機秒数に変換します。
+
+    Parameters:
+    ----------
+    value : Optional[str]
+        Retry-After ヘッダーの値。
+
+    Returns:
+    ----------
+    seconds : Optional[float]
+        待機秒数。解析できない場合は None。
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, retry_at.timestamp() - time.time())
+
+
+def backoff_delay(attempt: int, base_sec: float, max_sec: float) -> float:
+    """
+    ジッター付き指数バックオフの待機秒数を計算します。
+
+    Parameters:
+    ----------
+    attempt : int
+        リトライ回数（0始まり）。
+    base_sec : float
+        初回の待機秒数。
+    max_sec : float
+        待機秒数の上限。
+
+    Returns:
+    ----------
+    seconds : float
+        待機秒数（上限値の半分〜上限値の範囲でランダム）。
+    """
+    delay = min(max_sec, base_sec * (2 ** attempt))
+    return random.uniform(delay / 2, delay)
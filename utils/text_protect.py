@@ -0,0 +1,111 @@
+import html
+import re
+from typing import List, Tuple
+
+# 翻訳しない部分（コードブロック・インラインコード・URL・メンション・カスタム絵文字・タイムスタンプ）
+_PROTECT_PATTERN = re.compile(
+    r"```.*?```"                    # コードブロック
+    r"|`[^`\n]+`"                   # インラインコード
+    r"|https?://[^\s<>]+"           # URL
+    r"|<@[!&]?\d+>|<#\d+>"          # ユーザー・ロール・チャンネルのメンション
+    r"|<a?:\w+:\d+>"                # カスタム絵文字
+    r"|<t:-?\d+(?::[tTdDfFR])?>"    # タイムスタンプ
+    r"|@everyone|@here",
+    re.DOTALL,
+)
+# DeepLのXMLタグ処理で保持されるプレースホルダー
+_PLACEHOLDER_PATTERN = re.compile(r'<x\s+i\s*=\s*"(\d+)"\s*/>')
+
+
+def protect(text: str) -> Tuple[str, List[str]]:
+    """
+    翻訳しない部分をXMLのプレースホルダーに置き換え、残りをXMLエスケープします。
+    DeepLには tag_handling=xml を指定して送信してください。
+
+    Parameters:
+    ----------
+    text : str
+        翻訳する元テキスト。
+
+    Returns:
+    ----------
+    masked_text : str
+        プレースホルダー置換・エスケープ後のテキスト。
+    spans : List[str]
+        置き換えた元の文字列（プレースホルダーの番号順）。
+    """
+    spans: List[str] = []
+    parts: List[str] = []
+    pos = 0
+    for match in _PROTECT_PATTERN.finditer(text):
+        parts.append(html.escape(text[pos:match.start()], quote=False))
+        parts.append(f'<x i="{len(spans)}"/>')
+        spans.append(match.group(0))
+        pos = match.end()
+    parts.append(html.escape(text[pos:], quote=False))
+    return "".join(parts), spans
+
+
+def restore(translated_text: str, spans: List[str]) -> str:
+    """
+    protect で置き換えたプレースホルダーを元の文字列に戻し、XMLエスケープを解除します。
+
+    Parameters:
+    ----------
+    translated_text : str
+        DeepLが返した翻訳テキスト。
+    spans : List[str]
+        protect が返した元の文字列のリスト。
+
+    Returns:
+    ----------
+    restored_text : str
+        元の文字列を戻した翻訳テキスト。
+    """
+    parts: List[str] = []
+    pos = 0
+    for match in _PLACEHOLDER_PATTERN.finditer(translated_text):
+        index = int(match.group(1))
+        parts.append(html.unescape(translated_text[pos:match.start()]))
+        parts.append(spans[index] if index < len(spans) else "")
+        pos = match.end()
+    parts.append(html.unescape(translated_text[pos:]))
+    return "".join(parts)
+
+
+def has_translatable_text(text: str) -> bool:
+    """
+    翻訳しない部分を除いて、文字が残っているかを返します。
+    空のメッセージや、URL・メンション・絵文字のみのメッセージは False になります。
+
+    Parameters:
+    ----------
+    text : str
+        判定するテキスト。
+
+    Returns:
+    ----------
+    result : bool
+        翻訳する必要がある文字が含まれていれば True。
+    """
+    if not text:
+        return False
+    return any(ch.isalpha() for ch in _PROTECT_PATTERN.sub("", text))
+
+
+def protected_spans(text: str) -> List[Tuple[int, int]]:
+    """
+    翻訳しない部分（コードブロック・URL・メンション等）の位置を返します。
+    長文の分割時に、これらの途中で区切らないために使用します。
+
+    Parameters:
+    ----------
+    text : str
+        対象のテキスト。
+
+    Returns:
+    ----------
+    spans : List[Tuple[int, int]]
+        (開始位置, 終了位置) のリスト（開始位置の順）。
+    """
+    return [match.span() for match in _PROTECT_PATTERN.finditer(text)]
@@ -0,0 +1,125 @@
+import bisect
+import re
+from typing import List, Optional, Tuple
+from utils.text_protect import protected_spans
+
+# 文の区切り（句点・感嘆符・疑問符の後の空白、または全角句読点の直後）
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+|(?<=[。！？])")
+
+
+def split_text(text: str, max_chars: int) -> List[Tuple[str, str]]:
+    """
+    長いテキストを段落・文の区切りで max_chars 以下の塊に分割します。
+    区切りの空白・改行は翻訳せずに後で戻せるよう、本文と分けて返します。
+    コードブロック・URL・メンション等（翻訳しない部分）の途中では区切らず、1つの単位として扱います
+    （max_chars を超える場合はその塊のみ max_chars を超えます）。
+
+    Parameters:
+    ----------
+    text : str
+        分割するテキスト。
+    max_chars : int
+        1つの塊の最大文字数。
+
+    Returns:
+    ----------
+    chunks : List[Tuple[str, str]]
+        (本文, 直後の区切り文字列) のリスト。すべて連結すると元のテキストになります。
+    """
+    spans = protected_spans(text)
+    pieces = []
+    offset = 0
+    for body, sep in _split_keep(text, re.compile(r"\n\s*\n"), spans):
+        body_offset = offset
+        offset += len(body) + len(sep)
+        if len(body) <= max_chars:
+            pieces.append((body, sep))
+            continue
+        # 段落が長い場合は文単位、さらに長い場合は文字数で分割
+        sentences = _split_keep(body, _SENTENCE_END, spans, body_offset)
+        sentence_offset = body_offset
+        for i, (sentence, sentence_sep) in enumerate(sentences):
+            base = sentence_offset
+            sentence_offset += len(sentence) + len(sentence_sep)
+            last_sep = sentence_sep + sep if i == len(sentences) - 1 else sentence_sep
+            if not sentence:
+                pieces.append(("", last_sep))
+                continue
+            start = 0
+            while start < len(sentence):
+                cut = min(start + max_chars, len(sentence))
+                # 翻訳しない部分の途中で区切る場合は、その手前（先頭からの場合は直後）で区切る
+                span = _span_at(spans, base + cut)
+                if span is not None:
+                    cut = span[0] - base if span[0] - base > start else span[1] - base
+                pieces.append((sentence[start:cut], last_sep if cut >= len(sentence) else ""))
+                start = cut
+
+    # 小さな塊を max_chars までまとめてリクエスト数を抑える
+    chunks: List[Tuple[str, str]] = []
+    for body, sep in pieces:
+        if chunks and len(chunks[-1][0]) + len(chunks[-1][1]) + len(body) <= max_chars:
+            prev_body, prev_sep = chunks[-1]
+            chunks[-1] = (prev_body + prev_sep + body, sep)
+        else:
+            chunks.append((body, sep))
+    return chunks
+
+
+def paginate(text: str, max_chars: int) -> List[str]:
+    """
+    テキストを改行位置で max_chars 以下のページに分割します（Embedの文字数制限対策）。
+
+    Parameters:
+    ----------
+    text : str
+        分割するテキスト。
+    max_chars : int
+        1ページの最大文字数。
+
+    Returns:
+    ----------
+    pages : List[str]
+        ページのリスト。空のテキストの場合は [""]。
+    """
+    pages: List[str] = []
+    current = ""
+    for line in text.splitlines(keepends=True):
+        while len(line) > max_chars:
+            if current:
+                pages.append(current)
+                current = ""
+            pages.append(line[:max_chars])
+            line = line[max_chars:]
+        if len(current) + len(line) > max_chars:
+            pages.append(current)
+            current = ""
+        current += line
+    if current or not pages:
+        pages.append(current)
+    return pages
+
+
+def _span_at(spans: List[Tuple[int, int]], pos: int) -> Optional[Tuple[int, int]]:
+    # pos が翻訳しない部分の内側（両端を除く）にあれば、その範囲を返す
+    index = bisect.bisect_left(spans, (pos, pos)) - 1
+    if index >= 0 and spans[index][0] < pos < spans[index][1]:
+        return spans[index]
+    return None
+
+
+def _split_keep(text: str, pattern: "re.Pattern", spans: List[Tuple[int, int]] = (),
+                offset: int = 0) -> List[Tuple[str, str]]:
+    # 区切り文字列を保持したまま分割（翻訳しない部分の内側の区切りは無視）
+    parts: List[Tuple[str, str]] = []
+    pos = 0
+    for match in pattern.finditer(text):
+        if match.end() == pos or match.start() == 0:
+            continue
+        if _span_at(spans, offset + match.start()) is not None or _span_at(spans, offset + match.end()) is not None:
+            continue
+        parts.append((text[pos:match.start()], match.group(0)))
+        pos = match.end()
+    if pos < len(text) or not parts:
+        parts.append((text[pos:], ""))
+    return parts
@@ -1,7 +1,7 @@
 import os
 import json
-import aiohttp
 from datetime import datetime
+from utils.http_session import get_shared_session
 
 CHAR_COUNT_FILE = "data/char_count.json"
 DEEPL_API_KEY = os.getenv("DEEPL_API_KEY")
@@ -22,16 +22,17 @@ def update_char_count(add_count: int):
         json.dump(data, f, ensure_ascii=False, indent=2)
 
 async def translate(text, target_lang):
-    async with aiohttp.ClientSession() as session:
-        data = {
-            "auth_key": DEEPL_API_KEY,
-            "text": text,
-            "target_lang": target_lang
-        }
-        async with session.post(DEEPL_API_URL, data=data) as resp:
-            if resp.status == 200:
-                res_json = await resp.json()
-                update_char_count(len(text))
-                return res_json["translations"][0]["text"]
-            else:
-                return "[翻訳エラー]"
+    # 共有セッションを再利用（接続をキープアライブ）
+    session = get_shared_session()
+    data = {
+        "auth_key": DEEPL_API_KEY,
+        "text": text,
+        "target_lang": target_lang
+    }
+    async with session.post(DEEPL_API_URL, data=data) as resp:
+        if resp.status == 200:
+            res_json = await resp.json()
+            update_char_count(len(text))
+            return res_json["translations"][0]["text"]
+        else:
+            return "[翻訳エラー]"
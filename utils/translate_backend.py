@@ -0,0 +1,339 @@
+import aiohttp
+import asyncio
+import hashlib
+import time
+from typing import Dict, List, Optional, Tuple
+import config   # config.py から読み込む：相対パスのためエラーとなる可能性がある
+from utils.char_counter import CharCounter
+from utils.rate_limit import parse_retry_after
+
+# DeepL API Free の公式URL（config の値がこれ以外に変更されていれば、明示的な指定とみなす）
+_FREE_API_URL = "https://api-free.deepl.com/v2/translate"
+_FREE_USAGE_URL = "https://api-free.deepl.com/v2/usage"
+
+
+def is_free_key(api_key: str) -> bool:
+    """
+    DeepL API Free のキー（":fx" で終わる）かを返します。
+
+    """
+    return api_key.endswith(":fx")
+
+
+def make_key_id(api_key: str) -> str:
+    """
+    ファイル・ログに記録するためのAPIキーのID（ハッシュの先頭）を作成します。
+
+    """
+    return hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:12]
+
+
+class DeepLError(Exception):
+    """
+    DeepL APIが200以外のステータスを返した場合の例外。
+    """
+    def __init__(self, status: int, detail: str = "", retry_after: Optional[float] = None):
+        super().__init__(f"{status} : {detail}")
+        self.status = status
+        self.detail = detail
+        self.retry_after = retry_after
+
+
+class TranslationBackend:
+    """
+    翻訳バックエンドのインターフェース。Translator はこのクラスを通して翻訳APIを呼び出します。
+    """
+    name = "base"
+    key_count = 1                   # 使用するAPIキーの数（レート制限・同時実行数の倍率）
+    char_limit = config.CHAR_LIMIT  # 月間の上限文字数（全キーの合計）
+
+    async def translate(self, session: aiohttp.ClientSession, texts: List[str], target_lang: str,
+                        params: Optional[List[Tuple[str, str]]] = None) -> List[Tuple[str, str]]:
+        """
+        複数のテキストを1回のリクエストで翻訳します。
+
+        Parameters:
+        ----------
+        session : aiohttp.ClientSession
+            使用するHTTPセッション。
+        texts : List[str]
+            翻訳する元テキストのリスト。
+        target_lang : str
+            翻訳先の言語コード。
+        params : Optional[List[Tuple[str, str]]]
+            追加のリクエストパラメータ（tag_handling 等）。
+
+        Returns:
+        ----------
+        results : List[Tuple[str, str]]
+            texts と同じ順序の (翻訳されたテキスト, 翻訳元言語) のリスト。
+            失敗した場合は DeepLError を送出します。
+        """
+        raise NotImplementedError
+
+
+    async def usage(self, session: aiohttp.ClientSession) -> dict:
+        """
+        当月の使用量を取得します。
+
+        Returns:
+        ----------
+        usage : dict
+            "character_count" と "character_limit" を含む辞書。
+        """
+        raise NotImplementedError
+
+
+    def restore_counts(self, counts: Dict[str, int]) -> None:
+        """
+        文字数カウントファイルに記録されたキーごとの文字数を反映します（起動時の読み込み用）。
+
+        Parameters:
+        ----------
+        counts : Dict[str, int]
+            キーIDごとの当月の翻訳文字数。
+        """
+        return
+
+
+class DeepLBackend(TranslationBackend):
+    """
+    DeepL API（または互換のモックサーバー）を呼び出すバックエンド。
+    """
+    name = "deepl"
+
+    def __init__(self, api_key: str, api_url: Optional[str] = None, usage_url: Optional[str] = None):
+        """
+        DeepLBackendクラスのインスタンスを初期化します。
+
+        Parameters:
+        ----------
+        api_key : str
+            DeepLのAPIキー。
+        api_url : Optional[str]
+            翻訳APIのURL。指定しない場合はキーの種類（Free / Pro）に応じて config から選択します。
+            config.DEEPL_API_URL が変更されている場合（モックサーバー等）は、キーの種類に関わらずそのURLを使用します。
+        usage_url : Optional[str]
+            使用量取得APIのURL。指定しない場合は api_url と同様に config から選択します。
+        """
+        free = is_free_key(api_key)
+        self.api_key = api_key
+        if api_url is None:
+            custom = config.DEEPL_API_URL != _FREE_API_URL
+            api_url = config.DEEPL_API_URL if free or custom else config.DEEPL_PRO_API_URL
+        if usage_url is None:
+            custom = config.DEEPL_USAGE_URL != _FREE_USAGE_URL
+            usage_url = config.DEEPL_USAGE_URL if free or custom else config.DEEPL_PRO_USAGE_URL
+        self.api_url = api_url
+        self.usage_url = usage_url
+
+
+    async def translate(self, session: aiohttp.ClientSession, texts: List[str], target_lang: str,
+                        params: Optional[List[Tuple[str, str]]] = None) -> List[Tuple[str, str]]:
+        data = [("auth_key", self.api_key), ("target_lang", target_lang)]
+        data += params or []
+        data += [("text", text) for text in texts]
+
+        async with session.post(self.api_url, data=data) as resp:
+            if resp.status != 200:
+                raise DeepLError(resp.status, await resp.text(), parse_retry_after(resp.headers.get("Retry-After")))
+            res_json = await resp.json()
+
+        return [(item["text"], item["detected_source_language"]) for item in res_json["translations"]]
+
+
+    async def usage(self, session: aiohttp.ClientSession) -> dict:
+        async with session.get(self.usage_url, params={"auth_key": self.api_key}) as resp:
+            if resp.status != 200:
+                raise DeepLError(resp.status, await resp.text(), parse_retry_after(resp.headers.get("Retry-After")))
+            return await resp.json()
+
+
+class KeyState:
+    """
+    APIキーごとの使用量・応答時間・利用可否。
+    """
+    def __init__(self, backend: DeepLBackend, char_limit: int):
+        self.backend = backend
+        self.key_id = make_key_id(backend.api_key)
+        self.count = 0
+        self.char_limit = char_limit
+        self.latency = 0.0          # 応答時間の指数移動平均（秒）
+        self.in_flight = 0
+        self.drained = False        # 上限超過（456）・認証エラー（403）で使用停止
+        self.cooldown_until = 0.0   # 429 の Retry-After までは使用しない
+        self.requests = 0
+        self.errors = 0
+
+
+    @property
+    def remaining(self) -> int:
+        return max(0, self.char_limit - self.count)
+
+
+    def score(self) -> float:
+        # 残り文字数が多く、応答時間が短く、実行中の少ないキーを優先
+        return self.remaining / (max(self.latency, 0.05) * (1 + self.in_flight))
+
+
+class KeyPoolBackend(TranslationBackend):
+    """
+    複数のDeepL APIキー（Free / Pro）を使い分けるバックエンド。
+    残り文字数が多く応答の速いキーへ振り分け、上限に達したキー（456）は自動的に除外します。
+    """
+    name = "deepl_pool"
+
+    def __init__(self, api_keys: List[str], char_counter: Optional[CharCounter] = None,
+                 char_limit_per_key: int = config.CHAR_LIMIT, latency_alpha: float = 0.2):
+        """
+        KeyPoolBackendクラスのインスタンスを初期化します。
+
+        Parameters:
+        ----------
+        api_keys : List[str]
+            DeepLのAPIキーのリスト。
+        char_counter : Optional[CharCounter]
+            キーごとの文字数を記録する文字数カウント。
+        char_limit_per_key : int
+            使用量を取得するまでの、キーごとの月間の上限文字数。
+        latency_alpha : float
+            応答時間の指数移動平均の係数。
+        """
+        if not api_keys:
+            raise ValueError("api_keys is empty")
+        self.keys = [KeyState(DeepLBackend(key), char_limit_per_key) for key in dict.fromkeys(api_keys)]
+        self.char_counter = char_counter
+        self.latency_alpha = latency_alpha
+
+
+    @property
+    def key_count(self) -> int:
+        # 除外したキーはレート制限・同時実行数の倍率に含めない
+        return max(1, sum(1 for key in self.keys if not key.drained))
+
+
+    @property
+    def char_limit(self) -> int:
+        return sum(key.char_limit for key in self.keys)
+
+
+    def restore_counts(self, counts: Dict[str, int]) -> None:
+        # 再起動前に使用した文字数を引き継ぐ（翻訳済みの分は既に加算されているため大きい方を使用）
+        for key in self.keys:
+            key.count = max(key.count, int(counts.get(key.key_id, 0)))
+
+        return
+
+
+    async def translate(self, session: aiohttp.ClientSession, texts: List[str], target_lang: str,
+                        params: Optional[List[Tuple[str, str]]] = None) -> List[Tuple[str, str]]:
+        chars = sum(len(text) for text in texts)
+        tried = set()
+        while True:
+            key = self._pick(chars, tried)
+            if key is None:
+                raise DeepLError(456, "all API keys are exhausted")
+            tried.add(key.key_id)
+
+            key.in_flight += 1
+            key.requests += 1
+            started = time.monotonic()
+            try:
+                results = await key.backend.translate(session, texts, target_lang, params)
+            except DeepLError as err:
+                key.errors += 1
+                if err.status in (403, 456):
+                    # 上限超過・認証エラーのキーは除外して別のキーで再送
+                    key.drained = True
+                    print(f"DeepL APIキーを除外: {key.key_id} ({err.status})")
+                    continue
+                if err.status == 429:
+                    key.cooldown_until = time.monotonic() + (err.retry_after or 1.0)
+                raise
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                key.errors += 1
+                raise
+            finally:
+                key.in_flight -= 1
+                self._observe_latency(key, time.monotonic() - started)
+
+            key.count += chars
+            if self.char_counter is not None:
+                self.char_counter.add(chars, key_id=key.key_id)
+            return results
+
+
+    async def usage(self, session: aiohttp.ClientSession) -> dict:
+        """
+        すべてのキーの使用量を取得し、キーごとの状態を更新します。
+
+        Returns:
+        ----------
+        usage : dict
+            全キー合計の "character_count" / "character_limit" と、キーIDごとの使用量 "keys"。
+        """
+        results = await asyncio.gather(*(key.backend.usage(session) for key in self.keys), return_exceptions=True)
+        keys = {}
+        for key, result in zip(self.keys, results):
+            if isinstance(result, DeepLError) and result.status == 403:
+                key.drained = True
+            if isinstance(result, BaseException):
+                print(f"DeepL API使用量取得エラー: {key.key_id} : {result}")
+                continue
+            key.count = int(result.get("character_count", key.count))
+            key.char_limit = int(result.get("character_limit", key.char_limit))
+            # 月が替わる等で残りがあれば再び使用する
+            key.drained = key.remaining <= 0
+            if self.char_counter is not None:
+                self.char_counter.set_count(key.count, key_id=key.key_id)
+            keys[key.key_id] = {"character_count": key.count, "character_limit": key.char_limit}
+
+        if not keys:
+            raise DeepLError(503, "failed to get usage for all API keys")
+        return {
+            "character_count": sum(key.count for key in self.keys),
+            "character_limit": self.char_limit,
+            "keys": keys,
+        }
+
+
+    def stats(self) -> List[dict]:
+        """
+        キーごとの状態を取得します。
+
+        Returns:
+        ----------
+        stats : List[dict]
+            キーID・種類・使用量・上限・応答時間・実行中数・除外状態等の辞書のリスト。
+        """
+        return [{
+            "key_id": key.key_id,
+            "free": is_free_key(key.backend.api_key),
+            "count": key.count,
+            "limit": key.char_limit,
+            "latency_ms": round(key.latency * 1000, 1),
+            "in_flight": key.in_flight,
+            "requests": key.requests,
+            "errors": key.errors,
+            "drained": key.drained,
+        } for key in self.keys]
+
+
+    def _pick(self, chars: int, tried: set) -> Optional[KeyState]:
+        now = time.monotonic()
+        candidates = [key for key in self.keys
+                      if not key.drained and key.key_id not in tried and key.remaining >= chars]
+        if not candidates:
+            return None
+        # 429 の待機中でないキーを優先（すべて待機中なら待機の短いキー）
+        ready = [key for key in candidates if key.cooldown_until <= now]
+        if not ready:
+            return min(candidates, key=lambda key: key.cooldown_until)
+        return max(ready, key=lambda key: key.score())
+
+
+    def _observe_latency(self, key: KeyState, elapsed: float) -> None:
+        if key.latency == 0.0:
+            key.latency = elapsed
+        else:
+            key.latency += self.latency_alpha * (elapsed - key.latency)
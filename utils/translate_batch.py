@@ -0,0 +1,207 @@
+import asyncio
+import contextlib
+import urllib.parse
+from typing import AsyncContextManager, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+# 複数テキストを一括翻訳する関数: (テキストのリスト, 翻訳先言語) -> [(翻訳されたテキスト, 翻訳元言語), ...]
+SendFunc = Callable[[List[str], str], Awaitable[List[Tuple[str, str]]]]
+# 送信の許可（レート制限・同時実行数の枠）を取得する関数。async with の間だけ枠を保持する
+PermitFunc = Callable[[], AsyncContextManager]
+
+
+def encoded_size(text: str) -> int:
+    """
+    テキストをフォーム形式（application/x-www-form-urlencoded）の text パラメーターとして送信する場合のバイト数。
+    日本語・中国語等は1文字あたり9バイトになるため、文字数ではなくこの値でリクエストの大きさを制限します。
+
+    """
+    return len(urllib.parse.quote_plus(text)) + len("text=&")
+
+
+class _PendingBatch:
+    """
+    送信待ちのバッチ（同じ翻訳先言語の依頼と、その Future）。
+    """
+    def __init__(self):
+        self.items: List[Tuple[str, asyncio.Future]] = []
+        self.chars = 0
+        self.bytes = 0
+        # 上限に達した・送信を急ぐ場合にセット（最大待ち時間を待たずに送信の許可を取りに行く）
+        self.full = asyncio.Event()
+
+
+class TranslationBatcher:
+    """
+    短時間に届いた同じ翻訳先言語の翻訳依頼をまとめ、1回の複数テキスト翻訳リクエストとして送信するクラス。
+    送信の許可（レート制限・同時実行数）を待つ間もバッチは上限まで依頼を受け付け、許可を得た時点で締め切ります。
+    結果は依頼ごとの Future に振り分けて返します。
+    """
+    def __init__(self, send_func: SendFunc, max_batch_size: int = 25, max_wait_ms: float = 10.0,
+                 max_batch_chars: int = 30000, max_batch_bytes: int = 120 * 1024,
+                 permit_func: Optional[PermitFunc] = None):
+        """
+        TranslationBatcherクラスのインスタンスを初期化します。
+
+        Parameters:
+        ----------
+        send_func : SendFunc
+            複数テキストを一括翻訳するコルーチン関数。送信の許可を保持したまま呼び出します。
+        max_batch_size : int
+            1リクエストにまとめる最大テキスト数（DeepLの上限は50）。
+        max_wait_ms : float
+            最初の依頼から送信の許可を取りに行くまでの最大待ち時間（ミリ秒）。
+        max_batch_chars : int
+            1リクエストにまとめる最大文字数。
+        max_batch_bytes : int
+            1リクエストにまとめる最大サイズ（URLエンコード後のバイト数。DeepLのリクエストの上限は128KiB）。
+        permit_func : Optional[PermitFunc]
+            送信の許可を取得する非同期コンテキストマネージャーを返す関数。指定しない場合は待機しません。
+        """
+        self.send_func = send_func
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self.max_batch_chars = max_batch_chars
+        self.max_batch_bytes = max_batch_bytes
+        self.permit_func = permit_func
+        self._pending: Dict[str, _PendingBatch] = {}
+        self._tasks: Set[asyncio.Task] = set()
+        self.batches_sent = 0
+        self.texts_sent = 0
+
+
+    async def submit(self, text: str, target_lang: str) -> Tuple[str, str]:
+        """
+        翻訳依頼をバッチに追加し、結果を待ちます。
+
+        Parameters:
+        ----------
+        text : str
+            翻訳する元テキスト。
+        target_lang : str
+            翻訳先の言語コード。
+
+        Returns:
+        ----------
+        result : Tuple[str, str]
+            (翻訳されたテキスト, 翻訳元言語)。送信に失敗した場合は例外を送出します。
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+
+        # 文字数・サイズの上限を超える場合は既存分を締め切り、新しいバッチに追加
+        size = encoded_size(text)
+        batch = self._pending.get(target_lang)
+        if batch is not None and (batch.chars + len(text) > self.max_batch_chars
+                                  or batch.bytes + size > self.max_batch_bytes):
+            self._seal(target_lang)
+            batch = None
+        if batch is None:
+            batch = self._pending[target_lang] = _PendingBatch()
+            task = loop.create_task(self._run(target_lang, batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+        batch.items.append((text, future))
+        batch.chars += len(text)
+        batch.bytes += size
+        if len(batch.items) >= self.max_batch_size:
+            self._seal(target_lang)
+
+        return await future
+
+
+    async def close(self) -> None:
+        """
+        待機中の依頼をすべて送信し、送信中のリクエストの完了を待ちます。
+
+        """
+        for batch in self._pending.values():
+            batch.full.set()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+        return
+
+
+    def _seal(self, target_lang: str) -> None:
+        # 上限に達したバッチへの追加を締め切る（送信は許可を得てから）
+        batch = self._pending.pop(target_lang, None)
+        if batch is not None:
+            batch.full.set()
+
+
+    async def _run(self, target_lang: str, batch: _PendingBatch) -> None:
+        try:
+            # 最大待ち時間だけ同じ言語の依頼を待ち、送信の許可を取りに行く
+            try:
+                await asyncio.wait_for(batch.full.wait(), self.max_wait_ms / 1000)
+            except asyncio.TimeoutError:
+                pass
+            # 許可を待つ間も依頼を受け付け、許可を得た時点で締め切る
+            async with (self.permit_func() if self.permit_func else contextlib.nullcontext()):
+                if self._pending.get(target_lang) is batch:
+                    del self._pending[target_lang]
+                await self._send(target_lang, batch.items)
+        except Exception as err:
+            # 許可の取得に失敗した場合は、待機中の呼び出し元にエラーを伝える
+            if self._pending.get(target_lang) is batch:
+                del self._pending[target_lang]
+            for _, future in batch.items:
+                if not future.done():
+                    future.set_exception(err)
+        except BaseException:
+            # 許可を待つ間にキャンセルされた場合も、待機中の呼び出し元が止まらないようにする
+            if self._pending.get(target_lang) is batch:
+                del self._pending[target_lang]
+            for _, future in batch.items:
+                if not future.done():
+                    future.cancel()
+            raise
+
+
+    async def _send(self, target_lang: str, batch: List[Tuple[str, asyncio.Future]]) -> None:
+        self.batches_sent += 1
+        self.texts_sent += len(batch)
+        try:
+            results = await self.send_func([text for text, _ in batch], target_lang)
+            if len(results) != len(batch):
+                raise ValueError(f"翻訳結果の件数が一致しません: {len(results)} / {len(batch)}")
+        except Exception as err:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(err)
+            return
+        except BaseException:
+            # 送信がキャンセルされた場合（終了時等）も、待機中の呼び出し元が止まらないようにキャンセルを伝える
+            for _, future in batch:
+                if not future.done():
+                    future.cancel()
+            raise
+
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+
+# --- 以下はクラスの使用方法のサンプルです ---
+# --- 約4000文字の日本語7件が、DeepLの上限（128KiB）を超えない複数のリクエストに分かれることを確認します ---
+async def main():
+    sent_sizes = []
+
+    async def send(texts, target_lang):
+        sent_sizes.append(sum(encoded_size(text) for text in texts))
+        return [(text, "JA") for text in texts]
+
+    batcher = TranslationBatcher(send, max_batch_size=25, max_batch_chars=30000, max_batch_bytes=120 * 1024)
+    texts = ["これは長い会議ログの翻訳テストです。" * 220 for _ in range(7)]
+    results = await asyncio.gather(*(batcher.submit(text, "EN") for text in texts))
+    await batcher.close()
+
+    print(f"文字数: {sum(len(text) for text in texts):,} , リクエストのサイズ: {sent_sizes}")
+    assert [text for text, _ in results] == texts
+    assert len(sent_sizes) > 1 and all(size <= 120 * 1024 for size in sent_sizes)
+    return
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
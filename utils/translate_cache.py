@@ -0,0 +1,238 @@
+import hashlib
+import sys
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+
+def normalize_text(text: str) -> str:
+    """
+    キャッシュキー用にテキストを正規化します（Unicode NFC化・前後空白の除去）。
+
+    Parameters:
+    ----------
+    text : str
+        正規化するテキスト。
+
+    Returns:
+    ----------
+    normalized : str
+        正規化後のテキスト。
+    """
+    return unicodedata.normalize("NFC", text).strip()
+
+
+def make_cache_key(text: str, target_lang: str) -> str:
+    """
+    (正規化テキストのハッシュ, 翻訳先言語) からキャッシュキーを作成します。
+
+    Parameters:
+    ----------
+    text : str
+        翻訳元テキスト。
+    target_lang : str
+        翻訳先の言語コード (例: "EN", "JA")。
+
+    Returns:
+    ----------
+    key : str
+        "言語コード:SHA-256ハッシュ" 形式のキー。
+    """
+    digest = hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+    return f"{target_lang.upper()}:{digest}"
+
+
+class TranslationCache:
+    """
+    翻訳結果を保持するメモリ上の LRU + TTL キャッシュ。
+    件数とおおよそのメモリ量の上限を超えると、最も古く使われたエントリから削除します。
+    期限切れのエントリは通常の取得では返しませんが、翻訳APIの障害時の代替用に押し出されるまで保持します。
+    """
+    def __init__(self, max_entries: int = 5000, max_bytes: int = 16 * 1024 * 1024, ttl_sec: float = 24 * 60 * 60):
+        """
+        TranslationCacheクラスのインスタンスを初期化します。
+
+        Parameters:
+        ----------
+        max_entries : int
+            保持する最大エントリ数。
+        max_bytes : int
+            保持する翻訳結果の合計サイズ上限（バイト、概算）。
+        ttl_sec : float
+            エントリの有効期間（秒）。
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_sec = ttl_sec
+        # key -> (translated_text, source_lang, expires_at, size)
+        self._data: "OrderedDict[str, Tuple[str, str, float, int]]" = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+    def __contains__(self, key: str) -> bool:
+        # 有効期限内のエントリがあるか（ヒット数・参照順は更新しない）
+        entry = self._data.get(key)
+        return entry is not None and entry[2] >= time.monotonic()
+
+
+    def get(self, text: str, target_lang: str) -> Optional[Tuple[str, str]]:
+        """
+        キャッシュから翻訳結果を取得します。期限切れの場合は None を返します。
+
+        Parameters:
+        ----------
+        text : str
+            翻訳元テキスト。
+        target_lang : str
+            翻訳先の言語コード。
+
+        Returns:
+        ----------
+        result : Optional[Tuple[str, str]]
+            (翻訳されたテキスト, 翻訳元言語)。存在しない場合は None。
+        """
+        return self.get_by_key(make_cache_key(text, target_lang))
+
+
+    def get_by_key(self, key: str) -> Optional[Tuple[str, str]]:
+        """
+        キャッシュキーを指定して翻訳結果を取得します。
+
+        Parameters:
+        ----------
+        key : str
+            make_cache_key で作成したキー。
+
+        Returns:
+        ----------
+        result : Optional[Tuple[str, str]]
+            (翻訳されたテキスト, 翻訳元言語)。存在しない場合は None。
+        """
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        translated_text, source_lang, expires_at, _ = entry
+        if expires_at < time.monotonic():
+            self.misses += 1
+            return None
+
+        self._data.move_to_end(key)
+        self.hits += 1
+        return translated_text, source_lang
+
+
+    def get_stale_by_key(self, key: str) -> Optional[Tuple[str, str]]:
+        """
+        期限切れを含めて翻訳結果を取得します（翻訳APIの障害時の代替用）。
+
+        Parameters:
+        ----------
+        key : str
+            make_cache_key で作成したキー。
+
+        Returns:
+        ----------
+        result : Optional[Tuple[str, str]]
+            (翻訳されたテキスト, 翻訳元言語)。存在しない場合は None。
+        """
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        return entry[0], entry[1]
+
+
+    def set(self, text: str, target_lang: str, translated_text: str, source_lang: str) -> None:
+        """
+        翻訳結果をキャッシュに登録し、上限を超えた分を古い順に削除します。
+
+        Parameters:
+        ----------
+        text : str
+            翻訳元テキスト。
+        target_lang : str
+            翻訳先の言語コード。
+        translated_text : str
+            翻訳されたテキスト。
+        source_lang : str
+            翻訳元言語。
+        """
+        self.set_by_key(make_cache_key(text, target_lang), translated_text, source_lang)
+
+        return
+
+
+    def set_by_key(self, key: str, translated_text: str, source_lang: str) -> None:
+        """
+        キャッシュキーを指定して翻訳結果を登録します（永続ストアからのウォームロード用）。
+
+        Parameters:
+        ----------
+        key : str
+            make_cache_key で作成したキー。
+        translated_text : str
+            翻訳されたテキスト。
+        source_lang : str
+            翻訳元言語。
+        """
+        size = sys.getsizeof(translated_text) + sys.getsizeof(key)
+        if size > self.max_bytes:
+            return
+
+        if key in self._data:
+            self._remove(key)
+        self._data[key] = (translated_text, source_lang, time.monotonic() + self.ttl_sec, size)
+        self._bytes += size
+
+        while len(self._data) > self.max_entries or self._bytes > self.max_bytes:
+            oldest_key = next(iter(self._data))
+            self._remove(oldest_key)
+            self.evictions += 1
+
+        return
+
+
+    def clear(self) -> None:
+        """
+        すべてのエントリを削除します。
+
+        """
+        self._data.clear()
+        self._bytes = 0
+
+        return
+
+
+    def stats(self) -> dict:
+        """
+        キャッシュの統計情報を取得します。
+
+        Returns:
+        ----------
+        stats : dict
+            エントリ数・使用バイト数・ヒット数・ミス数・削除数・ヒット率の辞書。
+        """
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._data),
+            "bytes": self._bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+
+    def _remove(self, key: str) -> None:
+        entry = self._data.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry[3]
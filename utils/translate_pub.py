@@ -1,20 +1,35 @@
 import aiohttp
 import asyncio
-import datetime
-import json
+import contextlib
 import os
-import requests
-from typing import Optional,Tuple
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
 import config   # config.py から読み込む：相対パスのためエラーとなる可能性がある
+from utils.char_counter import CharCounter
+from utils.circuit_breaker import CircuitBreaker, CircuitOpenError
+from utils.http_session import create_session
+from utils.lang_detect import detect_language, is_same_lang
+from utils.quota import QuotaExceededError, QuotaManager
+from utils.rate_limit import AdaptiveConcurrency, TokenBucket, backoff_delay
+from utils.text_protect import has_translatable_text, protect, restore
+from utils.text_segment import split_text
+from utils.translate_backend import DeepLBackend, DeepLError, KeyPoolBackend, TranslationBackend
+from utils.translate_batch import TranslationBatcher
+from utils.translate_cache import TranslationCache, make_cache_key
+from utils.translate_queue import PRIORITY_BULK, PRIORITY_INTERACTIVE, QueueSaturatedError, TranslationScheduler
+from utils.translate_store import TranslationStore
+from utils.translation_memory import TranslationMemory
 
-DEFAULT_COUNT_DATA = {"count": 0, "month": "YYYY-MM"}
 
 class Translator:
     """
     DeepL APIを使用してテキスト翻訳を行うクラス。
     APIキーと文字数カウント用のファイルパスを管理します。
+    インスタンス作成時にはファイル・ネットワークへアクセスしません（start で非同期に準備します）。
     """
-    def __init__(self, api_key: Optional[str] = None, char_count_file: str = config.CHAR_COUNT_FILE):
+    def __init__(self, api_key: Optional[str] = None, char_count_file: str = config.CHAR_COUNT_FILE,
+                 cache: Optional[TranslationCache] = None, store: Optional[TranslationStore] = None,
+                 backend: Optional[TranslationBackend] = None, api_keys: Optional[List[str]] = None):
         """
         Translatorクラスのインスタンスを初期化します。
 
@@ -24,129 +39,263 @@ class Translator:
             DeepLのAPIキー。指定しない場合は config.DEEPL_API_KEY を参照します。
         char_count_file : str
             文字数カウントを保存するJSONファイルのパス。
+        cache : Optional[TranslationCache]
+            翻訳結果キャッシュ。指定しない場合は config の設定値で作成します。
+        store : Optional[TranslationStore]
+            翻訳結果の永続ストア。指定しない場合は config.CACHE_DB_FILE に作成します。
+        backend : Optional[TranslationBackend]
+            翻訳API呼び出しを行うバックエンド。指定しない場合は api_keys があれば KeyPoolBackend、
+            なければ DeepLBackend を使用します。
+        api_keys : Optional[List[str]]
+            使い分けるDeepLのAPIキーのリスト。api_key・api_keys のどちらも指定しない場合は config.DEEPL_API_KEYS を参照します。
         """
-        self.api_key = api_key or config.DEEPL_API_KEY
+        # api_key を明示した場合は、環境変数の複数キーより優先してそのキーのみを使用する
+        if api_keys is None:
+            api_keys = config.DEEPL_API_KEYS if api_key is None else []
+        self.api_key = api_key or (api_keys[0] if api_keys else config.DEEPL_API_KEY)
         self.char_count_file = char_count_file
+        self.char_counter = CharCounter(char_count_file)
+        if backend is None:
+            # 複数キーがあれば残り文字数・応答時間で振り分ける
+            backend = KeyPoolBackend(api_keys, self.char_counter) if api_keys else DeepLBackend(self.api_key)
+        self.backend = backend
+        self._session: Optional[aiohttp.ClientSession] = None
+        self.cache = cache or TranslationCache(
+            max_entries=config.CACHE_MAX_ENTRIES,
+            max_bytes=config.CACHE_MAX_BYTES,
+            ttl_sec=config.CACHE_TTL_SEC,
+        )
+        self.store = store or TranslationStore(
+            config.CACHE_DB_FILE,
+            max_bytes=config.CACHE_DB_MAX_BYTES,
+            ttl_sec=config.CACHE_DB_TTL_SEC,
+        )
+        # 正規化後に一致する・よく似た短いメッセージの翻訳結果を再利用
+        self.memory = TranslationMemory(
+            max_entries=config.TM_MAX_ENTRIES,
+            threshold=config.TM_SIMILARITY_THRESHOLD,
+            max_chars=config.TM_MAX_CHARS,
+            min_fuzzy_chars=config.TM_MIN_FUZZY_CHARS,
+        )
+        self.batcher = TranslationBatcher(
+            self._request_translations,
+            max_batch_size=config.BATCH_MAX_SIZE,
+            max_wait_ms=config.BATCH_MAX_WAIT_MS,
+            max_batch_chars=config.BATCH_MAX_CHARS,
+            max_batch_bytes=config.BATCH_MAX_BYTES,
+            permit_func=self._send_permit,
+        )
+        # DeepLへのリクエスト頻度・同時実行数の制御（APIキーの数に比例）
+        self.rate_limiter = TokenBucket(config.RATE_LIMIT_PER_SEC * self.backend.key_count,
+                                        config.RATE_LIMIT_BURST * self.backend.key_count)
+        self.concurrency = AdaptiveConcurrency(config.CONCURRENCY_MIN, config.CONCURRENCY_MAX * self.backend.key_count)
+        self._key_count = self.backend.key_count
+        self.retries = 0
+        # DeepL障害時は呼び出しを止め、期限切れを含むキャッシュで代替する
+        self.breaker = CircuitBreaker(
+            failure_threshold=config.CIRCUIT_FAILURE_THRESHOLD,
+            reset_timeout_sec=config.CIRCUIT_RESET_SEC,
+            half_open_max_calls=config.CIRCUIT_HALF_OPEN_PROBES,
+        )
+        self.stale_served = 0
+        # ユーザー・サーバー・全体ごとの翻訳文字数の上限
+        self.quota = QuotaManager(
+            config.QUOTA_WINDOW_SEC,
+            user_limit=config.QUOTA_USER_CHARS,
+            guild_limit=config.QUOTA_GUILD_CHARS,
+            global_limit=config.QUOTA_GLOBAL_CHARS,
+            monthly_limit=self.backend.char_limit,
+            monthly_count=lambda: self.char_counter.snapshot()["count"],
+        )
+        # 優先度付きの実行枠（対話的な処理を一括処理より優先）
+        self.scheduler = TranslationScheduler(
+            max_active=config.SCHEDULER_MAX_ACTIVE,
+            max_bulk_active=config.SCHEDULER_MAX_BULK_ACTIVE,
+            max_bulk_waiting=config.SCHEDULER_MAX_BULK_WAITING,
+            max_bulk_per_user=config.SCHEDULER_MAX_BULK_PER_USER,
+        )
+        # 実行中の翻訳（キャッシュキー -> Task）。同一依頼を1回のDeepL呼び出しにまとめる
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self.coalesced = 0
+        self.skipped_same_lang = 0
+        self.skipped_untranslatable = 0
+        self._warmup_task: Optional[asyncio.Task] = None
+
+        return
 
-        # dataディレクトリが存在しない場合に作成
-        dir_path = os.path.dirname(self.char_count_file)
-        if not os.path.exists(dir_path):
-            os.makedirs(dir_path, exist_ok=True)
 
-        # 文字数カウントファイルの初期化
-        if not os.path.exists(self.char_count_file):
-            self.check_deepl_count()
+    async def start(self) -> None:
+        """
+        共有HTTPセッションを作成し、文字数カウント・翻訳キャッシュの読み込みをバックグラウンドで開始します。
+        ボット起動時（setup_hook）に呼び出してください。ファイル・ネットワークの処理を待たずに戻ります。
+        呼び出さなかった場合、セッションは最初の翻訳時に作成されます。
+
+        """
+        self._get_session()
+        # 文字数カウントの定期書き出しを開始
+        self.char_counter.start_flusher(config.CHAR_COUNT_FLUSH_SEC)
+        if self._warmup_task is None:
+            self._warmup_task = asyncio.create_task(self._warm_up())
 
         return
 
 
-    def _set_char_count_file(self) -> None:
+    async def _warm_up(self) -> None:
         """
-        文字数カウントファイルの有無をチェックし、存在しない場合はファイルを作成する。
+        文字数カウントファイルを読み込み、永続ストアからよく使う翻訳をキャッシュへ読み込みます。
 
         """
-        # dataディレクトリが存在しない場合に作成
-        dir_path = os.path.dirname(self.char_count_file)
-        if not os.path.exists(dir_path):
-            os.makedirs(dir_path, exist_ok=True)
+        try:
+            count_data = await asyncio.to_thread(self.char_counter.snapshot)
+            # キーごとの使用量を引き継ぎ、残り文字数による振り分けに反映
+            self.backend.restore_counts(count_data.get("keys", {}))
+            self._scale_to_keys()
+        except Exception as e:
+            print(f"文字数カウント読み込みエラー: {e}")
 
-        # 文字数カウントファイルの初期化
-        if not os.path.exists(self.char_count_file):
-            self.check_deepl_count()
+        try:
+            entries = await asyncio.to_thread(self.store.load_hot, config.CACHE_WARM_ENTRIES)
+            for key, translated_text, source_lang in reversed(entries):
+                # 読み込み中に翻訳された新しい結果は上書きしない
+                if key not in self.cache:
+                    self.cache.set_by_key(key, translated_text, source_lang)
+            print(f"翻訳キャッシュをウォームロード: {len(entries)}件")
+        except Exception as e:
+            print(f"翻訳キャッシュ読み込みエラー: {e}")
 
         return
 
 
+    async def close(self) -> None:
+        """
+        待機中のバッチを送信後、文字数カウントを書き出し、共有HTTPセッションと永続ストアをクローズします。
+        ボット終了時に呼び出してください。
+
+        """
+        if self._warmup_task is not None and not self._warmup_task.done():
+            self._warmup_task.cancel()
+        await self.batcher.close()
+        await self.char_counter.stop_flusher()
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+        await asyncio.to_thread(self.store.close)
+
+        return
+
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        """
+        共有HTTPセッションを取得します。未作成またはクローズ済みの場合は作成します。
+
+        Returns:
+        -------
+        session : aiohttp.ClientSession
+            キープアライブ付きコネクションプールを持つセッション。
+        """
+        if self._session is None or self._session.closed:
+            self._session = create_session()
+        return self._session
+
+
     def get_char_count(self) -> dict[int, str]:
         """
-        現在の月の翻訳文字数を取得します。
+        現在の月の翻訳文字数を取得します。DeepL上の使用量との同期は check_deepl_count で行います。
 
         Returns:
         -------
         count_data : dict
             合計翻訳文字数と現在の月"YYYY-MM"の辞書。
         """
-        # 現在月を取得し、初期値作成
-        current_month = datetime.datetime.now().strftime("%Y-%m")
-        count_data = DEFAULT_COUNT_DATA
-        count_data["month"] = current_month
-
-        if os.path.exists(self.char_count_file):
-            try:
-                with open(self.char_count_file, "r", encoding="utf-8") as f:
-                    file_data = json.load(f)
-                # 月が同じであれば、そのデータを使用
-                if file_data.get("month") == current_month:
-                    count_data = file_data
-            except (json.JSONDecodeError, FileNotFoundError, TypeError):
-                pass
-        else:
-            self.check_deepl_count()
-        
-        return count_data
+        return self.char_counter.snapshot()
 
 
     def update_char_count(self, add_count: int) -> None:
         """
-        文字数カウントファイルを更新します。同じ月の場合はカウントを追加します。
+        翻訳文字数をメモリ上で加算します。ファイルへは定期的・終了時にまとめて書き出します。
 
         Parameters:
         ----------
         add_count : int
             追加する翻訳文字数
         """
-        current_month = datetime.datetime.now().strftime("%Y-%m")
-        data_after = DEFAULT_COUNT_DATA
-        data_after["month"] = current_month
-
-        # 更新前のデータを取得
-        data_before = self.get_char_count()
-        # 同じ月であればカウントを追加
-        if data_before.get("month") == current_month:
-            data_after["count"] = data_before.get("count") + add_count
-
-        with open(self.char_count_file, "w", encoding="utf-8") as f:
-            json.dump(data_after, f, ensure_ascii=False, indent=2)
+        self.char_counter.add(add_count)
 
         return
 
 
-    def check_deepl_count(self) -> None:
+    async def check_deepl_count(self) -> None:
         """
-        DEEPL上の文字数制限を取得し、文字数カウントファイルを作成します。。
+        DeepL上の使用量を取得し、文字数カウントを同期します（ファイルへ書き出します）。
+        ボットの接続後にバックグラウンドで呼び出してください。取得に失敗した場合は手元のカウントを維持します。
 
         """
-        # 初期化
-        count = 0
-        limit = config.CHAR_LIMIT
+        if not self.api_key:
+            return
 
         # 使用量取得APIを実行
         try:
-            api_params = {"auth_key": self.api_key}
-            res = requests.get(config.DEEPL_USAGE_URL, params=api_params, timeout=10)
-            res.raise_for_status() # HTTPエラーがあれば例外を発生させる
-            data = res.json()
-            count = data.get("character_count", 0)
-            limit = data.get("character_limit", config.CHAR_LIMIT) # configから参照
-        except requests.exceptions.RequestException as e:
+            data = await self.backend.usage(self._get_session())
+            count = int(data.get("character_count", 0))
+        except DeepLError as e:
+            print(f"DeepL API使用量取得エラー: {e}")
+            return
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
             print(f"DeepL API接続エラー: {e}")
-        except json.JSONDecodeError as e:
-            print(f"DeepL API JSON解析エラー: {e}")
+            return
         except Exception as e:
             print(f"DeepL APIその他エラー: {e}")
+            return
 
-        # 文字数カウントファイルを更新
-        current_month = datetime.datetime.now().strftime("%Y-%m")
-        data_count = DEFAULT_COUNT_DATA
-        data_count["month"] = current_month
-        data_count["count"] = count
-        with open(self.char_count_file, "w", encoding="utf-8") as f:
-            json.dump(data_count, f, ensure_ascii=False, indent=2)
+        # 文字数カウントファイル・月間の上限を更新（複数キーの場合は全キーの合計）
+        self.char_counter.set_count(count)
+        if data.get("character_limit"):
+            self.quota.monthly_limit = int(data["character_limit"])
+        self._scale_to_keys()
+        try:
+            await asyncio.to_thread(self.char_counter.flush)
+        except Exception as e:
+            print(f"文字数カウント書き出しエラー: {e}")
+        print(f"DeepL使用量を同期: {count:,} 文字")
 
         return
 
 
-    async def translate(self, original_text: str, target_lang: str = config.DEFAULT_LANG) -> tuple[str, str]:
+    def is_cached(self, text: str, target_lang: str) -> bool:
+        """
+        翻訳結果がメモリキャッシュにあるかを返します（先読みの要否の判定用）。
+
+        """
+        return make_cache_key(text, target_lang) in self.cache
+
+
+    def pick_target_lang(self, text: str, native_lang: str, other_lang: str) -> str:
+        """
+        ローカルの言語判定で翻訳先の言語を決めます。母国語のテキストは other_lang へ、それ以外は母国語へ翻訳します。
+        判定できない場合は母国語を返します。
+
+        Parameters:
+        ----------
+        text : str
+            翻訳する元テキスト。
+        native_lang : str
+            ユーザーの母国語の言語コード。
+        other_lang : str
+            母国語のテキストを翻訳する先の言語コード。
+
+        Returns:
+        ----------
+        target_lang : str
+            翻訳先の言語コード。
+        """
+        if is_same_lang(detect_language(text), native_lang):
+            return other_lang
+        return native_lang
+
+
+    async def translate(self, original_text: str, target_lang: str = config.DEFAULT_LANG,
+                        priority: int = PRIORITY_INTERACTIVE, user_id: Optional[str] = None,
+                        guild_id: Optional[str] = None) -> tuple[str, str]:
         """
         指定されたテキストをターゲット言語に翻訳します。
 
@@ -156,6 +305,12 @@ class Translator:
             翻訳する元テキスト。
         target_lang : str
             翻訳先の言語コード (例: "EN", "JA")。
+        priority : int
+            DeepL呼び出しの優先度。一括処理は PRIORITY_BULK を指定します。
+        user_id : Optional[str]
+            依頼元のユーザーID。一括処理・翻訳文字数のユーザーごとの上限に使用します。
+        guild_id : Optional[str]
+            依頼元のサーバーID。翻訳文字数のサーバーごとの上限に使用します。
 
         Returns:
         ----------
@@ -163,41 +318,383 @@ class Translator:
             翻訳されたテキスト。エラーの場合は "[翻訳エラー]" を返します。
         return_lang : str
             翻訳元言語。エラーの場合は "ERROR" を返します。
+            一括処理（PRIORITY_BULK）で混雑している場合は QueueSaturatedError、
+            文字数の上限を超える場合は QuotaExceededError を送出します。
         """
         return_text = "[翻訳エラー]"
         return_lang = "ERROR"
 
+        # 空・URLやメンションのみ等、翻訳する文字がなければDeepLを呼ばずにそのまま返す
+        if not has_translatable_text(original_text):
+            self.skipped_untranslatable += 1
+            return original_text, ""
+
+        # キャッシュにあればDeepLを呼ばずに返す（文字数カウント対象外）
+        cache_key = make_cache_key(original_text, target_lang)
+        cached = self.cache.get_by_key(cache_key)
+        if cached is not None:
+            return cached
+
+        # 翻訳メモリに一致・類似するメッセージがあればDeepLを呼ばずに返す
+        # （類似一致の結果を別のテキストの翻訳としてキャッシュに残さないよう、キャッシュには登録しない）
+        remembered = self.memory.lookup(original_text, target_lang)
+        if remembered is not None:
+            return remembered
+
+        # ローカル判定で既に翻訳先の言語であればDeepLを呼ばずに返す
+        detected_lang = detect_language(original_text)
+        if is_same_lang(detected_lang, target_lang):
+            self.skipped_same_lang += 1
+            return original_text, detected_lang
+
         if not self.api_key:
             return return_text, return_lang
 
-        params = {
-            "auth_key": self.api_key,
-            "text": original_text,
-            "target_lang": target_lang
-        }
+        # 長文は分割して並列に翻訳
+        if len(original_text) > config.CHUNK_MAX_CHARS:
+            return await self._translate_chunked(cache_key, original_text, target_lang, priority, user_id, guild_id)
 
-        # DEEPL_API実行
-        try:
-            async with aiohttp.ClientSession() as session:
-                async with session.post(config.DEEPL_API_URL, data=params) as resp: # config.py から読み込む
-                    if resp.status == 200:
-                        res_json = await resp.json()
-                        return_text = res_json["translations"][0]["text"]
-                        return_lang = res_json["translations"][0]["detected_source_language"]
-                        # 文字数カウントファイルを更新
-                        self.update_char_count(len(original_text))
-                    else:
-                        error_text = await resp.text()
-                        return_text = f"[翻訳エラー]: {resp.status} : {error_text}"
+        # 永続ストア参照・DEEPL_API実行（実行中の同一依頼があれば相乗りする）
+        task = self._inflight.get(cache_key)
+        if task is None:
+            task = self._start_inflight(cache_key, original_text, target_lang, priority, user_id, guild_id)
+        else:
+            self.coalesced += 1
+            # 一括処理・先読みの翻訳に優先度の高い依頼が相乗りした場合は、実行枠の待機の優先度を引き上げる
+            self.scheduler.promote(cache_key, priority)
 
+        try:
+            try:
+                # 呼び出し元がキャンセルされても、相乗り中の他の依頼のために翻訳は継続する
+                return_text, return_lang = await asyncio.shield(task)
+            except QueueSaturatedError:
+                # 相乗りした一括処理が混雑で打ち切られた場合、一括処理でなければ自分の優先度で依頼し直す
+                if priority >= PRIORITY_BULK:
+                    raise
+                task = self._start_inflight(cache_key, original_text, target_lang, priority, user_id, guild_id)
+                return_text, return_lang = await asyncio.shield(task)
+
+        except QueueSaturatedError:
+            # 一括処理は呼び出し元で中断・通知する
+            if priority >= PRIORITY_BULK:
+                raise
+            return "[翻訳エラー]: 混雑しています", return_lang
+        except QuotaExceededError as err:
+            # 一括処理は呼び出し元で中断・通知する
+            if priority >= PRIORITY_BULK:
+                raise
+            return f"[翻訳エラー]: 翻訳文字数の上限に達しました ({err.scope}: {err.used:,} / {err.limit:,})", return_lang
+        except CircuitOpenError:
+            return_text = "[翻訳エラー]: 翻訳サービスが一時的に利用できません"
+        except DeepLError as err:
+            return_text = f"[翻訳エラー]: {err.status} : {err.detail}"
+            if not self._is_outage(err):
+                return return_text, return_lang
         except aiohttp.ClientError as err:
             # print(f"AIOHTTP Client Error: {err}")
             return_text = "[翻訳エラー]: 接続に失敗しました"
+        except asyncio.TimeoutError:
+            return_text = "[翻訳エラー]: タイムアウトしました"
+        else:
+            return return_text, return_lang
+
+        # DeepL障害時は、期限切れを含む過去の翻訳結果があればそれを返す
+        stale = await self._get_stale(cache_key)
+        if stale is not None:
+            self.stale_served += 1
+            return stale
 
         # print(f"翻訳結果: {return_text} , 翻訳元言語: {return_lang}")
         return return_text, return_lang
 
 
+    async def translate_many(self, original_text: str, target_langs: List[str],
+                             priority: int = PRIORITY_INTERACTIVE, user_id: Optional[str] = None,
+                             guild_id: Optional[str] = None) -> Dict[str, Tuple[str, str]]:
+        """
+        1つのテキストを複数の言語へ並行して翻訳します。
+        言語ごとにキャッシュ・バッチ処理を通るため、DeepLの待ち時間は言語数によらず約1回分です。
+
+        Parameters:
+        ----------
+        original_text : str
+            翻訳する元テキスト。
+        target_langs : List[str]
+            翻訳先の言語コードのリスト（重複は除外）。
+        priority : int
+            DeepL呼び出しの優先度。
+        user_id : Optional[str]
+            依頼元のユーザーID。
+        guild_id : Optional[str]
+            依頼元のサーバーID。
+
+        Returns:
+        ----------
+        results : Dict[str, Tuple[str, str]]
+            言語コードごとの (翻訳されたテキスト, 翻訳元言語)。指定した言語の順序を保持します。
+        """
+        langs = list(dict.fromkeys(lang.upper() for lang in target_langs))
+        results = await asyncio.gather(*(
+            self.translate(original_text, lang, priority=priority, user_id=user_id, guild_id=guild_id)
+            for lang in langs
+        ))
+        return dict(zip(langs, results))
+
+
+    async def _translate_chunked(self, cache_key: str, original_text: str, target_lang: str, priority: int,
+                                 user_id: Optional[str], guild_id: Optional[str]) -> Tuple[str, str]:
+        """
+        長いテキストを段落・文の区切りで分割して並列に翻訳し、元の順序で結合します。
+
+        Returns:
+        ----------
+        return_text : str
+            結合した翻訳テキスト。いずれかの塊でエラーになった場合はそのエラー文字列。
+        return_lang : str
+            最も多くの塊で判定された翻訳元言語。エラーの場合は "ERROR"。
+        """
+        chunks = split_text(original_text, config.CHUNK_MAX_CHARS)
+
+        async def translate_chunk(body: str) -> Tuple[str, str]:
+            if not body.strip():
+                return body, ""
+            return await self.translate(body, target_lang, priority=priority, user_id=user_id, guild_id=guild_id)
+
+        results = await asyncio.gather(*(translate_chunk(body) for body, _ in chunks))
+        for text, lang in results:
+            if lang == "ERROR":
+                return text, lang
+
+        return_text = "".join(text + sep for (text, _), (_, sep) in zip(results, chunks))
+        langs = Counter(lang for _, lang in results if lang)
+        return_lang = langs.most_common(1)[0][0] if langs else ""
+        # 結合結果もキャッシュ・永続ストアに登録
+        self.cache.set_by_key(cache_key, return_text, return_lang)
+        await self._store_put(cache_key, return_text, return_lang)
+        return return_text, return_lang
+
+
+    async def _fetch_and_cache(self, cache_key: str, original_text: str, target_lang: str,
+                               priority: int = PRIORITY_INTERACTIVE, user_id: Optional[str] = None,
+                               guild_id: Optional[str] = None) -> Tuple[str, str]:
+        """
+        永続ストアを参照し、無ければバッチ経由でDeepLに翻訳を依頼して結果をキャッシュ・永続ストアに登録します。
+
+        """
+        # 永続ストアにあればメモリキャッシュへ載せて返す
+        try:
+            stored = await asyncio.to_thread(self.store.get, cache_key)
+        except Exception as e:
+            print(f"翻訳キャッシュ読み込みエラー: {e}")
+            stored = None
+        if stored is not None:
+            self.cache.set_by_key(cache_key, *stored)
+            self.memory.add(original_text, target_lang, *stored)
+            return stored
+
+        # DeepL障害中は上限・実行枠を消費せずに即座に失敗させる
+        if self.breaker.is_open():
+            raise CircuitOpenError(self.breaker.retry_in())
+
+        # URL・メンション等をプレースホルダーに置き換えて課金文字数を減らす
+        masked_text, spans = protect(original_text)
+
+        # DeepLを呼ぶ前に文字数の上限を確認（超える場合は QuotaExceededError）
+        # 相乗りした依頼はDeepLの文字数を消費しないため、最初の依頼元のみに計上する
+        charge = self.quota.consume(len(masked_text), user_id, guild_id)
+        try:
+            # 優先度順に実行枠を取得し、同時に届いた依頼とまとめて送信
+            # 優先度の高い依頼が相乗りした場合に引き上げられるよう、キャッシュキーを指定して待機
+            async with self.scheduler.slot(priority, user_id, key=cache_key):
+                masked_result, return_lang = await self.batcher.submit(masked_text, target_lang)
+        except BaseException:
+            self.quota.refund(charge)
+            raise
+        return_text = restore(masked_result, spans)
+        # 翻訳結果をキャッシュ・翻訳メモリ・永続ストアに登録
+        self.cache.set_by_key(cache_key, return_text, return_lang)
+        self.memory.add(original_text, target_lang, return_text, return_lang)
+        await self._store_put(cache_key, return_text, return_lang)
+        return return_text, return_lang
+
+
+    def _start_inflight(self, cache_key: str, original_text: str, target_lang: str, priority: int,
+                        user_id: Optional[str], guild_id: Optional[str]) -> asyncio.Task:
+        """
+        永続ストア参照・DEEPL_API実行のタスクを開始し、同一依頼が相乗りできるように登録します。
+
+        """
+        task = asyncio.create_task(self._fetch_and_cache(
+            cache_key, original_text, target_lang, priority, user_id, guild_id
+        ))
+        self._inflight[cache_key] = task
+        task.add_done_callback(lambda t: self._finish_inflight(cache_key, t))
+        return task
+
+
+    def _finish_inflight(self, cache_key: str, task: asyncio.Task) -> None:
+        """
+        実行中の翻訳の登録を解除します。待機者がいない場合の未取得例外の警告を防ぎます。
+
+        """
+        if self._inflight.get(cache_key) is task:
+            del self._inflight[cache_key]
+        if not task.cancelled():
+            task.exception()
+
+
+    async def _request_translations(self, texts: List[str], target_lang: str) -> List[Tuple[str, str]]:
+        """
+        複数のテキストを1回のDeepL APIリクエストで翻訳します。
+        バッチが送信の許可（同時実行数の枠）を保持した状態で呼び出され、リトライ中も枠を保持します。
+
+        Parameters:
+        ----------
+        texts : List[str]
+            翻訳する元テキストのリスト（text_protect.protect 済み）。
+        target_lang : str
+            翻訳先の言語コード。
+
+        Returns:
+        ----------
+        results : List[Tuple[str, str]]
+            texts と同じ順序の (翻訳されたテキスト, 翻訳元言語) のリスト。
+            リトライしても失敗した場合は DeepLError 等を送出します。
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + config.RETRY_DEADLINE_SEC
+        attempt = 0
+        while True:
+            # 初回はバッチが送信の許可（_send_permit）を取得済み。リトライ時はレート制限のみ取り直す
+            if attempt:
+                self._scale_to_keys()
+                await self.rate_limiter.acquire()
+            # サーキットブレーカーが開いていればリトライせずに CircuitOpenError を送出
+            # （half_open の試行枠は待機の後に取得し、取得後のキャンセルは except BaseException で戻す）
+            self.breaker.before_call()
+            try:
+                results = await self._post_translate(texts, target_lang)
+                self.concurrency.on_success()
+                self.breaker.on_success()
+                break
+
+            except DeepLError as err:
+                if self._is_outage(err):
+                    self.breaker.on_failure()
+                else:
+                    # 応答はあるため障害とはみなさない
+                    self.breaker.on_success()
+                if err.status not in config.RETRY_STATUS_CODES:
+                    raise
+                if err.status == 429:
+                    self.concurrency.on_throttle()
+                delay = err.retry_after if err.retry_after is not None else \
+                    backoff_delay(attempt, config.RETRY_BASE_DELAY_SEC, config.RETRY_MAX_DELAY_SEC)
+                last_err = err
+            except (aiohttp.ClientError, asyncio.TimeoutError) as err:
+                self.breaker.on_failure()
+                delay = backoff_delay(attempt, config.RETRY_BASE_DELAY_SEC, config.RETRY_MAX_DELAY_SEC)
+                last_err = err
+            except BaseException:
+                self.breaker.release()
+                raise
+
+            # 試行回数・期限を超える場合はリトライせずにエラーとする
+            attempt += 1
+            if attempt >= config.RETRY_MAX_ATTEMPTS or loop.time() + delay > deadline:
+                raise last_err
+            self.retries += 1
+            print(f"DeepL APIリトライ({attempt}回目): {delay:.2f}秒後 : {last_err}")
+            await asyncio.sleep(delay)
+
+        # 文字数カウントファイルを更新
+        self.update_char_count(sum(len(text) for text in texts))
+        return results
+
+
+    @contextlib.asynccontextmanager
+    async def _send_permit(self):
+        """
+        DeepLへの送信の許可（同時実行数の枠・レート制限のトークン）を取得します。
+        バッチは許可を待つ間も同じ言語の依頼を受け付け、取得した時点で締め切って送信します。
+
+        """
+        self._scale_to_keys()
+        async with self.concurrency:
+            await self.rate_limiter.acquire()
+            yield
+
+
+    def _scale_to_keys(self) -> None:
+        """
+        使用可能なAPIキーの数に合わせて、レート制限・同時実行数の上限を調整します。
+
+        """
+        key_count = self.backend.key_count
+        if key_count == self._key_count:
+            return
+        self._key_count = key_count
+        self.rate_limiter.rate = config.RATE_LIMIT_PER_SEC * key_count
+        self.rate_limiter.capacity = config.RATE_LIMIT_BURST * key_count
+        self.concurrency.max_limit = config.CONCURRENCY_MAX * key_count
+        self.concurrency.limit = min(self.concurrency.limit, self.concurrency.max_limit)
+        print(f"使用可能なDeepL APIキー数: {key_count}")
+
+        return
+
+
+    async def _post_translate(self, texts: List[str], target_lang: str) -> List[Tuple[str, str]]:
+        """
+        バックエンドに翻訳リクエストを1回送信します。
+
+        Returns:
+        ----------
+        results : List[Tuple[str, str]]
+            (翻訳されたテキスト, 翻訳元言語) のリスト。200以外の場合は DeepLError を送出します。
+        """
+        # テキストは protect 済みのため、XMLタグ（プレースホルダー）を保持させる
+        params = [("tag_handling", "xml"), ("split_sentences", "1")]
+        return await self.backend.translate(self._get_session(), texts, target_lang, params)
+
+
+    @staticmethod
+    def _is_outage(err: DeepLError) -> bool:
+        # 5xx はDeepL側の障害とみなす（429・4xx は応答があるため除外）
+        return err.status >= 500
+
+
+    async def _get_stale(self, cache_key: str) -> Optional[Tuple[str, str]]:
+        """
+        期限切れを含めて、メモリキャッシュ・永続ストアから過去の翻訳結果を取得します。
+
+        Returns:
+        ----------
+        result : Optional[Tuple[str, str]]
+            (翻訳されたテキスト, 翻訳元言語)。存在しない場合は None。
+        """
+        stale = self.cache.get_stale_by_key(cache_key)
+        if stale is not None:
+            return stale
+        try:
+            return await asyncio.to_thread(self.store.get, cache_key, True)
+        except Exception as e:
+            print(f"翻訳キャッシュ読み込みエラー: {e}")
+            return None
+
+
+    async def _store_put(self, cache_key: str, translated_text: str, source_lang: str) -> None:
+        """
+        翻訳結果を永続ストアへ保存します。失敗しても翻訳処理は継続します。
+
+        """
+        try:
+            await asyncio.to_thread(self.store.put, cache_key, translated_text, source_lang)
+        except Exception as e:
+            print(f"翻訳キャッシュ保存エラー: {e}")
+
+        return
+
+
 # --- 以下はクラスの使用方法のサンプルです ---
 # --- config.pyが相対インポートになるため、直接実行できません ---
 async def main():
@@ -212,7 +709,8 @@ async def main():
     original_text = "Hello, world!"
     source_lang = ""
 
-    # 現在のカウントを取得
+    # DeepL上の使用量と同期して、現在のカウントを取得
+    await translator.check_deepl_count()
     initial_count_json = translator.get_char_count()
     print(f"翻訳前の文字数カウント: {initial_count_json}")
 
@@ -224,6 +722,9 @@ async def main():
     updated_count_json = translator.get_char_count()
     print(f"翻訳後の文字数カウント: {updated_count_json} , 追加文字数: {len(original_text)}")
 
+    # セッションをクローズ
+    await translator.close()
+
     '''
     # 別の言語へ
     translated_text, source_lang = await translator.translate(original_text, "JA")
@@ -0,0 +1,220 @@
+import asyncio
+import heapq
+import itertools
+from collections import Counter
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Hashable, List, Optional, Tuple
+
+# 優先度（数値が小さいほど優先）
+PRIORITY_INTERACTIVE = 0    # DM翻訳・国旗リアクション等、ユーザーが結果を待っている処理
+PRIORITY_BULK = 10          # 複数メッセージの範囲翻訳等の一括処理（混雑時は打ち切り対象）
+PRIORITY_PREFETCH = 20      # 先読み翻訳（一括処理として扱い、他のすべての処理の後に実行）
+
+
+class QueueSaturatedError(Exception):
+    """
+    翻訳キューが混雑しているため、一括処理の受付を打ち切った場合の例外。
+    """
+
+
+class TranslationScheduler:
+    """
+    DeepLへの翻訳リクエストの実行枠を優先度順に割り当てるスケジューラー。
+    対話的な処理を一括処理より先に実行し、一括処理には同時実行数・待機数・ユーザーごとの上限を設けます。
+    キーを指定して待機している処理は、promote で優先度を引き上げられます（一括処理に対話的な依頼が相乗りした場合）。
+    """
+    def __init__(self, max_active: int = 16, max_bulk_active: int = 8, max_bulk_waiting: int = 200,
+                 max_bulk_per_user: int = 20):
+        """
+        TranslationSchedulerクラスのインスタンスを初期化します。
+
+        Parameters:
+        ----------
+        max_active : int
+            全体の同時実行数の上限。
+        max_bulk_active : int
+            一括処理の同時実行数の上限（残りの枠は対話的な処理用に確保）。
+        max_bulk_waiting : int
+            一括処理の待機数の上限。超えた場合は QueueSaturatedError を送出します。
+        max_bulk_per_user : int
+            ユーザーごとの一括処理（実行中＋待機中）の上限。
+        """
+        self.max_active = max_active
+        self.max_bulk_active = max_bulk_active
+        self.max_bulk_waiting = max_bulk_waiting
+        self.max_bulk_per_user = max_bulk_per_user
+        self._active = 0
+        self._bulk_active = 0
+        self._bulk_waiting = 0
+        self._bulk_by_owner: Counter = Counter()
+        self._waiters: List[Tuple[int, int, asyncio.Future]] = []
+        # キー -> (現在の優先度, 待機中の Future)。優先度の引き上げ用
+        self._waiting_keys: Dict[Hashable, Tuple[int, asyncio.Future]] = {}
+        self._seq = itertools.count()
+        self.shed = 0
+        self.promoted = 0
+
+
+    @asynccontextmanager
+    async def slot(self, priority: int = PRIORITY_INTERACTIVE, owner: Optional[str] = None,
+                   key: Optional[Hashable] = None) -> AsyncIterator[None]:
+        """
+        実行枠を取得します。async with で使用し、ブロックを抜けると枠を返却します。
+
+        Parameters:
+        ----------
+        priority : int
+            優先度（PRIORITY_INTERACTIVE / PRIORITY_BULK / PRIORITY_PREFETCH）。
+        owner : Optional[str]
+            依頼元のユーザーID。一括処理のユーザーごとの上限に使用します。
+        key : Optional[Hashable]
+            待機中に promote で優先度を引き上げるためのキー（翻訳のキャッシュキー等）。
+        """
+        granted = await self._acquire(priority, owner, key)
+        try:
+            yield
+        finally:
+            self._release(granted, owner, priority)
+
+
+    def promote(self, key: Hashable, priority: int) -> bool:
+        """
+        キーを指定して待機中の処理の優先度を引き上げます。実行中・待機していない場合は何もしません。
+        引き上げた処理は一括処理の待機数・同時実行数の対象外になります（ユーザーごとの上限には残ります）。
+
+        Parameters:
+        ----------
+        key : Hashable
+            slot に指定したキー。
+        priority : int
+            引き上げ後の優先度。
+
+        Returns:
+        ----------
+        result : bool
+            引き上げた場合は True。
+        """
+        entry = self._waiting_keys.get(key)
+        if entry is None:
+            return False
+        current, future = entry
+        if priority >= current or future.done():
+            return False
+        # 元の待機はそのまま残し（起こされた時点で無視される）、新しい優先度で並び直す
+        heapq.heappush(self._waiters, (priority, next(self._seq), future))
+        self._waiting_keys[key] = (priority, future)
+        if current >= PRIORITY_BULK > priority:
+            self._bulk_waiting -= 1
+        self.promoted += 1
+        self._wake()
+        return True
+
+
+    def stats(self) -> dict:
+        """
+        スケジューラーの状態を取得します。
+
+        Returns:
+        ----------
+        stats : dict
+            実行中数・一括処理の実行中数・待機数・打ち切り数の辞書。
+        """
+        return {
+            "active": self._active,
+            "bulk_active": self._bulk_active,
+            "waiting": len(self._waiters),
+            "bulk_waiting": self._bulk_waiting,
+            "shed": self.shed,
+            "promoted": self.promoted,
+        }
+
+
+    async def _acquire(self, priority: int, owner: Optional[str], key: Optional[Hashable] = None) -> int:
+        # 割り当てた枠の優先度を返す（待機中に promote された場合は引き上げ後の優先度）
+        is_bulk = priority >= PRIORITY_BULK
+        if is_bulk:
+            if self._bulk_waiting >= self.max_bulk_waiting:
+                self.shed += 1
+                raise QueueSaturatedError("翻訳キューが混雑しています")
+            if owner is not None and self._bulk_by_owner[owner] >= self.max_bulk_per_user:
+                self.shed += 1
+                raise QueueSaturatedError("ユーザーごとの一括翻訳の上限に達しました")
+            if owner is not None:
+                self._bulk_by_owner[owner] += 1
+
+        # 待機者がおらず枠に空きがあればすぐに実行
+        if not self._waiters and self._can_run(priority):
+            self._take(priority)
+            return priority
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._seq), future))
+        if is_bulk:
+            self._bulk_waiting += 1
+        if key is not None:
+            self._waiting_keys[key] = (priority, future)
+        try:
+            return await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # 枠の割り当て直後にキャンセルされた場合は返却
+                self._release(future.result(), owner, priority)
+            else:
+                current = self._waiting_keys[key][0] if key is not None else priority
+                if current >= PRIORITY_BULK:
+                    self._bulk_waiting -= 1
+                # 待機の取り消しを _wake に伝える（promote した場合は複数の待機が同じ Future を参照する）
+                future.cancel()
+                self._release_owner(priority, owner)
+                self._wake()
+            raise
+        finally:
+            if key is not None and self._waiting_keys.get(key, (None, None))[1] is future:
+                del self._waiting_keys[key]
+
+
+    def _release(self, priority: int, owner: Optional[str], requested: Optional[int] = None) -> None:
+        # priority は割り当てた枠の優先度、requested は依頼時の優先度（ユーザーごとの上限の返却に使用）
+        self._active -= 1
+        if priority >= PRIORITY_BULK:
+            self._bulk_active -= 1
+        self._release_owner(requested if requested is not None else priority, owner)
+        self._wake()
+
+
+    def _release_owner(self, priority: int, owner: Optional[str]) -> None:
+        if priority >= PRIORITY_BULK and owner is not None:
+            self._bulk_by_owner[owner] -= 1
+            if self._bulk_by_owner[owner] <= 0:
+                del self._bulk_by_owner[owner]
+
+
+    def _can_run(self, priority: int) -> bool:
+        if self._active >= self.max_active:
+            return False
+        if priority >= PRIORITY_BULK and self._bulk_active >= self.max_bulk_active:
+            return False
+        return True
+
+
+    def _take(self, priority: int) -> None:
+        self._active += 1
+        if priority >= PRIORITY_BULK:
+            self._bulk_active += 1
+
+
+    def _wake(self) -> None:
+        # 優先度順に、枠に空きがある限り待機者を起こす
+        while self._waiters:
+            priority, _, future = self._waiters[0]
+            if future.done():
+                # キャンセル済み・promote で別の優先度で割り当て済み
+                heapq.heappop(self._waiters)
+                continue
+            if not self._can_run(priority):
+                break
+            heapq.heappop(self._waiters)
+            if priority >= PRIORITY_BULK:
+                self._bulk_waiting -= 1
+            self._take(priority)
+            future.set_result(priority)
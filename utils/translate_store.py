@@ -0,0 +1,187 @@
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from typing import List, Optional, Tuple
+
+
+class TranslationStore:
+    """
+    翻訳結果をSQLiteファイルに永続化するストア。
+    翻訳テキストはzlib圧縮して保存し、合計サイズが上限を超えると最終参照の古い順に削除します。
+    同期APIのため、イベントループからは asyncio.to_thread 経由で呼び出してください。
+    """
+    def __init__(self, db_file: str, max_bytes: int = 50 * 1024 * 1024, ttl_sec: float = 30 * 24 * 60 * 60):
+        """
+        TranslationStoreクラスのインスタンスを初期化します。ファイルは初回アクセス時に開きます。
+
+        Parameters:
+        ----------
+        db_file : str
+            SQLiteファイルのパス。
+        max_bytes : int
+            保存する圧縮済み翻訳テキストの合計サイズ上限（バイト）。
+        ttl_sec : float
+            エントリの有効期間（秒）。
+        """
+        self.db_file = db_file
+        self.max_bytes = max_bytes
+        self.ttl_sec = ttl_sec
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        # 保存済みの圧縮テキストの合計サイズ。接続時に1回だけ集計し、保存・削除のたびに増減する
+        self._total_bytes = 0
+
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            dir_path = os.path.dirname(self.db_file)
+            if dir_path and not os.path.exists(dir_path):
+                os.makedirs(dir_path, exist_ok=True)
+            self._conn = sqlite3.connect(self.db_file, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS translations ("
+                " key TEXT PRIMARY KEY,"
+                " value BLOB NOT NULL,"
+                " source_lang TEXT NOT NULL,"
+                " size INTEGER NOT NULL,"
+                " created_at REAL NOT NULL,"
+                " accessed_at REAL NOT NULL,"
+                " hits INTEGER NOT NULL DEFAULT 0)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_translations_accessed ON translations (accessed_at)")
+            self._conn.commit()
+            self._total_bytes = self._sum_size(self._conn)
+        return self._conn
+
+
+    def get(self, key: str, allow_expired: bool = False) -> Optional[Tuple[str, str]]:
+        """
+        キーに対応する翻訳結果を取得し、参照日時とヒット数を更新します。
+
+        Parameters:
+        ----------
+        key : str
+            キャッシュキー（translate_cache.make_cache_key で作成）。
+        allow_expired : bool
+            True の場合は期限切れのエントリも返します（翻訳APIの障害時の代替用）。
+
+        Returns:
+        ----------
+        result : Optional[Tuple[str, str]]
+            (翻訳されたテキスト, 翻訳元言語)。存在しないか期限切れの場合は None。
+        """
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute(
+                "SELECT value, source_lang, created_at FROM translations WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            value, source_lang, created_at = row
+            # 期限切れのエントリは容量が必要になるまで残す（障害時の代替用）
+            if created_at + self.ttl_sec < now and not allow_expired:
+                return None
+            conn.execute("UPDATE translations SET accessed_at = ?, hits = hits + 1 WHERE key = ?", (now, key))
+            conn.commit()
+        return zlib.decompress(value).decode("utf-8"), source_lang
+
+
+    def put(self, key: str, translated_text: str, source_lang: str) -> None:
+        """
+        翻訳結果を保存し、合計サイズが上限を超えた場合は古いエントリを削除します。
+
+        Parameters:
+        ----------
+        key : str
+            キャッシュキー。
+        translated_text : str
+            翻訳されたテキスト。
+        source_lang : str
+            翻訳元言語。
+        """
+        value = zlib.compress(translated_text.encode("utf-8"))
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute("SELECT size FROM translations WHERE key = ?", (key,)).fetchone()
+            conn.execute(
+                "INSERT INTO translations (key, value, source_lang, size, created_at, accessed_at, hits)"
+                " VALUES (?, ?, ?, ?, ?, ?, 0)"
+                " ON CONFLICT(key) DO UPDATE SET value = excluded.value, source_lang = excluded.source_lang,"
+                " size = excluded.size, created_at = excluded.created_at, accessed_at = excluded.accessed_at",
+                (key, value, source_lang, len(value), now, now),
+            )
+            self._total_bytes += len(value) - (row[0] if row else 0)
+            self._evict(conn)
+            conn.commit()
+
+        return
+
+
+    def load_hot(self, limit: int) -> List[Tuple[str, str, str]]:
+        """
+        起動時のウォームロード用に、よく参照される有効なエントリを取得します。
+
+        Parameters:
+        ----------
+        limit : int
+            取得する最大件数。
+
+        Returns:
+        ----------
+        entries : List[Tuple[str, str, str]]
+            (キー, 翻訳されたテキスト, 翻訳元言語) のリスト。ヒット数・参照日時の降順。
+        """
+        min_created = time.time() - self.ttl_sec
+        with self._lock:
+            conn = self._connect()
+            rows = conn.execute(
+                "SELECT key, value, source_lang FROM translations WHERE created_at >= ?"
+                " ORDER BY hits DESC, accessed_at DESC LIMIT ?",
+                (min_created, limit),
+            ).fetchall()
+        return [(key, zlib.decompress(value).decode("utf-8"), source_lang) for key, value, source_lang in rows]
+
+
+    def close(self) -> None:
+        """
+        SQLite接続をクローズします。
+
+        """
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+        return
+
+
+    @staticmethod
+    def _sum_size(conn: sqlite3.Connection) -> int:
+        return conn.execute("SELECT COALESCE(SUM(size), 0) FROM translations").fetchone()[0]
+
+
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        # 上限を超えていれば期限切れを削除し、さらに最終参照の古い順に上限の9割まで削除
+        # （合計サイズは保持している値で判定し、テーブル全体の集計は削除時のみ行う）
+        if self._total_bytes <= self.max_bytes:
+            return
+
+        conn.execute("DELETE FROM translations WHERE created_at < ?", (time.time() - self.ttl_sec,))
+        total = self._sum_size(conn)
+        target = int(self.max_bytes * 0.9)
+        delete_keys = []
+        cursor = conn.execute("SELECT key, size FROM translations ORDER BY accessed_at ASC")
+        for key, size in cursor:
+            if total <= target:
+                break
+            delete_keys.append((key,))
+            total -= size
+        cursor.close()
+        conn.executemany("DELETE FROM translations WHERE key = ?", delete_keys)
+        self._total_bytes = total
@@ -0,0 +1,227 @@
+import difflib
+import re
+import unicodedata
+from collections import Counter, OrderedDict
+from typing import Dict, Optional, Set, Tuple
+from utils.text_protect import protect
+
+# 同じ記号・絵文字の繰り返し（"!!!" や "😂😂😂"）
+_REPEATED_SYMBOL = re.compile(r"([^\w\s])\1+")
+_WHITESPACE = re.compile(r"\s+")
+_DIGITS = re.compile(r"\d+")
+_WORDS = re.compile(r"\w+")
+
+
+def normalize_for_memory(text: str) -> str:
+    """
+    翻訳メモリのキー用にテキストを正規化します。
+    Unicode NFKC化・大文字小文字の統一・空白の圧縮・同じ記号や絵文字の繰り返しの圧縮を行います。
+
+    Parameters:
+    ----------
+    text : str
+        正規化するテキスト。
+
+    Returns:
+    ----------
+    normalized : str
+        正規化後のテキスト。
+    """
+    text = unicodedata.normalize("NFKC", text).casefold()
+    text = _REPEATED_SYMBOL.sub(r"\1", text)
+    return _WHITESPACE.sub(" ", text).strip()
+
+
+def _trigrams(text: str) -> Set[str]:
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class TranslationMemory:
+    """
+    短いメッセージの翻訳結果を正規化したテキストで保持する翻訳メモリ。
+    正規化後に一致するテキストはそのまま、よく似たテキストはトライグラムの索引で候補を絞り込み、
+    類似度が閾値以上かつ単語がすべて同じ（記号・空白のみ異なる）であれば過去の翻訳結果を返します。
+    単語が1つでも異なる文（否定・曜日の違い等）は意味が変わるため一致とみなしません。
+    閾値が1以上の場合は正規化後の完全一致のみを使用し、トライグラムの索引は作成しません。
+    """
+    def __init__(self, max_entries: int = 20000, threshold: float = 1.0, max_chars: int = 200,
+                 min_fuzzy_chars: int = 8, max_candidates: int = 20):
+        """
+        TranslationMemoryクラスのインスタンスを初期化します。
+
+        Parameters:
+        ----------
+        max_entries : int
+            保持する最大エントリ数（全言語の合計）。
+        threshold : float
+            類似一致とみなす類似度（0〜1）。1以上を指定すると完全一致のみ使用します（索引を作成しません）。
+        max_chars : int
+            翻訳メモリの対象とする最大文字数（長文は対象外）。
+        min_fuzzy_chars : int
+            類似一致の対象とする最小文字数（短すぎる文は完全一致のみ）。
+        max_candidates : int
+            類似度を計算する候補の最大数。
+        """
+        self.max_entries = max_entries
+        self.threshold = threshold
+        self.max_chars = max_chars
+        self.min_fuzzy_chars = min_fuzzy_chars
+        self.max_candidates = max_candidates
+        # (target_lang, normalized) -> (translated_text, source_lang)
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[str, str]]" = OrderedDict()
+        # target_lang -> trigram -> normalized の集合（類似一致を使用する場合のみ）
+        self._index: Dict[str, Dict[str, Set[str]]] = {}
+        self.exact_hits = 0
+        self.fuzzy_hits = 0
+        self.misses = 0
+
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+    def is_candidate(self, text: str) -> bool:
+        """
+        翻訳メモリの対象となるテキストかを返します。
+        長文や、URL・メンション・コード等（翻訳しない部分）を含むテキストは対象外です。
+
+        """
+        if len(text) > self.max_chars:
+            return False
+        _, spans = protect(text)
+        return not spans
+
+
+    def lookup(self, text: str, target_lang: str) -> Optional[Tuple[str, str]]:
+        """
+        正規化後の完全一致、または類似一致する過去の翻訳結果を取得します。
+
+        Parameters:
+        ----------
+        text : str
+            翻訳元テキスト。
+        target_lang : str
+            翻訳先の言語コード。
+
+        Returns:
+        ----------
+        result : Optional[Tuple[str, str]]
+            (翻訳されたテキスト, 翻訳元言語)。見つからない場合は None。
+        """
+        if not self.is_candidate(text):
+            return None
+        target_lang = target_lang.upper()
+        normalized = normalize_for_memory(text)
+
+        entry = self._entries.get((target_lang, normalized))
+        if entry is not None:
+            self._entries.move_to_end((target_lang, normalized))
+            self.exact_hits += 1
+            return entry
+
+        match = self._find_similar(normalized, target_lang)
+        if match is not None:
+            self._entries.move_to_end((target_lang, match))
+            self.fuzzy_hits += 1
+            return self._entries[(target_lang, match)]
+
+        self.misses += 1
+        return None
+
+
+    def add(self, text: str, target_lang: str, translated_text: str, source_lang: str) -> None:
+        """
+        翻訳結果を翻訳メモリに登録し、上限を超えた分を古い順に削除します。
+
+        Parameters:
+        ----------
+        text : str
+            翻訳元テキスト。
+        target_lang : str
+            翻訳先の言語コード。
+        translated_text : str
+            翻訳されたテキスト。
+        source_lang : str
+            翻訳元言語。
+        """
+        if not self.is_candidate(text):
+            return
+        target_lang = target_lang.upper()
+        normalized = normalize_for_memory(text)
+        if not normalized:
+            return
+
+        key = (target_lang, normalized)
+        # 完全一致のみの場合、索引は使用しないため作成しない
+        if key not in self._entries and self.threshold < 1:
+            index = self._index.setdefault(target_lang, {})
+            for gram in _trigrams(normalized):
+                index.setdefault(gram, set()).add(normalized)
+        self._entries[key] = (translated_text, source_lang)
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.max_entries:
+            oldest_key, _ = self._entries.popitem(last=False)
+            self._unindex(*oldest_key)
+
+        return
+
+
+    def stats(self) -> dict:
+        """
+        翻訳メモリの統計情報を取得します。
+
+        Returns:
+        ----------
+        stats : dict
+            エントリ数・完全一致数・類似一致数・不一致数の辞書。
+        """
+        return {
+            "entries": len(self._entries),
+            "exact_hits": self.exact_hits,
+            "fuzzy_hits": self.fuzzy_hits,
+            "misses": self.misses,
+        }
+
+
+    def _find_similar(self, normalized: str, target_lang: str) -> Optional[str]:
+        # トライグラムを多く共有する候補に絞ってから類似度を計算
+        if self.threshold >= 1 or len(normalized) < self.min_fuzzy_chars:
+            return None
+        index = self._index.get(target_lang)
+        if not index:
+            return None
+
+        counts: Counter = Counter()
+        for gram in _trigrams(normalized):
+            counts.update(index.get(gram, ()))
+
+        # 単語・数字が異なる文（否定・曜日・時刻・数量等）は意味が変わるため一致とみなさない
+        words = _WORDS.findall(normalized)
+        digits = _DIGITS.findall(normalized)
+        best, best_score = None, self.threshold
+        matcher = difflib.SequenceMatcher(None, "", normalized, autojunk=False)
+        for candidate, _ in counts.most_common(self.max_candidates):
+            if _DIGITS.findall(candidate) != digits or _WORDS.findall(candidate) != words:
+                continue
+            matcher.set_seq1(candidate)
+            if matcher.real_quick_ratio() < best_score or matcher.quick_ratio() < best_score:
+                continue
+            score = matcher.ratio()
+            if score >= best_score:
+                best, best_score = candidate, score
+        return best
+
+
+    def _unindex(self, target_lang: str, normalized: str) -> None:
+        index = self._index.get(target_lang)
+        if index is None:
+            return
+        for gram in _trigrams(normalized):
+            keys = index.get(gram)
+            if keys is None:
+                continue
+            keys.discard(normalized)
+            if not keys:
+                del index[gram]
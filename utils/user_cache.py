@@ -0,0 +1,173 @@
+import time
+from collections import OrderedDict
+from typing import Any, NamedTuple, Optional, Tuple
+
+
+class UserProfile(NamedTuple):
+    """
+    キャッシュするユーザー情報（Embedの作成・DM送信に必要な項目のみ）。
+    """
+    user_id: int
+    display_name: str
+    avatar_url: Optional[str]
+    user: Any   # discord.User / discord.Member（DM送信・リアクション削除用）
+
+
+class UserCache:
+    """
+    (サーバーID, ユーザーID) → 表示名・アイコンURL を有効期限付きで保持するLRUキャッシュ。
+    payload.member・Botが保持しているユーザー（bot.get_user）を優先し、
+    どちらもない場合のみ fetch_user（REST API）で取得します。
+    サーバーごとのニックネーム・アイコン（Member）は (サーバーID, ユーザーID) に、
+    サーバーに依存しない User は (None, ユーザーID) に保持し、別のサーバーの表示に混ざらないようにします。
+    """
+    def __init__(self, ttl_sec: float = 600, max_entries: int = 5000):
+        """
+        UserCacheクラスのインスタンスを初期化します。
+
+        Parameters:
+        ----------
+        ttl_sec : float
+            キャッシュの有効期限（秒）。表示名・アイコンの変更はこの時間内に反映されます。
+        max_entries : int
+            保持する最大ユーザー数。
+        """
+        self.ttl_sec = ttl_sec
+        self.max_entries = max_entries
+        # (guild_id, user_id) -> (保存時刻, UserProfile)。User は guild_id = None
+        self._entries: "OrderedDict[Tuple[Optional[int], int], Tuple[float, UserProfile]]" = OrderedDict()
+        self.hits = 0
+        self.gateway_hits = 0
+        self.fetched = 0
+
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+    def get(self, user_id: int, guild_id: Optional[int] = None) -> Optional[UserProfile]:
+        """
+        有効期限内のユーザー情報を取得します。
+        サーバーを指定した場合はそのサーバーの情報（Member）を優先し、なければサーバーに依存しない情報を返します。
+
+        Parameters:
+        ----------
+        user_id : int
+            ユーザーID。
+        guild_id : Optional[int]
+            サーバーID。DMの場合は None。
+
+        Returns:
+        ----------
+        profile : Optional[UserProfile]
+            キャッシュされたユーザー情報。存在しない・期限切れの場合は None。
+        """
+        keys = [(guild_id, user_id), (None, user_id)] if guild_id is not None else [(None, user_id)]
+        for key in keys:
+            entry = self._entries.get(key)
+            if entry is None:
+                continue
+            saved_at, profile = entry
+            if time.monotonic() - saved_at > self.ttl_sec:
+                del self._entries[key]
+                continue
+            self._entries.move_to_end(key)
+            return profile
+        return None
+
+
+    def put(self, user, guild_id: Optional[int] = None) -> UserProfile:
+        """
+        discord.User / discord.Member をキャッシュに登録し、上限を超えた分を古い順に削除します。
+
+        Parameters:
+        ----------
+        user : discord.User | discord.Member
+            登録するユーザー。
+        guild_id : Optional[int]
+            Member の場合はそのサーバーID。User の場合は None。
+
+        Returns:
+        ----------
+        profile : UserProfile
+            登録したユーザー情報。
+        """
+        profile = UserProfile(user.id, user.display_name, user.avatar.url if user.avatar else None, user)
+        key = (guild_id, user.id)
+        self._entries[key] = (time.monotonic(), profile)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return profile
+
+
+    async def resolve(self, client, user_id: int, member=None, guild_id: Optional[int] = None) -> UserProfile:
+        """
+        ユーザー情報を取得します。
+        payload.member → キャッシュ → Botが保持しているユーザー → fetch_user の順に参照します。
+
+        Parameters:
+        ----------
+        client : discord.Client
+            Botのインスタンス。
+        user_id : int
+            ユーザーID。
+        member : Optional[discord.Member]
+            リアクションイベント等に含まれるメンバー（payload.member）。
+        guild_id : Optional[int]
+            イベントが発生したサーバーID。DMの場合は None。
+
+        Returns:
+        ----------
+        profile : UserProfile
+            ユーザー情報。
+        """
+        # イベントに含まれるメンバーは最新のため、そのまま登録（サーバーのニックネームを反映）
+        if member is not None:
+            self.gateway_hits += 1
+            return self.put(member, member.guild.id)
+
+        profile = self.get(user_id, guild_id)
+        if profile is not None:
+            self.hits += 1
+            return profile
+
+        user = client.get_user(user_id)
+        if user is not None:
+            self.gateway_hits += 1
+        else:
+            user = await client.fetch_user(user_id)
+            self.fetched += 1
+        return self.put(user)
+
+
+    def invalidate(self, user_id: int, guild_id: Optional[int] = None) -> None:
+        """
+        ユーザーをキャッシュから削除します（表示名・アイコンの変更時）。
+        サーバーを指定した場合はそのサーバーの情報のみ、指定しない場合はすべてのサーバーの情報を削除します。
+
+        """
+        if guild_id is not None:
+            self._entries.pop((guild_id, user_id), None)
+            return
+        for key in [key for key in self._entries if key[1] == user_id]:
+            del self._entries[key]
+
+        return
+
+
+    def stats(self) -> dict:
+        """
+        キャッシュの統計情報を取得します。
+
+        Returns:
+        ----------
+        stats : dict
+            エントリ数・キャッシュのヒット数・Gatewayの情報の利用数・REST APIでの取得数の辞書。
+        """
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "gateway_hits": self.gateway_hits,
+            "fetched": self.fetched,
+        }
@@ -0,0 +1,174 @@
+"""
+DeepL API互換のモックサーバー（負荷試験・動作確認用）。
+
+実際のDeepL APIを呼び出さずに、遅延・エラー・429（Retry-After付き）・文字数上限を再現します。
+ボットを接続する場合は環境変数 DEEPL_API_URL / DEEPL_USAGE_URL をこのサーバーに向けてください。
+
+    python -m web.mock_deepl_server --port 8081 --latency-ms 150 --error-rate 0.02 --throttle-rate 0.05
+    DEEPL_API_URL=http://127.0.0.1:8081/v2/translate DEEPL_USAGE_URL=http://127.0.0.1:8081/v2/usage python bot_kidou_new.py
+"""
+import argparse
+import asyncio
+import random
+from aiohttp import web
+
+_STATS_KEY = "mock_stats"
+_OPTIONS_KEY = "mock_options"
+
+
+def create_app(latency_ms: float = 100, jitter_ms: float = 50, error_rate: float = 0.0,
+               throttle_rate: float = 0.0, retry_after_sec: float = 1.0,
+               character_limit: int = 500000, seed: int = None) -> web.Application:
+    """
+    モックサーバーのアプリケーションを作成します。
+
+    Parameters:
+    ----------
+    latency_ms : float
+        翻訳リクエストの平均応答時間（ミリ秒）。
+    jitter_ms : float
+        応答時間のばらつき（ミリ秒、±の一様分布）。
+    error_rate : float
+        503エラーを返す割合（0〜1）。
+    throttle_rate : float
+        429エラー（Retry-After付き）を返す割合（0〜1）。
+    retry_after_sec : float
+        429エラーのRetry-Afterヘッダーの秒数。
+    character_limit : int
+        文字数上限。超えた場合は456エラーを返します。
+    seed : int
+        乱数のシード（再現性のある試験用）。
+
+    Returns:
+    ----------
+    app : web.Application
+        aiohttpのアプリケーション。
+    """
+    app = web.Application()
+    app[_OPTIONS_KEY] = {
+        "latency_ms": latency_ms,
+        "jitter_ms": jitter_ms,
+        "error_rate": error_rate,
+        "throttle_rate": throttle_rate,
+        "retry_after_sec": retry_after_sec,
+        "character_limit": character_limit,
+        "random": random.Random(seed),
+    }
+    app[_STATS_KEY] = {
+        "requests": 0,
+        "texts": 0,
+        "characters": 0,
+        "errors": 0,
+        "throttled": 0,
+        "in_flight": 0,
+        "max_in_flight": 0,
+    }
+    app.router.add_post("/v2/translate", _translate)
+    app.router.add_route("*", "/v2/usage", _usage)
+    app.router.add_get("/stats", _stats)
+    app.router.add_post("/stats/reset", _reset_stats)
+    return app
+
+
+async def start_mock_server(host: str = "127.0.0.1", port: int = 8081, **options) -> web.AppRunner:
+    """
+    モックサーバーを現在のイベントループ上で起動します（ベンチマーク等から使用）。
+    停止する場合は、戻り値の runner.cleanup() を呼び出してください。
+
+    Returns:
+    ----------
+    runner : web.AppRunner
+        起動したサーバーのrunner。
+    """
+    runner = web.AppRunner(create_app(**options))
+    await runner.setup()
+    site = web.TCPSite(runner, host, port)
+    await site.start()
+    print(f"DeepLモックサーバー起動: http://{host}:{port}")
+    return runner
+
+
+def _mock_translate(text: str, target_lang: str) -> str:
+    # XMLタグ（プレースホルダー）を壊さないよう、先頭に言語コードを付けるだけにする
+    return f"[{target_lang}] {text}"
+
+
+async def _translate(request: web.Request) -> web.Response:
+    options = request.app[_OPTIONS_KEY]
+    stats = request.app[_STATS_KEY]
+    rng = options["random"]
+    stats["requests"] += 1
+    stats["in_flight"] += 1
+    stats["max_in_flight"] = max(stats["max_in_flight"], stats["in_flight"])
+    try:
+        data = await request.post()
+        if not data.get("auth_key"):
+            return web.Response(status=403, text="Authorization failed")
+        texts = data.getall("text", [])
+        target_lang = data.get("target_lang")
+        if not texts or not target_lang:
+            return web.Response(status=400, text="Parameter 'text' or 'target_lang' not specified")
+
+        delay = options["latency_ms"] + rng.uniform(-options["jitter_ms"], options["jitter_ms"])
+        await asyncio.sleep(max(delay, 0) / 1000)
+
+        roll = rng.random()
+        if roll < options["throttle_rate"]:
+            stats["throttled"] += 1
+            return web.Response(status=429, text="Too many requests",
+                                headers={"Retry-After": str(options["retry_after_sec"])})
+        if roll < options["throttle_rate"] + options["error_rate"]:
+            stats["errors"] += 1
+            return web.Response(status=503, text="Service unavailable")
+
+        chars = sum(len(text) for text in texts)
+        if stats["characters"] + chars > options["character_limit"]:
+            return web.Response(status=456, text="Quota exceeded")
+        stats["texts"] += len(texts)
+        stats["characters"] += chars
+
+        translations = [
+            {"detected_source_language": "EN", "text": _mock_translate(text, target_lang.upper())}
+            for text in texts
+        ]
+        return web.json_response({"translations": translations})
+    finally:
+        stats["in_flight"] -= 1
+
+
+async def _usage(request: web.Request) -> web.Response:
+    return web.json_response({
+        "character_count": request.app[_STATS_KEY]["characters"],
+        "character_limit": request.app[_OPTIONS_KEY]["character_limit"],
+    })
+
+
+async def _stats(request: web.Request) -> web.Response:
+    return web.json_response(request.app[_STATS_KEY])
+
+
+async def _reset_stats(request: web.Request) -> web.Response:
+    stats = request.app[_STATS_KEY]
+    for key in stats:
+        stats[key] = 0
+    return web.json_response(stats)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="DeepL API互換のモックサーバー")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--latency-ms", type=float, default=100)
+    parser.add_argument("--jitter-ms", type=float, default=50)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--throttle-rate", type=float, default=0.0)
+    parser.add_argument("--retry-after-sec", type=float, default=1.0)
+    parser.add_argument("--character-limit", type=int, default=500000)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    web.run_app(
+        create_app(args.latency_ms, args.jitter_ms, args.error_rate, args.throttle_rate,
+                   args.retry_after_sec, args.character_limit, args.seed),
+        host=args.host, port=args.port,
+    )